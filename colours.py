@@ -0,0 +1,287 @@
+import csv
+import os
+import re
+from array import array
+
+import numpy as np
+
+from outputs import DIRECT_OUTPUT
+
+BLANK = -1
+WHITE = 0xFFFFFF
+# The sheets use black as a 'no colour yet' placeholder, so it is treated like a blank cell.
+PLACEHOLDER = 0x000000
+
+# Colours closer than this in CIE Lab (delta E 1976) are reported as near-collisions.
+NEAR_COLLISION_DISTANCE = 3.0
+
+# Candidate levels per RGB channel used when picking a colour for a blank or conflicting entry.
+CANDIDATE_LEVELS = range(8, 256, 20)
+
+# resolve_colours writes what it changed and the near-collisions to <directory>/colours_<table>.csv.
+DEFAULT_REPORT_DIR = 'reports'
+
+
+def parse_colour(value):
+    """
+    Parse a sheet colour like '(90, 0, 0)', '90,0,0' or '90 0 0' into a packed 0xRRGGBB int.
+    Returns BLANK for empty or malformed values.
+    """
+    parts = re.findall(r'\d+', value or '')
+    if len(parts) != 3:
+        return BLANK
+    r, g, b = (int(part) for part in parts)
+    if r > 255 or g > 255 or b > 255:
+        return BLANK
+    return r << 16 | g << 8 | b
+
+
+def parse_hexcode(value):
+    """Parse a location hexcode like '402880' into a packed int, BLANK if malformed."""
+    try:
+        return int(value, 16)
+    except (TypeError, ValueError):
+        return BLANK
+
+
+def format_colour(colour):
+    """Format a packed colour as 'r g b' for rgb { } blocks."""
+    if colour == BLANK:
+        colour = WHITE
+    return f'{colour >> 16 & 255} {colour >> 8 & 255} {colour & 255}'
+
+
+def parse_colour_column(data, column='color'):
+    """Parse one colour column of a keyed table. Returns (keys, packed colour array)."""
+    keys = list(data.keys())
+    colours = array('i', (parse_colour(data[key].get(column, '')) for key in keys))
+    return keys, colours
+
+
+def to_lab(colour):
+    """Convert a packed sRGB colour to CIE Lab (D65)."""
+    return tuple(lab_array([colour])[0].tolist())
+
+
+def lab_array(colours):
+    """Convert a sequence of packed sRGB colours to CIE Lab (D65), as an (n, 3) numpy array."""
+    packed = np.asarray(colours, dtype=np.int64)
+    rgb = np.stack([packed >> 16 & 255, packed >> 8 & 255, packed & 255], axis=-1) / 255
+    rgb = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    fx, fy, fz = (np.where(t > 0.008856, np.cbrt(t), 7.787 * t + 16 / 116) for t in (x, y, z))
+    return np.stack([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)], axis=-1)
+
+
+def distance(a, b):
+    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2) ** 0.5
+
+
+class KDTree:
+    """
+    3-d tree over Lab points. Built balanced by median splits; points added later are inserted
+    at the leaves, which is fine for the few hundred colours assigned per run.
+    """
+    def __init__(self, points=()):
+        # Node: [point, item, axis, left, right]
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda entry: entry[0][axis])
+        median = len(points) // 2
+        return [points[median][0], points[median][1], axis,
+                self._build(points[:median], depth + 1),
+                self._build(points[median + 1:], depth + 1)]
+
+    def insert(self, point, item):
+        if self.root is None:
+            self.root = [point, item, 0, None, None]
+            return
+        node = self.root
+        while True:
+            side = 3 if point[node[2]] < node[0][node[2]] else 4
+            if node[side] is None:
+                node[side] = [point, item, (node[2] + 1) % 3, None, None]
+                return
+            node = node[side]
+
+    def nearest(self, point):
+        """(distance, item) of the closest point, or (inf, None) for an empty tree."""
+        best = [float('inf'), None]
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            d = distance(point, node[0])
+            if d < best[0]:
+                best = [d, node[1]]
+            diff = point[node[2]] - node[0][node[2]]
+            near, far = (node[3], node[4]) if diff < 0 else (node[4], node[3])
+            if abs(diff) < best[0]:
+                stack.append(far)
+            stack.append(near)
+        return best[0], best[1]
+
+    def within(self, point, radius):
+        """Items of all points within radius of point."""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if distance(point, node[0]) <= radius:
+                found.append(node[1])
+            diff = point[node[2]] - node[0][node[2]]
+            if diff - radius <= 0:
+                stack.append(node[3])
+            if diff + radius >= 0:
+                stack.append(node[4])
+        return found
+
+
+def find_collisions(keys, colours, min_distance=NEAR_COLLISION_DISTANCE):
+    """
+    Find exact duplicates and near-collisions among packed colours.
+
+    Returns (duplicates, near) where duplicates is a list of (key, key of first use) and near is
+    a list of (key, key) pairs closer than min_distance in Lab space. Blank colours are skipped.
+    """
+    first_use = {}
+    duplicates = []
+    for key, colour in zip(keys, colours):
+        if colour == BLANK:
+            continue
+        if colour in first_use:
+            duplicates.append((key, first_use[colour]))
+        else:
+            first_use[colour] = key
+
+    near = []
+    if min_distance > 0 and first_use:
+        unique = list(zip((tuple(point) for point in lab_array(list(first_use)).tolist()), first_use.values()))
+        tree = KDTree(unique)
+        order = {key: i for i, (_, key) in enumerate(unique)}
+        for point, key in unique:
+            for other in tree.within(point, min_distance):
+                if order[other] > order[key]:
+                    near.append((key, other))
+    return duplicates, near
+
+
+def assign_colours(keys, colours):
+    """
+    Give every blank or duplicated colour a new colour as far as possible from all others.
+
+    Candidates come from a fixed RGB grid, so results are deterministic. Each candidate keeps its
+    squared Lab distance to the nearest used colour in a numpy array, which is lowered against
+    each newly assigned colour, so every pick is one vectorized update and argmax. Ties go to the
+    lowest candidate. If more colours are needed than the grid has free candidates, the grid is
+    refined until it has enough. Returns the list of keys that were given a new colour.
+    """
+    used = set()
+    pending = []
+    for i, colour in enumerate(colours):
+        if colour == BLANK or colour in used:
+            pending.append(i)
+        else:
+            used.add(colour)
+
+    if not pending:
+        return []
+
+    levels = CANDIDATE_LEVELS
+    while True:
+        candidates = [r << 16 | g << 8 | b for r in levels for g in levels for b in levels]
+        candidates = [candidate for candidate in candidates if candidate not in used]
+        if len(candidates) >= len(pending):
+            break
+        if levels.step == 1:
+            raise ValueError(f'{len(pending)} colours to assign, but only {len(candidates)} free colours left')
+        levels = range(levels.start // 2, 256, max(1, levels.step // 2))
+    candidate_points = lab_array(candidates)
+    nearest = np.full(len(candidates), np.inf)
+    used_points = lab_array(sorted(used))
+    for start in range(0, len(used_points), 256):  # In blocks, to bound the size of the distance matrix.
+        block = used_points[start:start + 256]
+        squared = ((candidate_points[:, None, :] - block[None, :, :]) ** 2).sum(axis=2)
+        nearest = np.minimum(nearest, squared.min(axis=1))
+
+    assigned = []
+    for i in pending:
+        best = int(np.argmax(nearest))
+        colours[i] = candidates[best]
+        assigned.append(keys[i])
+        nearest = np.minimum(nearest, ((candidate_points - candidate_points[best]) ** 2).sum(axis=1))
+        nearest[best] = -1.0  # Never pick the same candidate twice.
+    return assigned
+
+
+def resolve_colours(table_name, data, column='color', report_dir=DEFAULT_REPORT_DIR, output=DIRECT_OUTPUT):
+    """
+    Parse a table's colour column once and auto-assign colours to blank, placeholder (0,0,0) or
+    duplicated entries. Of a duplicated colour only the first use keeps it, later ones get a new
+    colour. Near-collisions are advisory: they are reported but keep their colours, since close
+    hand-picked colours are often deliberate. Every assigned colour and near-collision is written
+    to report_dir/colours_<table_name>.csv. Returns a dict of key -> packed colour.
+    """
+    keys, colours = parse_colour_column(data, column)
+    sheet_colours = array('i', colours)
+    issues = {}
+    for i, colour in enumerate(colours):
+        if colour == BLANK:
+            issues[keys[i]] = ('blank', '')
+        elif colour == PLACEHOLDER:
+            colours[i] = BLANK
+            issues[keys[i]] = ('placeholder', '')
+    duplicates, _ = find_collisions(keys, colours, min_distance=0)
+    for key, first_use in duplicates:
+        issues[key] = ('duplicate', first_use)
+    assigned = assign_colours(keys, colours)
+    _, near = find_collisions(keys, colours)
+
+    resolved = dict(zip(keys, colours))
+    sheet = {key: format_colour(colour) if colour != BLANK else '' for key, colour in zip(keys, sheet_colours)}
+    rows = []
+    for key in assigned:
+        issue, other = issues[key]
+        rows.append([key, issue, other, sheet[key], format_colour(resolved[key]), ''])
+    for key, other in near:
+        rows.append([key, 'near', other, sheet[key], format_colour(resolved[key]),
+                     f'{distance(to_lab(resolved[key]), to_lab(resolved[other])):.2f}'])
+
+    if assigned or near:
+        report_file = os.path.join(report_dir, f'colours_{table_name}.csv')
+        os.makedirs(report_dir, exist_ok=True)
+        with output.open(report_file, encoding='utf-8-sig', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['key', 'issue', 'other_key', 'sheet_colour', 'colour', 'delta_e'])
+            writer.writerows(rows)
+        counts = {issue: sum(1 for key in assigned if issues[key][0] == issue)
+                  for issue in ('blank', 'placeholder', 'duplicate')}
+        print(f'{table_name}: assigned {len(assigned)} colour(s) ({counts["blank"]} blank, '
+              f'{counts["placeholder"]} 0,0,0 placeholder, {counts["duplicate"]} duplicate), '
+              f'{len(near)} near-collision(s) below delta E {NEAR_COLLISION_DISTANCE}, see {report_file}')
+    return resolved
+
+
+def check_hexcodes(data, column='hexcode'):
+    """Report locations with duplicated or malformed map hexcodes. Returns the duplicates."""
+    keys = list(data.keys())
+    hexcodes = array('i', (parse_hexcode(data[key].get(column, '')) for key in keys))
+    duplicates, _ = find_collisions(keys, hexcodes, min_distance=0)
+    malformed = [key for key, hexcode in zip(keys, hexcodes) if hexcode == BLANK]
+    if duplicates or malformed:
+        print(f'locations: {len(duplicates)} duplicate and {len(malformed)} malformed hexcode(s)')
+    for key, first_use in duplicates:
+        print(f'  {key} has the hexcode of {first_use}')
+    for key in malformed:
+        print(f'  {key} has a malformed hexcode')
+    return duplicates
@@ -0,0 +1,263 @@
+import ast
+import csv
+import operator
+import os
+import re
+import sys
+
+import numpy as np
+
+from outputs import DIRECT_OUTPUT
+
+DEFAULT_HISTORY_DIR = os.path.join('input', 'history', 'provinces')
+DEFAULT_FORMULAS_FILE = os.path.join('input', 'pop_formulas.csv')
+DEFAULT_BUILDINGS_FILE = os.path.join('input', 'building_mapping.csv')
+
+# History entries dated after this are ignored.
+START_DATE = (1444, 11, 11)
+
+DEVELOPMENT_FIELDS = ['base_tax', 'base_production', 'base_manpower']
+# Names a pop formula can use.
+FORMULA_VARIABLES = DEVELOPMENT_FIELDS + ['development']
+
+FORMULA_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+# Share of a province's population a location gets relative to its siblings. Other topographies count 1.
+TOPOGRAPHY_WEIGHTS = {
+    'mountains': 0.5,
+    'hills': 0.8,
+    'plateau': 0.8,
+    'wetlands': 0.6,
+}
+
+TOKEN = re.compile(r'"[^"]*"|[{}=]|[^\s{}="]+')
+DATE = re.compile(r'^(\d+)\.(\d+)\.(\d+)$')
+
+
+def parse_block(tokens, i=0):
+    """
+    Parse key = value pairs from tokens[i] up to the closing brace or the end.
+    Returns ([(key, value)], index of the closing brace). Block values are lists of pairs,
+    bare list items like 'discovered_by = { A B }' are skipped.
+    """
+    entries = []
+    while i < len(tokens) and tokens[i] != '}':
+        if i + 2 < len(tokens) and tokens[i + 1] == '=':
+            key, value = tokens[i], tokens[i + 2]
+            if value == '{':
+                value, i = parse_block(tokens, i + 3)
+                i += 1
+            else:
+                value = value.strip('"')
+                i += 3
+            entries.append((key, value))
+        else:
+            i += 1
+    return entries, i
+
+
+def parse_province_history(text, start_date=START_DATE):
+    """
+    State of one EU4 province history file at start_date: the undated entries, then every dated
+    block up to start_date in chronological order, later values replacing earlier ones.
+    """
+    entries, _ = parse_block(TOKEN.findall(re.sub(r'#[^\n]*', '', text)))
+    state = {}
+    dated = []
+    for key, value in entries:
+        match = DATE.match(key)
+        if match:
+            date = tuple(int(part) for part in match.groups())
+            if date <= start_date and isinstance(value, list):
+                dated.append((date, value))
+        elif isinstance(value, str):
+            state[key] = value
+    for _, block in sorted(dated, key=lambda item: item[0]):
+        for key, value in block:
+            if isinstance(value, str):
+                state[key] = value
+    return state
+
+
+def load_province_history(directory, start_date=START_DATE):
+    """{old province number: history state} for every '<number> - <name>.txt' file in directory."""
+    history = {}
+    for file_name in sorted(os.listdir(directory)):
+        match = re.match(r'^(\d+)', file_name)
+        if not match or not file_name.endswith('.txt'):
+            continue
+        with open(os.path.join(directory, file_name), 'r', encoding='latin-1') as file:
+            history[int(match.group(1))] = parse_province_history(file.read(), start_date)
+    return history
+
+
+def parse_formula(formula):
+    """
+    Parse a pop formula: numbers, the FORMULA_VARIABLES, + - * / ** and parentheses. Anything
+    else raises ValueError. Returns the expression tree for evaluate_formula.
+    """
+    try:
+        tree = ast.parse(formula.strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError(f'Malformed formula {formula!r}: {error.msg}') from None
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp)) or type(node) in FORMULA_OPERATORS:
+            continue
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            continue
+        if isinstance(node, ast.Name) and node.id in FORMULA_VARIABLES:
+            continue
+        if isinstance(node, ast.Load):
+            continue
+        raise ValueError(f'Formula {formula!r} may only use numbers, {", ".join(FORMULA_VARIABLES)} '
+                         f'and + - * / **, not {ast.unparse(node) if isinstance(node, ast.expr) else type(node).__name__}')
+    return tree.body
+
+
+def evaluate_formula(node, variables):
+    """Evaluate a tree from parse_formula over the variables, which may be numpy arrays."""
+    if isinstance(node, ast.BinOp):
+        return FORMULA_OPERATORS[type(node.op)](evaluate_formula(node.left, variables),
+                                                evaluate_formula(node.right, variables))
+    if isinstance(node, ast.UnaryOp):
+        return FORMULA_OPERATORS[type(node.op)](evaluate_formula(node.operand, variables))
+    if isinstance(node, ast.Name):
+        return variables[node.id]
+    return float(node.value)
+
+
+def load_pop_formulas(formulas_file):
+    """
+    {pop type: parsed formula} from a csv with pop_type and formula columns. Formulas are
+    arithmetic over base_tax, base_production, base_manpower and development, giving the pop
+    size in thousands for the whole province.
+    """
+    formulas = {}
+    with open(formulas_file, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            try:
+                formulas[row['pop_type']] = parse_formula(row['formula'])
+            except ValueError as error:
+                raise ValueError(f"{formulas_file}, pop type {row['pop_type']}: {error}") from None
+    return formulas
+
+
+def load_building_mapping(buildings_file):
+    """{EU4 building: (EU5 building, level)} from a csv with eu4_building, eu5_building and level columns."""
+    with open(buildings_file, 'r', encoding='utf-8-sig') as file:
+        return {row['eu4_building']: (row['eu5_building'], int(row.get('level') or 1)) for row in csv.DictReader(file)}
+
+
+class DevelopmentConversion:
+    """
+    Province development and buildings of EU4 distributed over the EU5 locations.
+
+    Every array is indexed by location in the order of the location data. A province's pops are
+    split over its land locations by topography weight, and its buildings go to its location with
+    the highest weight (the first one on ties).
+    """
+    def __init__(self, data, history, formulas, building_mapping):
+        self.locations = [key for key, value in data.items() if value.get('old_province_number', '').isdigit()]
+        rows = [data[key] for key in self.locations]
+        self.culture = [row.get('culture', '') for row in rows]
+        self.religion = [row.get('religion', '') for row in rows]
+
+        numbers = np.array([int(row['old_province_number']) for row in rows], dtype=np.int64)
+        provinces, province_slot = np.unique(numbers, return_inverse=True)
+        variables = {field: np.array([float(history.get(number, {}).get(field, 0) or 0) for number in provinces])
+                     for field in DEVELOPMENT_FIELDS}
+        variables['development'] = sum(variables[field] for field in DEVELOPMENT_FIELDS)
+
+        weight = np.array([TOPOGRAPHY_WEIGHTS.get(row.get('topography', ''), 1.0)
+                           if row.get('location_type', 'land') == 'land' else 0.0 for row in rows])
+        weight_sum = np.bincount(province_slot, weights=weight, minlength=provinces.size)
+        share = np.divide(weight, weight_sum[province_slot], out=np.zeros_like(weight),
+                          where=weight_sum[province_slot] > 0)
+
+        self.pops = {}
+        for pop_type, formula in formulas.items():
+            size = evaluate_formula(formula, variables)
+            self.pops[pop_type] = np.round(np.broadcast_to(size, provinces.shape)[province_slot] * share, 3)
+
+        # Main location of each province: sort by province, then by descending weight, and take the first.
+        order = np.lexsort((-weight, province_slot))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = province_slot[order][1:] != province_slot[order][:-1]
+        main_location = order[first & (weight[order] > 0)]
+
+        self.buildings = {}
+        for index in main_location:
+            state = history.get(int(numbers[index]), {})
+            buildings = [building_mapping[key] for key, value in state.items()
+                         if key in building_mapping and value == 'yes']
+            if buildings:
+                self.buildings[self.locations[index]] = buildings
+
+    def write_pops(self, path, output=DIRECT_OUTPUT):
+        with output.open(path, encoding='utf-8-sig') as outfile:
+            outfile.write('locations = {\n')
+            for index, location in enumerate(self.locations):
+                pops = [(pop_type, sizes[index]) for pop_type, sizes in self.pops.items() if sizes[index] > 0]
+                if not pops:
+                    continue
+                culture = self.culture[index]
+                if culture != '' and not culture.endswith('_culture'):
+                    culture += '_culture'
+                outfile.write(f'\t{location} = {{\n')
+                for pop_type, size in pops:
+                    pop_string = f'\t\tdefine_pop = {{ type = {pop_type} size = {size:g}'
+                    if culture != '':
+                        pop_string += f' culture = {culture}'
+                    if self.religion[index] != '':
+                        pop_string += f' religion = {self.religion[index]}'
+                    outfile.write(pop_string + ' }\n')
+                outfile.write('\t}\n')
+            outfile.write('}\n')
+
+    def write_buildings(self, path, output=DIRECT_OUTPUT):
+        with output.open(path, encoding='utf-8-sig') as outfile:
+            outfile.write('locations = {\n')
+            for location, buildings in self.buildings.items():
+                outfile.write(f'\t{location} = {{\n')
+                for building, level in buildings:
+                    outfile.write(f'\t\tcreate_building = {{ type = {building} level = {level} }}\n')
+                outfile.write('\t}\n')
+            outfile.write('}\n')
+
+
+def convert_development(data, pops_file, buildings_file, history_dir=DEFAULT_HISTORY_DIR,
+                        formulas_file=DEFAULT_FORMULAS_FILE, building_mapping_file=DEFAULT_BUILDINGS_FILE,
+                        output=DIRECT_OUTPUT):
+    """Write the pops and buildings setup files for the location data from the EU4 province history."""
+    history = load_province_history(history_dir)
+    conversion = DevelopmentConversion(data, history, load_pop_formulas(formulas_file),
+                                       load_building_mapping(building_mapping_file))
+    conversion.write_pops(pops_file, output)
+    conversion.write_buildings(buildings_file, output)
+    total = sum(float(sizes.sum()) for sizes in conversion.pops.values())
+    print(f'development: {len(history)} province histories, {total:.1f}k pops over {len(conversion.locations)} '
+          f'locations, buildings in {len(conversion.buildings)} locations')
+    return conversion
+
+
+if __name__ == "__main__":
+    from transition_data import load_transition_data
+
+    if len(sys.argv) < 4:
+        print("Usage: python development_conversion.py <locations.csv> <pops_output.txt> <buildings_output.txt> [history_directory]")
+        print("\nExample:")
+        print("  python development_conversion.py anbennar_eu5_transition_data_locations_converted.csv "
+              "06_anb_pops.txt 07_anb_buildings.txt input/history/provinces")
+        sys.exit(1)
+
+    data = load_transition_data(sys.argv[1], 'location_name')
+    history_dir = sys.argv[4] if len(sys.argv) > 4 else DEFAULT_HISTORY_DIR
+    convert_development(data, sys.argv[2], sys.argv[3], history_dir)
@@ -0,0 +1,210 @@
+import csv
+import os
+import re
+import sys
+from collections import Counter
+
+from outputs import DIRECT_OUTPUT
+
+# Best candidates at or above this score are applied, lower ones are only reported.
+AUTO_APPLY_SCORE = 0.6
+# The majority culture or religion of the capital's area scores its share of the area times this.
+AREA_WEIGHT = 0.8
+# A ruler's country's culture or religion.
+COUNTRY_SCORE = 0.9
+
+DEFAULT_REPORT_FILE = os.path.join('reports', 'reference_resolutions.csv')
+
+FALLBACK_CULTURE = 'testorian_culture'
+FALLBACK_RELIGION = 'testorian_religion'
+UNRESOLVED = {'', 'not found', 'not found_dialect', 'unknown_religion'}
+
+SUFFIXES = re.compile(r'_(culture|dialect|language|religion)$')
+
+
+def trigrams(text):
+    """Character trigrams of a name, ignoring case, separators and type suffixes like _culture."""
+    text = SUFFIXES.sub('', text.lower()).replace('_', ' ').replace('-', ' ')
+    text = f"  {' '.join(text.split())} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from character trigrams to names. A search only visits the names sharing a
+    trigram with the query and scores them by Dice coefficient, 2 * shared / (|query| + |name|).
+    Every name points to a target, and a target is only returned once, with its best name.
+    """
+    def __init__(self):
+        self.names = []
+        self.targets = []
+        self.sizes = []
+        self.postings = {}
+
+    def add(self, name, target):
+        grams = trigrams(name)
+        name_id = len(self.names)
+        self.names.append(name)
+        self.targets.append(target)
+        self.sizes.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(name_id)
+
+    def search(self, text, limit=5):
+        """[(target, score, matched name)] for the best matching targets, best first."""
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        best = {}
+        for name_id, count in shared.items():
+            score = 2 * count / (len(grams) + self.sizes[name_id])
+            target = self.targets[name_id]
+            if target not in best or score > best[target][0]:
+                best[target] = (score, self.names[name_id])
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(target, score, name) for target, (score, name) in ranked[:limit]]
+
+
+def culture_index(cultures_data):
+    """Index of culture names and their language/dialect names, both pointing to the culture."""
+    index = TrigramIndex()
+    for culture, row in cultures_data.items():
+        index.add(culture, culture)
+        if row.get('language/dialect', ''):
+            index.add(row['language/dialect'], culture)
+    return index
+
+
+def religion_index(religions_data):
+    index = TrigramIndex()
+    for religion in religions_data:
+        index.add(religion, religion)
+    return index
+
+
+class ReferenceResolver:
+    """
+    Resolves country and ruler cultures and religions that are 'not found', blank or missing
+    from the culture and religion sheets.
+
+    Candidates come from the culture (or religion) of the capital or birth place location, the
+    majority of that location's area, the ruler's country and fuzzy matches of the original
+    value, the country name and court language against the culture, language/dialect and
+    religion names. The best candidate is applied if it scores at least AUTO_APPLY_SCORE,
+    otherwise the testorian placeholder is used. Every decision is kept for write_report.
+    """
+    def __init__(self, locations_data, cultures_data, religions_data, threshold=AUTO_APPLY_SCORE):
+        self.locations = locations_data
+        self.cultures = cultures_data
+        self.religions = religions_data
+        self.threshold = threshold
+
+        self.culture_index = culture_index(cultures_data)
+        self.religion_index = religion_index(religions_data)
+
+        self.area_cultures = {}
+        self.area_religions = {}
+        for row in locations_data.values():
+            area = row.get('area', '')
+            if row.get('culture', '') in cultures_data:
+                self.area_cultures.setdefault(area, Counter())[row['culture']] += 1
+            if row.get('religion', '') in religions_data:
+                self.area_religions.setdefault(area, Counter())[row['religion']] += 1
+
+        self.country_cultures = {}
+        self.country_religions = {}
+        self.resolutions = []
+
+    def _resolve(self, subject, column, value, known, index, location_column, area_counters, location_key,
+                 names, hints, fallback):
+        candidates = {}
+
+        def offer(target, score, source):
+            if target in known and score > candidates.get(target, (0, ''))[0]:
+                candidates[target] = (score, source)
+
+        for target, score, source in hints:
+            offer(target, score, source)
+        location = self.locations.get(location_key)
+        if location is not None:
+            offer(location.get(location_column, ''), 1.0, f'location {location_key}')
+            counter = area_counters.get(location.get('area', ''))
+            if counter:
+                target, count = counter.most_common(1)[0]
+                offer(target, AREA_WEIGHT * count / sum(counter.values()), f"area {location['area']}")
+        for name in [value, *names]:
+            if name not in UNRESOLVED:
+                for target, score, matched in index.search(name, limit=1):
+                    offer(target, score, f'name {name} ~ {matched}')
+
+        suggestion, (score, source) = max(candidates.items(), key=lambda item: item[1][0], default=('', (0, '')))
+        resolved = suggestion if score >= self.threshold else fallback
+        self.resolutions.append([subject, column, value, resolved, suggestion, f'{score:.2f}', source])
+        return resolved
+
+    def resolve_culture(self, subject, column, value, location_key='', names=(), hints=()):
+        return self._resolve(subject, column, value, self.cultures, self.culture_index, 'culture',
+                             self.area_cultures, location_key, names, hints, FALLBACK_CULTURE)
+
+    def resolve_religion(self, subject, column, value, location_key='', names=(), hints=()):
+        return self._resolve(subject, column, value, self.religions, self.religion_index, 'religion',
+                             self.area_religions, location_key, names, hints, FALLBACK_RELIGION)
+
+    def resolve_country(self, row):
+        """Resolve culture_definition and religion_definition of a countries row in place."""
+        tag = row.get('tag', '')
+        capital = row.get('capital', '')
+        names = [row.get('name', ''), row.get('court_language', '')]
+        if row.get('culture_definition', '') not in self.cultures:
+            row['culture_definition'] = self.resolve_culture(tag, 'culture_definition', row.get('culture_definition', ''),
+                                                             capital, names)
+        if row.get('religion_definition', '') not in self.religions:
+            row['religion_definition'] = self.resolve_religion(tag, 'religion_definition',
+                                                               row.get('religion_definition', ''), capital, names)
+        self.country_cultures[tag] = row['culture_definition']
+        self.country_religions[tag] = row['religion_definition']
+
+    def resolve_ruler(self, row):
+        """Resolve culture and religion of a rulers row in place. Countries must be resolved first."""
+        tag = row.get('tag', '')
+        character = row.get('character_tag', '')
+        birth_place = row.get('birth_place', '')
+        if row.get('culture', '') not in self.cultures:
+            hints = [(self.country_cultures.get(tag, ''), COUNTRY_SCORE, f'country {tag}')]
+            row['culture'] = self.resolve_culture(character, 'culture', row.get('culture', ''), birth_place,
+                                                  hints=hints)
+        if row.get('religion', '') not in self.religions:
+            hints = [(self.country_religions.get(tag, ''), COUNTRY_SCORE, f'country {tag}')]
+            row['religion'] = self.resolve_religion(character, 'religion', row.get('religion', ''), birth_place,
+                                                    hints=hints)
+
+    def write_report(self, path=DEFAULT_REPORT_FILE, output=DIRECT_OUTPUT):
+        """Write every resolution, applied or not, and print a summary."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with output.open(path, encoding='utf-8-sig', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['subject', 'column', 'value', 'resolved', 'best_candidate', 'score', 'source'])
+            writer.writerows(self.resolutions)
+        fallbacks = sum(1 for row in self.resolutions if row[3] in (FALLBACK_CULTURE, FALLBACK_RELIGION))
+        print(f'references: {len(self.resolutions) - fallbacks} resolved, {fallbacks} left as testorian '
+              f'placeholders, see {path}')
+
+
+if __name__ == "__main__":
+    from transition_data import load_transition_data
+
+    if len(sys.argv) < 3:
+        print("Usage: python fuzzy_resolver.py <culture|religion> <name> [<name> ...]")
+        print("\nLists the best matching cultures or religions for each name. Example:")
+        print("  python fuzzy_resolver.py culture dakinshi 'Bwa Dakinshi'")
+        sys.exit(1)
+
+    if sys.argv[1] == 'religion':
+        index = religion_index(load_transition_data('anbennar_eu5_transition_data_religions.csv', 'religion'))
+    else:
+        index = culture_index(load_transition_data('anbennar_eu5_transition_data_culture.csv', 'culture'))
+    for name in sys.argv[2:]:
+        print(name)
+        for target, score, matched in index.search(name):
+            print(f'  {score:.2f}  {target}  ({matched})')
@@ -0,0 +1,10 @@
+import hashlib
+
+
+def file_digest(path):
+    """blake2b hex digest of a file's content, read in chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
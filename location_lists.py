@@ -0,0 +1,87 @@
+import csv
+import os
+
+from outputs import DIRECT_OUTPUT
+
+# Operators usable in the rules file. Each takes the cell value and the rule value.
+OPERATORS = {
+    'equals': lambda cell, value: cell == value,
+    'not_equals': lambda cell, value: cell != value,
+    'startswith': lambda cell, value: cell.startswith(value),
+    'endswith': lambda cell, value: cell.endswith(value),
+    'contains': lambda cell, value: value in cell,
+    'in': lambda cell, value: cell in value.split('|'),
+    'blank': lambda cell, value: cell == '',
+    'not_blank': lambda cell, value: cell != '',
+}
+
+
+class LocationList:
+    """
+    A named list of locations defined by one or more rules, all of which must match.
+
+    A 'group' rule splits the list by the value of its column, so 'climate_{value}' with
+    'climate,group' produces one list per climate.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.conditions = []
+        self.group_column = None
+
+    def add_rule(self, column, operator, value):
+        if operator == 'group':
+            self.group_column = column
+        elif operator in OPERATORS:
+            self.conditions.append((column, OPERATORS[operator], value))
+        else:
+            raise ValueError(f'Unknown operator {operator!r} in location list {self.name!r}')
+
+    def classify(self, row):
+        """Return the output list name for a row, or None if the row does not match."""
+        for column, operator, value in self.conditions:
+            if not operator(row.get(column, ''), value):
+                return None
+        if self.group_column is None:
+            return self.name
+        group = row.get(self.group_column, '')
+        if group == '':
+            return None
+        return self.name.replace('{value}', group)
+
+
+def load_location_list_rules(rules_file):
+    """Load list definitions from a csv with list_name, column, operator and value columns."""
+    location_lists = {}
+    with open(rules_file, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            name = row['list_name']
+            if name not in location_lists:
+                location_lists[name] = LocationList(name)
+            location_lists[name].add_rule(row['column'], row['operator'], row.get('value') or '')
+    return list(location_lists.values())
+
+
+def classify_locations(locations_data, location_lists):
+    """
+    Evaluate every list for every location in a single pass.
+    Returns a dict of list name -> location names, in location order.
+    """
+    results = {location_list.name: [] for location_list in location_lists if location_list.group_column is None}
+    for row in locations_data.values():
+        for location_list in location_lists:
+            list_name = location_list.classify(row)
+            if list_name is not None:
+                results.setdefault(list_name, []).append(row.get('location_name', ''))
+    return results
+
+
+def write_location_lists(results, output_dir, output=DIRECT_OUTPUT):
+    """
+    Write each list as tab indented location names, ready to paste into the map files. They are
+    helpers, not mod files, so they go outside output/game and are not packaged.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for list_name, location_names in results.items():
+        with output.open(os.path.join(output_dir, list_name + '.txt'), encoding='utf-8') as f:
+            for location_name in location_names:
+                f.write('\t' + location_name + '\n')
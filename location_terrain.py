@@ -0,0 +1,240 @@
+import csv
+import os
+import sys
+
+import numpy as np
+
+from colours import BLANK, parse_hexcode
+from outputs import DIRECT_OUTPUT
+from raster_conversion import Bitmap
+
+DEFAULT_MAP_DIR = os.path.join('input', 'map')
+DEFAULT_MAPPING_FILE = os.path.join('input', 'terrain_mapping.csv')
+DEFAULT_REPORT_FILE = os.path.join('reports', 'location_terrain_disagreements.csv')
+
+# EU5 frame raster coloured with the location hexcodes, or the EU4 provinces raster and its definition.csv.
+# Only uncompressed bmp can be read: EU5 ships its rasters as png, save them as 24-bit bmp first, e.g.
+# 'magick locations.png -type TrueColor BMP3:locations.bmp'.
+LOCATIONS_RASTER = 'locations.bmp'
+PROVINCES_RASTER = 'provinces.bmp'
+PROVINCE_DEFINITIONS = 'definition.csv'
+
+# Rows of the rasters read at a time, which bounds memory on the 16384x8192 EU5 map.
+STRIPE_ROWS = 512
+
+
+def load_terrain_mapping(mapping_file):
+    """
+    Class mappings from a csv with raster, index, column and value columns.
+
+    raster is a bmp file in the map directory, index the palette index (0-255) of an 8-bit
+    raster or a '#' and the six digit hex colour of a 24-bit one, like #4080ff, column the
+    location column (topography, vegetation, climate) and value what that class means for it.
+    Returns {raster: {column: {code: value}}}.
+    """
+    rasters = {}
+    with open(mapping_file, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            index = row['index'].strip()
+            if index.startswith('#'):
+                code = parse_hexcode(index[1:]) if len(index) == 7 else BLANK
+            else:
+                code = int(index) if index.isdigit() and int(index) < 256 else BLANK
+            if code == BLANK:
+                raise ValueError(f"Malformed index {index!r} for {row['raster']} in {mapping_file}: use a palette "
+                                 f"index from 0 to 255 or a hex colour like #4080ff")
+            if not row['raster'].lower().endswith('.bmp'):
+                raise ValueError(f"{row['raster']} in {mapping_file}: only bmp rasters can be read, save it as bmp "
+                                 f"first")
+            rasters.setdefault(row['raster'], {}).setdefault(row['column'], {})[code] = row['value']
+    return rasters
+
+
+def has_map(map_dir=DEFAULT_MAP_DIR):
+    """Whether map_dir has a label raster to read the terrain from, as bmp or still as png."""
+    names = [LOCATIONS_RASTER, PROVINCES_RASTER]
+    names += [os.path.splitext(name)[0] + '.png' for name in names]
+    return any(os.path.exists(os.path.join(map_dir, name)) for name in names)
+
+
+def check_map_files(map_dir, mapping):
+    """
+    Raise FileNotFoundError unless map_dir has the label raster, locations.bmp or provinces.bmp
+    with its definition.csv, and every raster of the mapping. A png without its bmp is named as such.
+    """
+    def missing(name):
+        png = os.path.splitext(name)[0] + '.png'
+        if os.path.exists(os.path.join(map_dir, png)):
+            return f"'{name}' (found '{png}', save it as bmp)"
+        return f"'{name}'"
+
+    if os.path.exists(os.path.join(map_dir, LOCATIONS_RASTER)):
+        required = []
+    else:
+        required = [PROVINCES_RASTER, PROVINCE_DEFINITIONS]
+    required += list(mapping)
+    absent = [missing(name) for name in required if not os.path.exists(os.path.join(map_dir, name))]
+    if absent:
+        raise FileNotFoundError(f"Missing in {map_dir}: {', '.join(absent)}. The terrain needs '{LOCATIONS_RASTER}', "
+                                f"or '{PROVINCES_RASTER}' and '{PROVINCE_DEFINITIONS}', and the rasters of the mapping.")
+
+
+def lookup(codes, table):
+    """Vectorized dict lookup of integer codes. Codes missing from table give -1."""
+    keys = np.array(sorted(table), dtype=np.int64)
+    values = np.array([table[key] for key in sorted(table)], dtype=np.int64)
+    if keys.size == 0:
+        return np.full(codes.shape, -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(keys, codes), keys.size - 1)
+    return np.where(keys[positions] == codes, values[positions], -1)
+
+
+def pixel_codes(pixels):
+    """Palette indices of an 8-bit raster, or packed 0xRRGGBB colours of a 24-bit (BGR) one."""
+    if pixels.shape[2] == 1:
+        return pixels[..., 0].astype(np.int64)
+    return (pixels[..., 2].astype(np.int64) << 16) | (pixels[..., 1].astype(np.int64) << 8) | pixels[..., 0]
+
+
+def location_labels(data, map_dir):
+    """
+    Pick the label raster and number its regions.
+
+    Returns (label raster path, {colour: label id}, {location: label id}, label count). With the
+    EU5 locations raster every location has its own label. With the EU4 provinces raster the
+    label is the old province, shared by all locations with that old_province_number.
+    """
+    locations_path = os.path.join(map_dir, LOCATIONS_RASTER)
+    if os.path.exists(locations_path):
+        colour_labels = {}
+        location_label = {}
+        for key, value in data.items():
+            hexcode = parse_hexcode(value.get('hexcode', ''))
+            if hexcode != BLANK:
+                location_label[key] = colour_labels.setdefault(hexcode, len(colour_labels))
+        return locations_path, colour_labels, location_label, len(colour_labels)
+
+    province_label = {}
+    colour_labels = {}
+    with open(os.path.join(map_dir, PROVINCE_DEFINITIONS), 'r', encoding='latin-1') as file:
+        for row in csv.reader(file, delimiter=';'):
+            if len(row) < 4 or not row[0].isdigit():
+                continue
+            label = province_label.setdefault(row[0], len(province_label))
+            colour_labels[int(row[1]) << 16 | int(row[2]) << 8 | int(row[3])] = label
+    location_label = {key: province_label[value['old_province_number']] for key, value in data.items()
+                      if value.get('old_province_number', '') in province_label}
+    return os.path.join(map_dir, PROVINCES_RASTER), colour_labels, location_label, len(province_label)
+
+
+def majority_classes(label_path, colour_labels, label_count, mapping, map_dir):
+    """
+    Per label majority class of every mapped column.
+
+    Pixels of each stripe are combined into label * class_count + class and counted with one
+    bincount per column, so the whole map is a handful of vectorized passes. Returns
+    {column: (class values, majority class id per label, share of the majority, counted pixels)}.
+    """
+    label_raster = Bitmap(label_path)
+    columns = {}
+    rasters = []
+    for raster, column_mappings in mapping.items():
+        bitmap = Bitmap(os.path.join(map_dir, raster))
+        if (bitmap.width, bitmap.height) != (label_raster.width, label_raster.height):
+            raise ValueError(f"'{raster}' is {bitmap.width}x{bitmap.height}, but the label raster is "
+                             f"{label_raster.width}x{label_raster.height}; convert it with raster_conversion.py first.")
+        column_tables = {}
+        for column, classes in column_mappings.items():
+            values = columns.setdefault(column, [])
+            for class_value in classes.values():
+                if class_value not in values:
+                    values.append(class_value)
+            column_tables[column] = {code: values.index(class_value) for code, class_value in classes.items()}
+        rasters.append((bitmap, column_tables))
+
+    counts = {column: np.zeros(label_count * len(values), dtype=np.int64) for column, values in columns.items()}
+    for y in range(0, label_raster.height, STRIPE_ROWS):
+        labels = lookup(pixel_codes(label_raster.pixels[y:y + STRIPE_ROWS]), colour_labels)
+        labelled = labels >= 0
+        for bitmap, column_tables in rasters:
+            codes = pixel_codes(bitmap.pixels[y:y + STRIPE_ROWS])
+            for column, table in column_tables.items():
+                classes = lookup(codes, table)
+                mask = labelled & (classes >= 0)
+                combined = labels[mask] * len(columns[column]) + classes[mask]
+                counts[column] += np.bincount(combined, minlength=counts[column].size)
+
+    result = {}
+    for column, values in columns.items():
+        table = counts[column].reshape(label_count, len(values))
+        totals = table.sum(axis=1)
+        majority = table.argmax(axis=1)
+        share = np.divide(table.max(axis=1), totals, out=np.zeros(label_count), where=totals > 0)
+        result[column] = (values, majority, share, totals)
+    return result
+
+
+def apply_terrain_defaults(data, map_dir=DEFAULT_MAP_DIR, mapping_file=DEFAULT_MAPPING_FILE,
+                           report_file=DEFAULT_REPORT_FILE, output=DIRECT_OUTPUT):
+    """
+    Fill blank topography, vegetation and climate cells of the location data with the majority
+    class under each location on the map, and write the locations where a value already in the
+    sheet disagrees with the map to report_file. Returns the number of cells filled.
+    """
+    mapping = load_terrain_mapping(mapping_file)
+    if not mapping:
+        print(f'location terrain: {mapping_file} maps no raster classes, nothing filled')
+        return 0
+    check_map_files(map_dir, mapping)
+    label_path, colour_labels, location_label, label_count = location_labels(data, map_dir)
+    classes = majority_classes(label_path, colour_labels, label_count, mapping, map_dir)
+
+    filled = 0
+    disagreements = []
+    for key, value in data.items():
+        label = location_label.get(key)
+        if label is None:
+            continue
+        for column, (values, majority, share, totals) in classes.items():
+            if totals[label] == 0:
+                continue
+            map_value = values[majority[label]]
+            if value.get(column, '') == '':
+                value[column] = map_value
+                filled += 1
+            elif value[column] != map_value:
+                disagreements.append([value.get('old_province_number', ''), key, column, value[column], map_value,
+                                      f'{share[label]:.2f}'])
+
+    os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+    with output.open(report_file, encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['old_province_number', 'location', 'column', 'sheet_value', 'map_value', 'map_share'])
+        writer.writerows(sorted(disagreements, key=lambda row: (int(row[0] or 0), row[1], row[2])))
+    print(f'location terrain: {filled} blank cell(s) filled from the map, {len(disagreements)} disagreement(s) '
+          f'written to {report_file}')
+    return filled
+
+
+if __name__ == "__main__":
+    from transition_data import load_transition_data
+
+    if len(sys.argv) < 2:
+        print("Usage: python location_terrain.py <locations.csv> [map_directory] [terrain_mapping.csv]")
+        print("\nFills blank topography, vegetation and climate cells from the map and writes the result")
+        print("next to the input as <name>_terrain.csv. Example:")
+        print("  python location_terrain.py anbennar_eu5_transition_data_locations.csv input/map")
+        sys.exit(1)
+
+    csv_file = sys.argv[1]
+    map_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MAP_DIR
+    mapping_file = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_MAPPING_FILE
+    data = load_transition_data(csv_file, 'location_name')
+    apply_terrain_defaults(data, map_dir, mapping_file)
+
+    output_file = os.path.splitext(csv_file)[0] + '_terrain.csv'
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=list(next(iter(data.values())).keys()))
+        writer.writeheader()
+        writer.writerows(data.values())
+    print(f"Saved '{output_file}'")
@@ -1,8 +1,26 @@
 import csv
-import pandas as pd
+import fnmatch
+import itertools
 import os
 import re
 
+from colours import WHITE, check_hexcodes, format_colour, resolve_colours
+from location_lists import classify_locations, load_location_list_rules, write_location_lists
+from transition_data import TABLE_KEYS, TRANSITION_DATA_PREFIX, fill_hierarchy_placeholders, open_transition_sheet, \
+    transition_data_file, use_transition_store
+from stable_ids import StableIdAllocator
+from ownership_index import OwnershipIndex
+from name_lists import aggregate_characters, dynasty_key, fill_name_placeholders, load_character_history, ranked
+from location_terrain import apply_terrain_defaults, has_map
+from development_conversion import convert_development
+from fuzzy_resolver import ReferenceResolver
+from ontology import Ontology
+from outputs import DIRECT_OUTPUT
+
+# Read the transition sheets from a SQLite store built with transition_store.py instead of the csv files.
+if os.environ.get('ANB_TRANSITION_STORE'):
+    use_transition_store(os.environ['ANB_TRANSITION_STORE'])
+
 class Continent:
     instances = {}
     def __init__(self, name):
@@ -54,898 +72,985 @@ class Location:
         self.name = name
         self.prov_num_dict[prov_num] = self
         self.hexcode = hexcode
-        self.owner = None
-        self.cores = []
 
     def __repr__(self):
         return self.name
 
-# Load transition data from csv files
-def load_transition_data(csv_file, key_field, delimiter=','):
-    transition_data = {}
-    with open(csv_file, 'r', encoding='utf-8-sig') as file:
-        reader = csv.DictReader(file, delimiter=delimiter)
-        for row in reader:
-            key = row[key_field]  # Use the specified field as the key
-            transition_data[key] = row
-    return transition_data
-
-
-# Applying tag relevant tag conversions.
-tag_conversion_data = load_transition_data(csv_file='anbennar_eu5_transition_data_tag_conversion.csv',
-                                           key_field='old_tag')
-
-tag_conversion_dict = {}
-
-for old_tag, values in tag_conversion_data.items():
-    new_tag = values.get('new_tag', old_tag)
-    tag_conversion_dict[old_tag] = new_tag
-
-# Open locations.csv and apply tag conversions to owner and core fields
-# Furthermore, append suffix to province and location_name fields if there are duplicates.
-with open('anbennar_eu5_transition_data_locations.csv', 'r', encoding='utf-8-sig') as infile, \
-    open('anbennar_eu5_transition_data_locations_converted.csv', 'w', encoding='utf-8-sig', newline='') as outfile:
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-    writer.writeheader()
-    seen_provinces = {}
-    seen_locations = {}
-    for row in reader:
-        # Convert owner tag
-        owner_tag = row.get('owner', '')
-        if owner_tag in tag_conversion_dict:
-            row['owner'] = tag_conversion_dict[owner_tag]
-        
-        # Convert core tags
-        core_tags = row.get('cores', '').split(',')
-        converted_core_tags = []
-        for core_tag in core_tags:
-            core_tag = core_tag.strip()
-            if core_tag in tag_conversion_dict:
-                converted_core_tags.append(tag_conversion_dict[core_tag])
-            else:
-                converted_core_tags.append(core_tag)
-        row['cores'] = ','.join(converted_core_tags)
-
-        # Strip illegal characters from province and location name fields.
-        row['province'] = re.sub(r'[^a-z_0-9]', '', row.get('province', '').replace('-', '_').lower())
-        row['location_name'] = re.sub(r'[^a-z_0-9]', '', row.get('location_name', '').replace('-', '_').lower())
-
-        # Append suffix to province if duplicate
-        province_name = row.get('province', '')
-        if province_name in seen_provinces:
-            seen_provinces[province_name] += 1
-            row['province'] = f"{province_name}_{seen_provinces[province_name]}"
-        else:
-            seen_provinces[province_name] = 1
+class Country:
+    instances = {}
+    def __init__(self, superregion, tag):
+        superregion.countries.append(self)
+        self.instances[tag] = self
+        self.tag = tag
 
-        # Append suffix to location_name if duplicate
-        location_name = row.get('location_name', '')
-        if location_name in seen_locations:
-            seen_locations[location_name] += 1
-            row['location_name'] = f"{location_name}_{seen_locations[location_name]}"
-        else:
-            seen_locations[location_name] = 1
-
-        writer.writerow(row)
-
-# Open countries.csv and apply tag conversions to tag field
-with open('anbennar_eu5_transition_data_countries.csv', 'r', encoding='utf-8-sig') as infile, \
-    open('anbennar_eu5_transition_data_countries_converted.csv', 'w', encoding='utf-8-sig', newline='') as outfile:
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in reader:
-        # Convert country tag
-        country_tag = row.get('tag', '')
-        if country_tag in tag_conversion_dict:
-            row['tag'] = tag_conversion_dict[country_tag]
-
-        # Changing "not found" culture entries to "testorian_culture"
-        if row.get('culture_definition', '') == 'not found':
-            row['culture_definition'] = 'testorian_culture'
-
-        writer.writerow(row)
-
-# Open rulers.csv and apply tag conversions to tag field and the first 3 characters of character_tag field
-with open('anbennar_eu5_transition_data_rulers.csv', 'r', encoding='utf-8-sig') as infile, \
-    open('anbennar_eu5_transition_data_rulers_converted.csv', 'w', encoding='utf-8-sig', newline='') as outfile:
-    reader = csv.DictReader(infile)
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in reader:
-        # Convert country tag
-        country_tag = row.get('tag', '')
-        if country_tag in tag_conversion_dict:
-            row['tag'] = tag_conversion_dict[country_tag]
-        
-        # Convert first 3 characters of character_tag
-        character_tag = row.get('character_tag', '')
-        if len(character_tag) >= 3:
-            char_country_tag = character_tag[:3]
-            if char_country_tag in tag_conversion_dict:
-                new_char_country_tag = tag_conversion_dict[char_country_tag]
-                row['character_tag'] = new_char_country_tag + character_tag[3:]
-
-        # Changing "not found" culture entries to "testorian_culture"
-        if row.get('culture', '') == 'not found':
-            row['culture'] = 'testorian_culture'
-
-        writer.writerow(row)
-
-data = load_transition_data(csv_file='anbennar_eu5_transition_data_locations_converted.csv', key_field='location_name')
-
-# Replace - with _ in province and location_name fields
-# Need to rebuild the dictionary with updated keys
-# Also replace blank entries in superregion, region, and area with placeholders.
-updated_data = {}
-for key, value in data.items():
-    value['province'] = value['province'].replace('-', '_').replace("'", "")
-    value['location_name'] = value['location_name'].replace('-', '_').replace("'", "")
-    if not value['superregion']:
-        value['superregion'] = f'unknown_{value["continent"]}_superregion'
-
-    if not value['region']:
-        value['region'] = f'unknown_{value["superregion"]}_region'
-    
-    if not value['area']:
-        value['area'] = f'unknown_{value["region"]}_area'
-
-    # Use the updated location_name as the new key
-    updated_data[value['location_name']] = value
-
-data = updated_data
-
-# Sort data by continent, superregion, region, area, and province
-data = dict(sorted(data.items(), key=lambda item: (
-    item[1].get('continent', ''),
-    item[1].get('superregion', ''),
-    item[1].get('region', ''),
-    item[1].get('area', ''),
-    item[1].get('province', '')
-)))
-
-# Populate classses.
-for key, value in data.items():
-    continent_name = value.get('continent')
-    superregion_name = value.get('superregion')
-    region_name = value.get('region')
-    area_name = value.get('area')
-    province_name = value.get('province')
-    location_name = key
-    hexcode = value.get('hexcode', 'unknown_hexcode')
-    prov_num = int(value.get('old_province_number'))
-
-    # Create or get Continent
-    if continent_name in Continent.instances:
-        if continent.name == '':
-            continent.name = 'unknown_continent'
-        continent = Continent.instances[continent_name]
-    else:
-        continent = Continent(continent_name)
+def render_religion(template, religion_name, religious_group_name, religion_data, color):
+    new_string = str(template)
+    new_string = new_string.replace('PH_RELIGION_NAME', religion_name)
+    new_string = new_string.replace('PH_RELIGION_GROUP', religious_group_name)
+    new_string = new_string.replace('PH_RELIGION_COLOR', f'rgb {{ {color} }}')
 
-    # Create or get Superregion
-    if superregion_name in Superregion.instances:
-        if superregion.name == '':
-            superregion.name = f'unknown_{continent_name}_superregion'
-        superregion = Superregion.instances[superregion_name]
+    if religion_data.get('enable', '') != '':
+        new_string = new_string.replace('PH_ENABLE', f'\n\tenable = {religion_data.get("enable", "no")}\n')
     else:
-        superregion = Superregion(continent, superregion_name)
-
-    # Create or get Region
-    if region_name in Region.instances:
-        if region.name == '':
-            region.name = f'unknown_{superregion_name}_region'
-        region = Region.instances[region_name]
+        new_string = new_string.replace('PH_ENABLE', '')
+    return new_string
+
+def render_culture(template, culture_name, culture_group_name, culture_data, color):
+    if not culture_name.endswith('_culture'):
+        culture_name += '_culture'
+
+    new_string = str(template)
+    new_string = new_string.replace('PH_CULTURE_NAME', culture_name)
+    new_string = new_string.replace('PH_CULTURE_GROUP', culture_group_name)
+
+    language = culture_data.get('language/dialect', 'unknown_language')
+    new_string = new_string.replace('PH_LANGUAGE_NAME', language)
+    new_string = new_string.replace('PH_COLOR', f'rgb {{ {color} }}')
+    return new_string
+
+def render_language(template, language_name, family, color, names, dialects_string):
+    language_string = str(template)
+    language_string = language_string.replace('PH_LANGUAGE_NAME', language_name)
+    language_string = language_string.replace('PH_FAMILY', family)
+    language_string = language_string.replace('PH_COLOR', f'rgb {{ {color} }}')
+    language_string = fill_name_placeholders(language_string, names, '\t\t')
+    language_string = language_string.replace('PH_DIALECTS', dialects_string)
+    return language_string
+
+def render_dialect(template, dialect_name, names):
+    new_dialect_string = str(template)
+    new_dialect_string = fill_name_placeholders(new_dialect_string, names, '\t\t\t\t')
+    new_dialect_string = new_dialect_string.replace('PH_DIALECT', dialect_name)
+    return new_dialect_string
+
+def render_country_setup(template, country_tag, country_data, color):
+    new_string = str(template)
+    new_string = new_string.replace('PH_COUNTRY_TAG', country_tag)
+    new_string = new_string.replace('PH_COLOR', f'rgb {{ {color} }}')
+
+    culture = country_data.get('culture_definition', 'unknown_culture')
+    if culture == '':
+        culture = 'testorian_culture' # Placeholder default culture
+    if not culture.endswith('_culture'):
+        culture += '_culture'
+    new_string = new_string.replace('PH_CULTURE', culture)
+
+    religion = country_data.get('religion_definition', 'unknown_religion')
+    if religion == '':
+        religion = 'testorian_religion' # Placeholder default religion
+    new_string = new_string.replace('PH_RELIGION', religion)
+    return new_string
+
+def render_character(template, key, value):
+    new_string = str(template)
+    new_string = new_string.replace('PH_CHARACTER_TAG', key)
+    new_string = new_string.replace('PH_FIRST_NAME', value.get('first_name', '???'))
+    if value.get('nickname', '') != '':
+        nickname_string = f'\t\tnickname = {{ {value.get("nickname")} }}'
+        nickname_string = nickname_string.replace("'", "")
+        new_string = new_string.replace('PH_NICKNAME', nickname_string)
     else:
-        region = Region(superregion, region_name)
+        new_string = new_string.replace('PH_NICKNAME\n', '')
+
+    culture_string = value.get('culture', '???')
+    if not culture_string.endswith('_culture'):
+        culture_string += '_culture'
+    new_string = new_string.replace('PH_CULTURE', culture_string)
 
-    # Create or get Area
-    if area_name in Area.instances:
-        if area.name == '':
-            area.name = f'unknown_{region_name}_area'
-        area = Area.instances[area_name]
+    new_string = new_string.replace('PH_RELIGION', value.get('religion', '???'))
+    if value.get('female', 'probably_male') == 'yes':
+        new_string = new_string.replace('PH_FEMALE', '\t\tfemale = yes')
     else:
-        area = Area(region, area_name) 
-    
-    # Create or get Province
-    if province_name in Province.instances:
-        # If province name is already in instances, append a suffix to make it unique.
-        province_name += f'_{len(Province.instances)}'
-        province = Province(area, province_name, prov_num)
+        new_string = new_string.replace('PH_FEMALE\n', '')
+    if value.get('adm', '') != 0:
+        adm = value.get('adm', '0')
+        dip = value.get('dip', '0')
+        mil = value.get('mil', '0')
+        new_string = new_string.replace('PH_STATS', f'\t\tadm = {adm} dip = {dip} mil = {mil}')
     else:
-        province = Province(area, province_name, prov_num)
-    
-    # Create Location
-    if location_name in Location.instances:
-        # If location name is already in instances, append a suffix to make it unique.
-        location_name += f'_{len(Location.instances)}'
-        location = Location(province, location_name, prov_num, hexcode)
+        new_string = new_string.replace('PH_STATS\n', '')
+    new_string = new_string.replace('PH_BIRTH_DATE', value.get('birth_date', '1.1.1'))
+    if value.get('death_date', '') != '':
+        new_string = new_string.replace('PH_DEATH_DATE', f'\t\tdeath_date = {value.get("death_date")}')
     else:
-        location = Location(province, location_name, prov_num, hexcode)
-
-
-with open('output\\game\\in_game\\map_data\\named_locations\\00_default.txt', 'w', encoding='utf-8-sig') as outfile:
-    for continent in Continent.instances.values():
-        outfile.write('##### ' + continent.name + '\n')
-        for superregion in continent.superregions:
-            outfile.write('#### ' + superregion.name + '\n')
-            for region in superregion.regions:
-                outfile.write('### ' + region.name + '\n')
-                for area in region.areas:
-                    outfile.write('## ' + area.name + '\n')
-                    for province in area.provinces:
-                        outfile.write('# ' + province.name + '\n')
-                        for location in province.locations:
-                            outfile.write(f"{location.name} = {location.hexcode}\n")
-
-with open('output\\game\\in_game\\map_data\\definitions.txt', 'w', encoding='utf-8-sig') as def_file:
-    for continent in Continent.instances.values():
-        def_file.write(f'{continent.name} = {{\n')
-        for superregion in continent.superregions:
-            def_file.write(f'\t{superregion.name} = {{\n')
-            for region in superregion.regions:
-                def_file.write(f'\t\t{region.name} = {{\n')
-                for area in region.areas:
-                    def_file.write(f'\t\t\t{area.name} = {{\n')
-                    for province in area.provinces:
-                        province_name_string = province.name
-                        if not province_name_string.endswith('_province'):
-                            province_name_string += '_province'
-                        province_string = f'\t\t\t\t{province_name_string} = {{'
-                        for location in province.locations:
-                            province_string += f' {location.name}'
-                        province_string += ' }\n'
-                        def_file.write(province_string)
-                    def_file.write('\t\t\t}\n')
-                def_file.write('\t\t}\n')
-            def_file.write('\t}\n')
-        def_file.write('}\n')
-
-with open('output\\game\\in_game\\map_data\\location_templates.txt', 'w', encoding='utf-8-sig') as template_file:
-    for continent in Continent.instances.values():
-        template_file.write(f'##### Continent: {continent.name}\n')
-        for superregion in continent.superregions:
-            template_file.write(f'#### Superregion: {superregion.name}\n')
-            for region in superregion.regions:
-                template_file.write(f'### Region: {region.name}\n')
-                for area in region.areas:
-                    template_file.write(f'## Area: {area.name}\n')
-                    for province in area.provinces:
-                        template_file.write(f'# Province: {province.name}\n')
-                        for location in province.locations:
-                            value = data[location.name]
-                            name = value.get('location_name', 'unknown_location')
-                            topography = value.get('topography', 'unknown_topography')
-                            vegetation = value.get('vegetation', 'unknown_vegetation')
-                            climate = value.get('climate', 'unknown_climate')
-                            religion = value.get('religion', 'unknown_religion')
-                            culture = value.get('culture', 'unknown_culture')
-                            raw_material = value.get('raw_material', 'unknown_raw_material')
-                            natural_harbor_suitability = value.get('natural_harbor_suitability', None)
-
-                            location_template_string = f"{name} = {{ "
-                            location_template_string += f"topography = {topography} "
-                            if vegetation != '':
-                                location_template_string += f"vegetation = {vegetation} "
-                            location_template_string += f"climate = {climate} "
-                            if religion != '':
-                                location_template_string += f"religion = {religion} "
-                            if culture != '':
-                                if not culture.endswith('_culture'):
-                                    culture += '_culture'
-                                location_template_string += f"culture = {culture} "
-                            if raw_material != '':
-                                location_template_string += f"raw_material = {raw_material} "
-                            if natural_harbor_suitability != '':
-                                location_template_string += f"natural_harbor_suitability = {natural_harbor_suitability} "
-                            location_template_string += "}\n"
-                            
-                            template_file.write(location_template_string)
-
-religious_groups_data = load_transition_data(csv_file='anbennar_eu5_transition_data_religious_groups.csv', 
-                                             key_field='religious_group')
-religions_data = load_transition_data(csv_file='anbennar_eu5_transition_data_religions.csv',
-                                      key_field='religion')
-
-with open('output//game//in_game//common//religion_groups//anb_default.txt', 'w', encoding='utf-8-sig') as religious_groups_file:
-    for key, value in religious_groups_data.items():
-        color = value.get('color', '255 255 255').strip('(').strip(')').replace(',', '')
-        string = f'{key} = {{\n'
-        string += f'\tcolor = rgb {{ {color} }}\n'
-        string += f'\tconvert_slaves_at_start = {value.get("convert_slaves_at_start", "no")}\n'
-        string += '}\n\n'
-
-        religious_groups_file.write(string)
-
-# Load template as base for religion files.
-with open('templates/anb_religion_template.txt', 'r', encoding='utf-8') as f:
-    religion_placeholder_template = f.read()
-
-class ReligiousGroup:
-    instances = {}
-    def __init__(self, name):
-        self.instances[name] = self
-        self.name = name
-        self.religions = []
-
-class Religion:
-    instances = {}
-    def __init__(self, religious_group: ReligiousGroup, name):
-        self.instances[name] = self
-        religious_group.religions.append(self)
-        self.name = name
-
-# Populate classes.
-for key, value in religions_data.items():
-    religious_group_name = value.get('religious_group', 'unknown_religious_group')
-    religion_name = key
-
-    # Create or get ReligiousGroup
-    if religious_group_name in ReligiousGroup.instances:
-        religious_group = ReligiousGroup.instances[religious_group_name]
+        new_string = new_string.replace('PH_DEATH_DATE\n', '')
+    if value.get('ruler_term_start', '') != '':
+        new_string = new_string.replace('PH_REIGN_START', f'\t\truler_term_start = {value.get("ruler_term_start")}')
     else:
-        religious_group = ReligiousGroup(religious_group_name)
-
-    # Create Religion
-    religion = Religion(religious_group, religion_name)
-
-
-for religious_group in ReligiousGroup.instances.values():
-    with open('output//game//in_game//common//religions//' + religious_group.name +'.txt', 'w', encoding='utf-8-sig') as group_file:
-        for religion in religious_group.religions:            
-            # Get the data for THIS specific religion
-            religion_data = religions_data[religion.name]
-            
-            new_string = str(religion_placeholder_template)
-            new_string = new_string.replace('PH_RELIGION_NAME', religion.name)
-            new_string = new_string.replace('PH_RELIGION_GROUP', religious_group.name)
-            
-            color = religion_data.get('color', '255 255 255').strip('(').strip(')').replace(',', '')
-            new_string = new_string.replace('PH_RELIGION_COLOR', f'rgb {{ {color} }}')
-            
-            if religion_data.get('enable', '') != '':
-                new_string = new_string.replace('PH_ENABLE', f'\n\tenable = {religion_data.get("enable", "no")}\n')
-            else:
-                new_string = new_string.replace('PH_ENABLE', '')
-
-            group_file.write(new_string)
-
-cultures_data = load_transition_data(csv_file='anbennar_eu5_transition_data_culture.csv',
-                                     key_field='culture')
-
-# Load template as base for culture files.
-with open('templates/anb_culture_template.txt', 'r', encoding='utf-8') as f:
-    culture_placeholder_template = f.read()
-
-# Classes for cultures
-class CultureGroup:
-    instances = {}
-    def __init__(self, name):
-        self.instances[name] = self
-        self.name = name
-        self.cultures = []
-
-class Culture:
-    instances = {}
-    def __init__(self, culture_group: CultureGroup, name):
-        self.instances[name] = self
-        culture_group.cultures.append(self)
-        self.name = name
-
-# Populate classes.
-for key, value in cultures_data.items():
-    culture_group_name = value.get('culture_groups', 'unknown_culture_group')
-    culture_name = key
-
-    # Create or get CultureGroup
-    if culture_group_name in CultureGroup.instances:
-        culture_group = CultureGroup.instances[culture_group_name]
+        new_string = new_string.replace('PH_REIGN_START\n', '')
+    if value.get('ruler_term_end', '') != '':
+        new_string = new_string.replace('PH_REIGN_END', f'\t\truler_term_end = {value.get("ruler_term_end")}')
     else:
-        culture_group = CultureGroup(culture_group_name)
-
-    # Create Culture
-    culture = Culture(culture_group, culture_name)
-
-# Generate culture files
-with open('output//game//in_game//common//culture_groups//00_culture_groups.txt', 'w', encoding='utf-8-sig') as culture_groups_file:
-    for culture_group in CultureGroup.instances.values():
-        culture_group_name = culture_group.name
-        if culture_group_name.endswith('_group'):
-            culture_group_name = culture_group_name[:-6] + '_culture_group'
-        elif not culture_group_name.endswith('_culture_group'):
-            culture_group_name += '_culture_group'
-
-        culture_groups_file.write(f'{culture_group_name} = {{\n')
-        culture_groups_file.write('\t# country_modifier = { }\n')
-        culture_groups_file.write('\t# character_modifier = { }\n')
-        culture_groups_file.write('\t# location_modifier = { }\n')
-        culture_groups_file.write('}\n')
-        culture_groups_file.write('\n')
-        
-        with open('output//game//in_game//common//cultures//' + culture_group.name +'.txt', 'w', encoding='utf-8-sig') as group_file:
-            for culture in culture_group.cultures:
-                culture_data = cultures_data[culture.name]
-
-                culture_name = culture.name
-                if not culture_name.endswith('_culture'):
-                    culture_name += '_culture'
-                
-                new_string = str(culture_placeholder_template)
-                new_string = new_string.replace('PH_CULTURE_NAME', culture_name)
-                new_string = new_string.replace('PH_CULTURE_GROUP', culture_group_name)
-                
-                language = culture_data.get('language/dialect', 'unknown_language')
-                new_string = new_string.replace('PH_LANGUAGE_NAME', language)
-                
-                color = culture_data.get('color', '255 255 255').strip('(').strip(')').replace(',', '')
-                new_string = new_string.replace('PH_COLOR', f'rgb {{ {color} }}')
-
-                group_file.write(new_string)
-
-# Load languages and dialects.
-languages_data = load_transition_data(csv_file='anbennar_eu5_transition_data_language.csv',
-                                      key_field='language')
-dialects_data = load_transition_data(csv_file='anbennar_eu5_transition_data_dialects.csv',
-                                     key_field='dialect')
-
-# Classes
-class Language:
-    instances = {}
-    def __init__(self, name):
-        self.instances[name] = self
-        self.name = name
-        self.dialects = []
-
-class Dialect:
-    instances = {}
-    def __init__(self, language: Language, name):
-        self.instances[name] = self
-        language.dialects.append(self)
-        self.name = name
-
-# Populate classes
-for key, value in languages_data.items():
-    language_name = key
-
-    # Create Language
-    language = Language(language_name)
+        new_string = new_string.replace('PH_REIGN_END\n', '')
+    new_string = new_string.replace('PH_PLACE_OF_BIRTH', value.get('birth_place', '???'))
+    dynasty = dynasty_key(value.get('dynasty', ''))
+    if dynasty != '':
+        new_string = new_string.replace('PH_DYNASTY', dynasty)
+    else:
+        new_string = new_string.replace('\t\tdynasty = PH_DYNASTY\n', '')
+    new_string = new_string.replace('PH_TAG', value.get('tag', '???'))
+
+    new_string = new_string.replace('-', '_')
+    return new_string
+
+def render_country_history(template, country_tag, country_data, owned_core, owned_non_core, unowned_core, sorted_rulers):
+    country_string = str(template)
+    country_string = country_string.replace('PH_COUNTRY_TAG', country_tag)
+    capital = country_data.get('capital', 'unknown_capital')
+    country_string = country_string.replace('PH_CAPITAL', capital)
+    court_language = country_data.get('court_language', 'unknown_court_language')
+    country_string = country_string.replace('PH_COURT_LANGUAGE', court_language)
+
+    owned_non_core_provinces_strings = '\n'.join(f'\t\t{name}' for name in owned_non_core)
+    if owned_non_core_provinces_strings != '':
+        country_string = country_string.replace('PH_OWNED_NON_CORE_PROVINCES', owned_non_core_provinces_strings)
+    else:
+        country_string = country_string.replace('PH_OWNED_NON_CORE_PROVINCES\n', '')
 
-for key, value in dialects_data.items():
-    language_name = value.get('language', 'unknown_language')
-    dialect_name = key
+    owned_core_provinces_strings = '\n'.join(f'\t\t{name}' for name in owned_core)
+    if owned_core_provinces_strings != '':
+        country_string = country_string.replace('PH_OWNED_CORE_PROVINCES', owned_core_provinces_strings)
+    else:
+        country_string = country_string.replace('PH_OWNED_CORE_PROVINCES\n', '')
 
-    # Get Language
-    if language_name in Language.instances:
-        language = Language.instances[language_name]
+    unowned_core_provinces_strings = '\n'.join(f'\t\t{name}' for name in unowned_core)
+    if unowned_core_provinces_strings != '':
+        country_string = country_string.replace('PH_UNOWNED_CORE_PROVINCES', unowned_core_provinces_strings)
     else:
-        language = Language(language_name)
-
-    # Create Dialect
-    dialect = Dialect(language, dialect_name)
-
-# Load templates
-with open('templates/anb_language_template.txt', 'r', encoding='utf-8') as f:
-    language_placeholder_template = f.read()
-
-with open('templates/anb_dialect_template.txt', 'r', encoding='utf-8') as f:
-    dialect_placeholder_template = f.read()
-
-# Generate language and dialect files
-for language in Language.instances.values():
-    with open('output//game//in_game//common//languages//' + language.name +'.txt', 'w', encoding='utf-8-sig') as lang_file:
-        # Language template
-        language_data = languages_data.get(language.name, {})
-        language_string = str(language_placeholder_template)
-        language_string = language_string.replace('PH_LANGUAGE_NAME', language.name)
-        
-        color = language_data.get('color', '255 255 255').strip('(').strip(')').replace(',', '')
-        language_string = language_string.replace('PH_COLOR', f'rgb {{ {color} }}')
-
-        dialects_string = ''
-
-        # Dialects
-        for dialect in language.dialects:
-            dialect_data = dialects_data.get(dialect.name, {})
-            new_dialect_string = str(dialect_placeholder_template)
-            new_dialect_string = new_dialect_string.replace('PH_DIALECT', dialect.name)
-            
-            dialects_string += new_dialect_string
-            if dialect != language.dialects[-1]:
-                dialects_string += '\n'
-
-        language_string = language_string.replace('PH_DIALECTS', dialects_string)
-
-        lang_file.write(language_string)
-
-# Load countries
-countries_data = load_transition_data(csv_file='anbennar_eu5_transition_data_countries_converted.csv',
-                                      key_field='tag')
-
-# Generate country setup files
-with open('templates/anb_country_setup_template.txt', 'r', encoding='utf-8') as f:
-    country_placeholder_template = f.read()
-
-unknown_superregion = Superregion(Continent('unknown_continent'), 'unknown_superregion')
-
-# Generating loc for continents, superregions, regions, areas, provinces, locations
-with open ('input\\loc\\continents.yml', 'r', encoding='utf-8-sig') as infile:
-    lines = infile.readlines()
-    for line in lines:
-        line = line.split('#')[0]  # Remove comments
-        if len(line.strip()) == 0:
-            continue
-
-        if line.startswith('l_english:'):
-            continue
-        else:
-            parts = line.split(':')
-            continent_name = parts[0].strip()
-            continent_loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
-            continent_loc = continent_loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
-
-            Continent.instances[continent_name].loc = f'{continent_name}:{continent_loc}'
-
-with open('input\\loc\\anb_regions_l_english.yml', 'r', encoding='utf-8-sig') as infile:
-    lines = infile.readlines()
-    for line in lines:
-        line = line.split('#')[0]  # Remove comments
-        if len(line.strip()) == 0:
-            continue
-
-        if line.startswith('l_english:'):
-            continue
-        else:
-            parts = line.split(':')
-            name = parts[0].strip()
-            loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
-            loc = loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
-
-            if name in Region.instances:
-                Region.instances[name].loc = f'{name}:{loc}'
-            elif name in Superregion.instances:
-                Superregion.instances[name].loc = f'{name}:{loc}'
-
-with open('input\\loc\\anb_areas_l_english.yml', 'r', encoding='utf-8-sig') as infile:
-    lines = infile.readlines()
-    for line in lines:
-        line = line.split('#')[0]  # Remove comments
-        if len(line.strip()) == 0:
-            continue
-
-        if line.startswith('l_english:'):
-            continue
+        country_string = country_string.replace('PH_UNOWNED_CORE_PROVINCES\n', '')
+
+    # Ruler terms, sorted by start date of reign.
+    ruler_terms_string = ''
+    for ruler_key, ruler_value in sorted_rulers:
+        character = ruler_key
+        term_start = ruler_value.get('ruler_term_start', '')
+        term_end = ruler_value.get('ruler_term_end', '')
+        regnal_number = ruler_value.get('regnal_number', '')
+        ruler_terms_string += f'\t\truler_term = {{ character = {ruler_key} start_date = {term_start} TERM_END_PLACEHOLDER REGNAL_NUMBER_PLACEHOLDER }}\n'
+        if term_end != '':
+            ruler_terms_string = ruler_terms_string.replace('TERM_END_PLACEHOLDER', f'end_date = {term_end}')
         else:
-            parts = line.split(':')
-            name = parts[0].strip()
-
-            if name.endswith('_name') or name.endswith('_adj'):
-                continue
+            ruler_terms_string = ruler_terms_string.replace('TERM_END_PLACEHOLDER ', '')
 
-            loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
-            loc = loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
-
-            if name in Area.instances:
-                Area.instances[name].loc = f'{name}:{loc}'
-
-with open('input\\loc\\prov_names_l_english.yml', 'r', encoding='utf-8-sig') as infile:
-    lines = infile.readlines()
-    for line in lines:
-        line = line.split('#')[0]  # Remove comments
-        if len(line.strip()) == 0:
-            continue
-
-        if line.startswith('l_english:'):
-            continue
+        if regnal_number != '':
+            ruler_terms_string = ruler_terms_string.replace('REGNAL_NUMBER_PLACEHOLDER', f'regnal_number = {regnal_number[0]}')
         else:
-            parts = line.split(':')
-            
-            prov_num = parts[0].strip().replace("PROV", "")
-            # Check that prov_num is a valid integer, if not continue.
-            try:
-                prov_num = int(prov_num)
-            except ValueError:
+            ruler_terms_string = ruler_terms_string.replace('REGNAL_NUMBER_PLACEHOLDER ', '')
+
+    country_string = country_string.replace('PH_RULER_TERMS', ruler_terms_string)
+    return country_string
+
+def read_template(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def converted_row(row, fieldnames):
+    """row as it reads back from a csv written with csv.DictWriter."""
+    return {name: '' if row.get(name) is None else str(row[name]) for name in fieldnames}
+
+class RenderMemo:
+    """
+    Rendered text of each entity with the arguments it was rendered from. The render function is
+    only called again when the arguments differ from the last call for the same entity, so a
+    rebuild re-renders just the entities whose rows, colours, names or templates changed.
+    """
+    def __init__(self):
+        self.entries = {}   # (render function name, entity key) -> (arguments, text)
+        self.rendered = 0
+
+    def render(self, function, key, *args):
+        entry = self.entries.get((function.__name__, key))
+        if entry is not None and entry[0] == args:
+            return entry[1]
+        text = function(*args)
+        self.entries[(function.__name__, key)] = (args, text)
+        self.rendered += 1
+        return text
+
+# Build steps in run order: the step, the inputs it reads ('sheet:<table>' for a transition sheet,
+# otherwise a glob pattern) and the steps whose results it uses. A step reruns when one of its
+# inputs changed or one of the steps it uses reran.
+STEPS = [
+    ('convert_locations', ['sheet:tag_conversion', 'sheet:locations'], []),
+    ('resolve_references', ['sheet:countries', 'sheet:rulers', 'sheet:culture', 'sheet:religions'],
+     ['convert_locations']),
+    ('location_data', ['input/map/*', 'input/terrain_mapping.csv'], ['convert_locations']),
+    ('hierarchy', [], ['location_data']),
+    ('load_ontology', ['sheet:culture', 'sheet:language', 'sheet:dialects', 'sheet:language_families', 'sheet:religions'],
+     []),
+    ('religions', ['sheet:religious_groups', 'templates/anb_religion_template.txt'], ['load_ontology']),
+    ('cultures', ['templates/anb_culture_template.txt'], ['load_ontology']),
+    ('aggregate_names', ['input/characters/*.csv'], ['resolve_references']),
+    ('languages', ['templates/anb_language_template.txt', 'templates/anb_dialect_template.txt'],
+     ['load_ontology', 'aggregate_names']),
+    ('localisation', ['input/loc/*.yml'], ['hierarchy']),
+    ('country_setup', ['templates/anb_country_setup_template.txt'], ['resolve_references', 'hierarchy']),
+    ('characters', ['templates/anb_character_template.txt'], ['resolve_references']),
+    ('dynasties', [], ['aggregate_names']),
+    ('country_history', ['templates/anb_10_countries_template_file.txt',
+                         'templates/anb_10_countries_template_country.txt'],
+     ['resolve_references', 'location_data', 'country_setup']),
+    ('location_lists', ['input/location_lists.csv'], ['location_data']),
+    ('development', ['input/history/provinces/*.txt', 'input/pop_formulas.csv', 'input/building_mapping.csv'],
+     ['location_data']),
+]
+
+class TransitionBuild:
+    """
+    Converts the transition sheets into the mod files, one step of STEPS at a time.
+
+    Output files are opened through output, see outputs.py. The parsed sheets, the map hierarchy
+    and the rendered entities stay on the build, so a long-running process (watch.py) can call run()
+    again with the changed input paths and only redo the affected steps and entities. The hierarchy
+    and Country classes keep their instances on the class, so only one build runs at a time.
+    """
+    def __init__(self, output=DIRECT_OUTPUT, data_dir='.'):
+        self.output = output
+        self.data_dir = data_dir
+        self.sheets = {}       # table -> (fieldnames, rows) as read from the sheet
+        self.row_changes = {}  # table -> keys of the rows that changed in the last reload
+        self.memo = RenderMemo()
+        self.colours = {}      # table -> (keys and colour cells, resolved colours)
+        self.stable_ids = StableIdAllocator('input//location_stable_ids.csv')
+
+    def run(self, changed_paths=None):
+        """
+        Run the steps affected by changed_paths, the input files that changed since the last run,
+        or every step if changed_paths is None. Returns the names of the steps that ran.
+        """
+        changed_sheets = set()
+        if changed_paths is not None:
+            changed_paths = [os.path.normpath(path) for path in changed_paths]
+            changed_sheets = self.reload_sheets(changed_paths)
+        ran = []
+        for step, inputs, uses in STEPS:
+            if changed_paths is None or any(name in ran for name in uses) \
+                    or self.inputs_changed(inputs, changed_sheets, changed_paths):
+                getattr(self, step)()
+                ran.append(step)
+        return ran
+
+    def inputs_changed(self, inputs, changed_sheets, changed_paths):
+        for pattern in inputs:
+            if pattern.startswith('sheet:'):
+                if pattern[len('sheet:'):] in changed_sheets:
+                    return True
+            elif any(fnmatch.fnmatch(path, os.path.normpath(pattern)) for path in changed_paths):
+                return True
+        return False
+
+    def reload_sheets(self, changed_paths):
+        """Read the changed sheets again. Returns the tables whose rows actually changed."""
+        changed = set()
+        self.row_changes = {}
+        for path in changed_paths:
+            name = os.path.basename(path)
+            if os.path.normpath(os.path.dirname(path) or '.') != os.path.normpath(self.data_dir) \
+                    or not name.startswith(TRANSITION_DATA_PREFIX) or not name.endswith('.csv'):
                 continue
-            
-            if prov_num not in Province.prov_num_dict:
+            table = name[len(TRANSITION_DATA_PREFIX):-len('.csv')]
+            if table not in TABLE_KEYS:
                 continue
-
-            prov_name = Province.prov_num_dict[prov_num].name
-            prov_loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
-            prov_loc = prov_loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
-            prov_loc = prov_loc.replace('_', ' ')  # Replace underscores with spaces for loc
-
-            Province.prov_num_dict[prov_num].loc = f'{prov_name}_province:{prov_loc}'
-            Location.prov_num_dict[prov_num].loc = f'{prov_name}:{prov_loc}'
-
-# Set loc for unknown continents, superregions, regions, and areas
-for continent in Continent.instances.values():
-    if not hasattr(continent, 'loc'):
-        continent.loc = f'{continent.name}: "UNKNOWN CONTINENT"'
-    for superregion in continent.superregions:
-        if not hasattr(superregion, 'loc'):
-            superregion.loc = f'{superregion.name}: "UNKNOWN SUPERREGION"'
-        for region in superregion.regions:
-            if not hasattr(region, 'loc'):
-                region.loc = f'{region.name}: "UNKNOWN REGION"'
-            for area in region.areas:
-                if not hasattr(area, 'loc'):
-                    area.loc = f'{area.name}: "UNKNOWN AREA"'
-
-with open('output\\game\\main_menu\\localization\\english\\province_names_l_english.yml', 'w', encoding='utf-8-sig') as province_loc_file, \
-     open('output\\game\\main_menu\\localization\\english\\location_names\\location_names_l_english.yml', 'w', encoding='utf-8-sig') as location_loc_file, \
-     open('output\\game\\main_menu\\localization\\english\\area_l_english.yml', 'w', encoding='utf-8-sig') as area_loc_file, \
-     open('output\\game\\main_menu\\localization\\english\\region_names_l_english.yml', 'w', encoding='utf-8-sig') as region_loc_file:
-
-    province_loc_file.write('l_english:\n')
-    location_loc_file.write('l_english:\n')
-    area_loc_file.write('l_english:\n')
-    region_loc_file.write('l_english:\n')
-
-    for continent in Continent.instances.values():
-        location_loc_file.write(f' ##### Continent: {continent.name}\n')
-        province_loc_file.write(f' #### Continent: {continent.name}\n')
-        area_loc_file.write(f' ### Continent: {continent.name}\n')
-        region_loc_file.write(f' ## Continent: {continent.name}\n')
-        region_loc_file.write(' ' + continent.loc + '\n')
-        for superregion in continent.superregions:
-            location_loc_file.write(f' #### Superregion: {superregion.name}\n')
-            province_loc_file.write(f' ### Superregion: {superregion.name}\n')
-            area_loc_file.write(f' ## Superregion: {superregion.name}\n')
-            region_loc_file.write(f' # Superregion: {superregion.name}\n')
-            region_loc_file.write(' ' + superregion.loc + '\n')
-            for region in superregion.regions:
-                location_loc_file.write(f' ### Region: {region.name}\n')
-                province_loc_file.write(f' ## Region: {region.name}\n')
-                area_loc_file.write(f' # Region: {region.name}\n')
-                region_loc_file.write(' ' + region.loc + '\n')
-                for area in region.areas:
-                    location_loc_file.write(f' ## Area: {area.name}\n')
-                    province_loc_file.write(f' # Area: {area.name}\n')
-                    area_loc_file.write(' ' + area.loc + '\n')
-                    for province in area.provinces:
-                        location_loc_file.write(f' # Province: {province.name}\n')
-                        if hasattr(province, 'loc'):
-                            province_loc_file.write(' ' + province.loc + '\n')
-                        for location in province.locations:
-                            if hasattr(location, 'loc'):
-                                location_loc_file.write(' ' + location.loc + '\n')
-
-class Country:
-    instances = {}
-    def __init__(self, superregion, tag):
-        superregion.countries.append(self)
-        self.instances[tag] = self
-        self.tag = tag
-        self.owned_non_core_provinces = []
-        self.owned_core_provinces = []
-        self.unowned_core_provinces = []
-
-for key, value in countries_data.items():
-    superregion_name = value.get('capital_superregion', 'unknown_superregion')
-    country_tag = key
-
-    # Get Superregion
-    if superregion_name in Superregion.instances:
-        superregion = Superregion.instances[superregion_name]
-    else:
-        superregion = unknown_superregion
-
-    # Create Country
-    country = Country(superregion, country_tag)
-
-for superregion in Superregion.instances.values():
-    with open('output//game//in_game//setup//countries//' + superregion.name +'.txt', 'w', encoding='utf-8-sig') as superregion_file:
-        for country in superregion.countries:
-            country_tag = country.tag
-            country_data = countries_data.get(country_tag, {})
-
-            color = country_data.get('color', '255 255 255').strip('(').strip(')').replace(',', '')
-            new_string = str(country_placeholder_template)
-            new_string = new_string.replace('PH_COUNTRY_TAG', country_tag)
-            new_string = new_string.replace('PH_COLOR', f'rgb {{ {color} }}')
-            
-            culture = country_data.get('culture_definition', 'unknown_culture')
-            if culture == '':
-                culture = 'testorian_culture' # Placeholder default culture
-            if not culture.endswith('_culture'):
-                culture += '_culture'
-            new_string = new_string.replace('PH_CULTURE', culture)
-            
-            religion = country_data.get('religion_definition', 'unknown_religion')
-            if religion == '':
-                religion = 'testorian_religion' # Placeholder default religion
-            new_string = new_string.replace('PH_RELIGION', religion)
-
-            superregion_file.write(new_string)
-
-# Load rulers
-rulers = load_transition_data(csv_file='anbennar_eu5_transition_data_rulers_converted.csv',
-                              key_field='character_tag')
-
-# Sort by tag_continent, tag_superregion, tag, character_tag
-rulers = dict(sorted(rulers.items(), key=lambda item: (
-    item[1].get('tag_continent', ''),
-    item[1].get('tag_superregion', ''),
-    item[1].get('tag', ''),
-    item[0]
-)))
-
-with open('templates/anb_character_template.txt', 'r', encoding='utf-8') as f:
-    character_placeholder_template = f.read()
-
-with open('output\\game\\main_menu\\setup\\start\\05_anb_characters.txt', 'w', encoding='utf-8-sig') as rulers_file:
-    for key, value in rulers.items():
-        new_string = str(character_placeholder_template)
-        new_string = new_string.replace('PH_CHARACTER_TAG', key)
-        new_string = new_string.replace('PH_FIRST_NAME', value.get('first_name', '???'))
-        if value.get('nickname', '') != '':
-            nickname_string = f'\t\tnickname = {{ {value.get("nickname")} }}'
-            nickname_string = nickname_string.replace("'", "")
-            new_string = new_string.replace('PH_NICKNAME', nickname_string)
-        else:
-            new_string = new_string.replace('PH_NICKNAME\n', '')
-
-        culture_string = value.get('culture', '???')
-        if not culture_string.endswith('_culture'):
-            culture_string += '_culture'
-        new_string = new_string.replace('PH_CULTURE', culture_string)
-        
-        new_string = new_string.replace('PH_RELIGION', value.get('religion', '???'))
-        if value.get('female', 'probably_male') == 'yes':
-            new_string = new_string.replace('PH_FEMALE', '\t\tfemale = yes')
-        else:
-            new_string = new_string.replace('PH_FEMALE\n', '')
-        if value.get('adm', '') != 0:
-            adm = value.get('adm', '0')
-            dip = value.get('dip', '0')
-            mil = value.get('mil', '0')
-            new_string = new_string.replace('PH_STATS', f'\t\tadm = {adm} dip = {dip} mil = {mil}')
-        else:
-            new_string = new_string.replace('PH_STATS\n', '')
-        new_string = new_string.replace('PH_BIRTH_DATE', value.get('birth_date', '1.1.1'))
-        if value.get('death_date', '') != '':
-            new_string = new_string.replace('PH_DEATH_DATE', f'\t\tdeath_date = {value.get("death_date")}')
-        else:
-            new_string = new_string.replace('PH_DEATH_DATE\n', '')
-        if value.get('ruler_term_start', '') != '':
-            new_string = new_string.replace('PH_REIGN_START', f'\t\truler_term_start = {value.get("ruler_term_start")}')
-        else:
-            new_string = new_string.replace('PH_REIGN_START\n', '')
-        if value.get('ruler_term_end', '') != '':
-            new_string = new_string.replace('PH_REIGN_END', f'\t\truler_term_end = {value.get("ruler_term_end")}')
-        else:
-            new_string = new_string.replace('PH_REIGN_END\n', '')
-        new_string = new_string.replace('PH_PLACE_OF_BIRTH', value.get('birth_place', '???'))
-        new_string = new_string.replace('PH_DYNASTY', value.get('dynasty', '???'))
-        new_string = new_string.replace('PH_TAG', value.get('tag', '???'))
-
-        new_string = new_string.replace('-', '_')
-
-        rulers_file.write(new_string)
-
-# Creating 10_countries.txt
-locations_data = data
-
-# Assign rulers to countries
-ruler_dicts = {}
-for key, value in rulers.items():
-    country_tag = value.get('tag', '')
-    if country_tag not in ruler_dicts:
-        ruler_dicts[country_tag] = {}
-    ruler_dicts[country_tag][key] = value
-
-# Assign ownership and cores.
-for location_key, location_values in locations_data.items():
-    location = Location.instances.get(location_key)
-    location_owner_tag = location_values.get('owner', '')
-    location_owner_country = Country.instances.get(location_owner_tag)
-
-    location_core_tags = location_values.get('cores', '').split(',')
-    for core_tag in location_core_tags:
-        core_country = Country.instances.get(core_tag)
-        if core_country:
-            location.cores.append(core_country)
-
-    if location_owner_country:
-        location.owner = location_owner_country
-        if location_owner_tag in location_core_tags:
-            location_owner_country.owned_core_provinces.append(location)
-        else:
-            location_owner_country.owned_non_core_provinces.append(location)
-    for core_tag in location_core_tags:
-        if core_tag != location_owner_tag:
-            core_country = Country.instances.get(core_tag)
-            if core_country:
-                core_country.unowned_core_provinces.append(location)
-
-with open('templates/anb_10_countries_template_file.txt', 'r', encoding='utf-8') as f:
-    entire_file_template = f.read()
-
-with open('templates/anb_10_countries_template_country.txt', 'r', encoding='utf-8') as f:
-    single_country_template = f.read()
-
-with open('output\\game\\main_menu\\setup\\start\\10_countries.txt', 'w', encoding='utf-8-sig') as country_setup_file:
-    output_string = str(entire_file_template)
-    countries_string = ''
-    for country in Country.instances.values():
-        country_data = countries_data.get(country.tag, {})
-        country_string = str(single_country_template)
-        country_string = country_string.replace('PH_COUNTRY_TAG', country.tag)
-        capital = country_data.get('capital', 'unknown_capital')
-        country_string = country_string.replace('PH_CAPITAL', capital)
-        court_language = country_data.get('court_language', 'unknown_court_language')
-        country_string = country_string.replace('PH_COURT_LANGUAGE', court_language)
-
-        owned_non_core_provinces_strings = ''
-        for province in country.owned_non_core_provinces:
-            owned_non_core_provinces_strings += f'\t\t{province.name}'
-            if province != country.owned_non_core_provinces[-1]:
-                owned_non_core_provinces_strings += '\n'
-        if owned_non_core_provinces_strings != '':
-            country_string = country_string.replace('PH_OWNED_NON_CORE_PROVINCES', owned_non_core_provinces_strings)
-        else:
-            country_string = country_string.replace('PH_OWNED_NON_CORE_PROVINCES\n', '')
-
-        owned_core_provinces_strings = ''
-        for province in country.owned_core_provinces:
-            owned_core_provinces_strings += f'\t\t{province.name}'
-            if province != country.owned_core_provinces[-1]:
-                owned_core_provinces_strings += '\n'
-        if owned_core_provinces_strings != '':
-            country_string = country_string.replace('PH_OWNED_CORE_PROVINCES', owned_core_provinces_strings)
-        else:
-            country_string = country_string.replace('PH_OWNED_CORE_PROVINCES\n', '')
-
-        unowned_core_provinces_strings = ''
-        for province in country.unowned_core_provinces:
-            unowned_core_provinces_strings += f'\t\t{province.name}'
-            if province != country.unowned_core_provinces[-1]:
-                unowned_core_provinces_strings += '\n'
-        if unowned_core_provinces_strings != '':
-            country_string = country_string.replace('PH_UNOWNED_CORE_PROVINCES', unowned_core_provinces_strings)
-        else:
-            country_string = country_string.replace('PH_UNOWNED_CORE_PROVINCES\n', '')
-
-        # Ruler terms.
-        ruler_terms_string = ''
-        # Sort rulers by start date of reign
-        sorted_rulers = sorted(ruler_dicts.get(country.tag, {}).items(), key=lambda item: item[1].get('ruler_term_start', ''))
-
-        for ruler_key, ruler_value in sorted_rulers:
-            character = ruler_key
-            term_start = ruler_value.get('ruler_term_start', '')
-            term_end = ruler_value.get('ruler_term_end', '')
-            regnal_number = ruler_value.get('regnal_number', '')
-            ruler_terms_string += f'\t\truler_term = {{ character = {ruler_key} start_date = {term_start} TERM_END_PLACEHOLDER REGNAL_NUMBER_PLACEHOLDER }}\n'
-            if term_end != '':
-                ruler_terms_string = ruler_terms_string.replace('TERM_END_PLACEHOLDER', f'end_date = {term_end}')
+            old = self.sheets.pop(table, None)
+            new = self.sheet(table)
+            if old == new:
+                continue
+            changed.add(table)
+            if old is not None:
+                key_field = TABLE_KEYS[table]
+                old_rows = {row.get(key_field): row for row in old[1]}
+                new_rows = {row.get(key_field): row for row in new[1]}
+                self.row_changes[table] = sorted(key for key in old_rows.keys() | new_rows.keys()
+                                                 if old_rows.get(key) != new_rows.get(key))
+        return changed
+
+    def sheet(self, table):
+        """(fieldnames, rows) of a transition sheet, read once and kept until it changes."""
+        if table not in self.sheets:
+            with open_transition_sheet(transition_data_file(table, self.data_dir)) as reader:
+                self.sheets[table] = (list(reader.fieldnames), list(reader))
+        return self.sheets[table]
+
+    def table(self, table, key_field):
+        """Copies of a sheet's rows by key_field, the last row winning, like load_transition_data."""
+        return {row[key_field]: dict(row) for row in self.sheet(table)[1]}
+
+    def resolve_colours(self, table_name, data):
+        """resolve_colours, reusing the last result for a table while its keys and colour cells are unchanged."""
+        cells = [(key, value.get('color')) for key, value in data.items()]
+        cached = self.colours.get(table_name)
+        if cached is None or cached[0] != cells:
+            cached = (cells, resolve_colours(table_name, data, output=self.output))
+            self.colours[table_name] = cached
+        return cached[1]
+
+    def convert_locations(self):
+        # Applying tag relevant tag conversions.
+        tag_conversion_data = self.table('tag_conversion', 'old_tag')
+
+        self.tag_conversion_dict = {}
+
+        for old_tag, values in tag_conversion_data.items():
+            new_tag = values.get('new_tag', old_tag)
+            self.tag_conversion_dict[old_tag] = new_tag
+
+        tag_conversion_dict = self.tag_conversion_dict
+        self.stable_ids.start_run()
+
+        # Open locations.csv and apply tag conversions to owner and core fields
+        # Furthermore, append a stable suffix to province and location_name fields if there are duplicates.
+        fieldnames, rows = self.sheet('locations')
+        self.converted_locations = []
+        with self.output.open(transition_data_file('locations_converted', self.data_dir), newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in rows:
+                row = dict(row)
+                # Convert owner tag
+                owner_tag = row.get('owner', '')
+                if owner_tag in tag_conversion_dict:
+                    row['owner'] = tag_conversion_dict[owner_tag]
+
+                # Convert core tags
+                core_tags = row.get('cores', '').split(',')
+                converted_core_tags = []
+                for core_tag in core_tags:
+                    core_tag = core_tag.strip()
+                    if core_tag in tag_conversion_dict:
+                        converted_core_tags.append(tag_conversion_dict[core_tag])
+                    else:
+                        converted_core_tags.append(core_tag)
+                row['cores'] = ','.join(converted_core_tags)
+
+                # Strip illegal characters from province and location name fields.
+                row['province'] = re.sub(r'[^a-z_0-9]', '', row.get('province', '').replace('-', '_').lower())
+                row['location_name'] = re.sub(r'[^a-z_0-9]', '', row.get('location_name', '').replace('-', '_').lower())
+
+                # Append suffix to province and location_name if duplicate, reusing suffixes from earlier runs.
+                old_province_number = row.get('old_province_number', '')
+                row['province'] = self.stable_ids.allocate('province', old_province_number, row['province'])
+                row['location_name'] = self.stable_ids.allocate('location', old_province_number, row['location_name'])
+
+                writer.writerow(row)
+                self.converted_locations.append(converted_row(row, fieldnames))
+
+        self.stable_ids.save(self.output)
+
+    def resolve_references(self):
+        tag_conversion_dict = self.tag_conversion_dict
+
+        # Suggests cultures and religions for countries and rulers from their capital, area and names.
+        reference_resolver = ReferenceResolver(
+            {row['location_name']: row for row in self.converted_locations},
+            self.table('culture', 'culture'),
+            self.table('religions', 'religion'))
+
+        # Open countries.csv and apply tag conversions to tag field
+        fieldnames, rows = self.sheet('countries')
+        self.countries_data = {}
+        with self.output.open(transition_data_file('countries_converted', self.data_dir), newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in rows:
+                row = dict(row)
+                # Convert country tag
+                country_tag = row.get('tag', '')
+                if country_tag in tag_conversion_dict:
+                    row['tag'] = tag_conversion_dict[country_tag]
+
+                # Resolve "not found" and missing cultures and religions, falling back to the testorian placeholders.
+                reference_resolver.resolve_country(row)
+
+                writer.writerow(row)
+                row = converted_row(row, fieldnames)
+                self.countries_data[row['tag']] = row
+
+        # Open rulers.csv and apply tag conversions to tag field and the first 3 characters of character_tag field
+        fieldnames, rows = self.sheet('rulers')
+        rulers = {}
+        with self.output.open(transition_data_file('rulers_converted', self.data_dir), newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in rows:
+                row = dict(row)
+                # Convert country tag
+                country_tag = row.get('tag', '')
+                if country_tag in tag_conversion_dict:
+                    row['tag'] = tag_conversion_dict[country_tag]
+
+                # Convert first 3 characters of character_tag
+                character_tag = row.get('character_tag', '')
+                if len(character_tag) >= 3:
+                    char_country_tag = character_tag[:3]
+                    if char_country_tag in tag_conversion_dict:
+                        new_char_country_tag = tag_conversion_dict[char_country_tag]
+                        row['character_tag'] = new_char_country_tag + character_tag[3:]
+
+                # Resolve "not found" and missing cultures and religions, falling back to the testorian placeholders.
+                reference_resolver.resolve_ruler(row)
+
+                writer.writerow(row)
+                row = converted_row(row, fieldnames)
+                rulers[row['character_tag']] = row
+
+        reference_resolver.write_report(output=self.output)
+
+        # Sort by tag_continent, tag_superregion, tag, character_tag
+        self.rulers = dict(sorted(rulers.items(), key=lambda item: (
+            item[1].get('tag_continent', ''),
+            item[1].get('tag_superregion', ''),
+            item[1].get('tag', ''),
+            item[0]
+        )))
+
+    def location_data(self):
+        data = {row['location_name']: dict(row) for row in self.converted_locations}
+
+        # Replace - with _ in province and location_name fields
+        # Need to rebuild the dictionary with updated keys
+        # Also replace blank entries in superregion, region, and area with placeholders.
+        updated_data = {}
+        for key, value in data.items():
+            value['province'] = value['province'].replace('-', '_').replace("'", "")
+            value['location_name'] = value['location_name'].replace('-', '_').replace("'", "")
+            fill_hierarchy_placeholders(value)
+
+            # Use the updated location_name as the new key
+            updated_data[value['location_name']] = value
+
+        data = updated_data
+
+        # Sort data by continent, superregion, region, area, and province
+        data = dict(sorted(data.items(), key=lambda item: (
+            item[1].get('continent', ''),
+            item[1].get('superregion', ''),
+            item[1].get('region', ''),
+            item[1].get('area', ''),
+            item[1].get('province', '')
+        )))
+
+        # Map hexcodes must be unique.
+        check_hexcodes(data)
+
+        # Fill blank topography, vegetation and climate from the map rasters in input/map, see input/terrain_mapping.csv.
+        if has_map():
+            apply_terrain_defaults(data, output=self.output)
+
+        self.data = data
+
+    def hierarchy(self):
+        data = self.data
+        for cls in (Continent, Superregion, Region, Area, Province, Location):
+            cls.instances = {}
+        Province.prov_num_dict = {}
+        Location.prov_num_dict = {}
+
+        # Populate classses.
+        for key, value in data.items():
+            continent_name = value.get('continent')
+            superregion_name = value.get('superregion')
+            region_name = value.get('region')
+            area_name = value.get('area')
+            province_name = value.get('province')
+            location_name = key
+            hexcode = value.get('hexcode', 'unknown_hexcode')
+            prov_num = int(value.get('old_province_number'))
+
+            # Create or get Continent
+            if continent_name in Continent.instances:
+                if continent.name == '':
+                    continent.name = 'unknown_continent'
+                continent = Continent.instances[continent_name]
             else:
-                ruler_terms_string = ruler_terms_string.replace('TERM_END_PLACEHOLDER ', '')
+                continent = Continent(continent_name)
 
-            if regnal_number != '':
-                ruler_terms_string = ruler_terms_string.replace('REGNAL_NUMBER_PLACEHOLDER', f'regnal_number = {regnal_number[0]}')
+            # Create or get Superregion
+            if superregion_name in Superregion.instances:
+                if superregion.name == '':
+                    superregion.name = f'unknown_{continent_name}_superregion'
+                superregion = Superregion.instances[superregion_name]
             else:
-                ruler_terms_string = ruler_terms_string.replace('REGNAL_NUMBER_PLACEHOLDER ', '')
-
-        country_string = country_string.replace('PH_RULER_TERMS', ruler_terms_string)
-
-        countries_string += country_string + '\n'
+                superregion = Superregion(continent, superregion_name)
 
-    countries_string = countries_string.replace('\n', '\n\t\t')
-
-    output_string = output_string.replace('PH_COUNTRIES', countries_string)
-    country_setup_file.write(output_string)
-
-with open('sea_zones.txt', 'w', encoding='utf-8') as f:
-    for location in locations_data.values():
-        if location.get('location_type', '') == 'sea':
-            f.write('\t' + location.get('location_name', '') + '\n')
+            # Create or get Region
+            if region_name in Region.instances:
+                if region.name == '':
+                    region.name = f'unknown_{superregion_name}_region'
+                region = Region.instances[region_name]
+            else:
+                region = Region(superregion, region_name)
 
-with open('wasteland.txt', 'w', encoding='utf-8') as f:
-    for location in locations_data.values():
-        if location.get('topography', '').endswith('_wasteland'):
-            f.write('\t' + location.get('location_name', '') + '\n')
\ No newline at end of file
+            # Create or get Area
+            if area_name in Area.instances:
+                if area.name == '':
+                    area.name = f'unknown_{region_name}_area'
+                area = Area.instances[area_name]
+            else:
+                area = Area(region, area_name)
+
+            # Create Province and Location. Names are already unique, see StableIdAllocator.
+            province = Province(area, province_name, prov_num)
+            location = Location(province, location_name, prov_num, hexcode)
+
+
+        with self.output.open('output\\game\\in_game\\map_data\\named_locations\\00_default.txt') as outfile:
+            for continent in Continent.instances.values():
+                outfile.write('##### ' + continent.name + '\n')
+                for superregion in continent.superregions:
+                    outfile.write('#### ' + superregion.name + '\n')
+                    for region in superregion.regions:
+                        outfile.write('### ' + region.name + '\n')
+                        for area in region.areas:
+                            outfile.write('## ' + area.name + '\n')
+                            for province in area.provinces:
+                                outfile.write('# ' + province.name + '\n')
+                                for location in province.locations:
+                                    outfile.write(f"{location.name} = {location.hexcode}\n")
+
+        with self.output.open('output\\game\\in_game\\map_data\\definitions.txt') as def_file:
+            for continent in Continent.instances.values():
+                def_file.write(f'{continent.name} = {{\n')
+                for superregion in continent.superregions:
+                    def_file.write(f'\t{superregion.name} = {{\n')
+                    for region in superregion.regions:
+                        def_file.write(f'\t\t{region.name} = {{\n')
+                        for area in region.areas:
+                            def_file.write(f'\t\t\t{area.name} = {{\n')
+                            for province in area.provinces:
+                                province_name_string = province.name
+                                if not province_name_string.endswith('_province'):
+                                    province_name_string += '_province'
+                                province_string = f'\t\t\t\t{province_name_string} = {{'
+                                for location in province.locations:
+                                    province_string += f' {location.name}'
+                                province_string += ' }\n'
+                                def_file.write(province_string)
+                            def_file.write('\t\t\t}\n')
+                        def_file.write('\t\t}\n')
+                    def_file.write('\t}\n')
+                def_file.write('}\n')
+
+        with self.output.open('output\\game\\in_game\\map_data\\location_templates.txt') as template_file:
+            for continent in Continent.instances.values():
+                template_file.write(f'##### Continent: {continent.name}\n')
+                for superregion in continent.superregions:
+                    template_file.write(f'#### Superregion: {superregion.name}\n')
+                    for region in superregion.regions:
+                        template_file.write(f'### Region: {region.name}\n')
+                        for area in region.areas:
+                            template_file.write(f'## Area: {area.name}\n')
+                            for province in area.provinces:
+                                template_file.write(f'# Province: {province.name}\n')
+                                for location in province.locations:
+                                    value = data[location.name]
+                                    name = value.get('location_name', 'unknown_location')
+                                    topography = value.get('topography', 'unknown_topography')
+                                    vegetation = value.get('vegetation', 'unknown_vegetation')
+                                    climate = value.get('climate', 'unknown_climate')
+                                    religion = value.get('religion', 'unknown_religion')
+                                    culture = value.get('culture', 'unknown_culture')
+                                    raw_material = value.get('raw_material', 'unknown_raw_material')
+                                    natural_harbor_suitability = value.get('natural_harbor_suitability', None)
+
+                                    location_template_string = f"{name} = {{ "
+                                    location_template_string += f"topography = {topography} "
+                                    if vegetation != '':
+                                        location_template_string += f"vegetation = {vegetation} "
+                                    location_template_string += f"climate = {climate} "
+                                    if religion != '':
+                                        location_template_string += f"religion = {religion} "
+                                    if culture != '':
+                                        if not culture.endswith('_culture'):
+                                            culture += '_culture'
+                                        location_template_string += f"culture = {culture} "
+                                    if raw_material != '':
+                                        location_template_string += f"raw_material = {raw_material} "
+                                    if natural_harbor_suitability != '':
+                                        location_template_string += f"natural_harbor_suitability = {natural_harbor_suitability} "
+                                    location_template_string += "}\n"
+
+                                    template_file.write(location_template_string)
+
+        # Countries whose capital superregion is unknown, and the continent listing it in the loc.
+        self.unknown_superregion = Superregion(Continent('unknown_continent'), 'unknown_superregion')
+
+    def load_ontology(self):
+        self.religions_data = self.table('religions', 'religion')
+        self.cultures_data = self.table('culture', 'culture')
+        self.languages_data = self.table('language', 'language')
+        dialects_data = self.table('dialects', 'dialect')
+        self.language_families_data = self.table('language_families', 'language_family')
+
+        # Culture, language and religion hierarchies.
+        self.ontology = Ontology.build(self.cultures_data, self.languages_data, dialects_data,
+                                       self.language_families_data, self.religions_data)
+
+    def religions(self):
+        ontology = self.ontology
+        religious_groups_data = self.table('religious_groups', 'religious_group')
+        religions_data = self.religions_data
+
+        # Parse colours once, giving blank or duplicated ones a well separated replacement.
+        religious_group_colours = self.resolve_colours('religious_groups', religious_groups_data)
+        religion_colours = self.resolve_colours('religions', religions_data)
+
+        with self.output.open('output//game//in_game//common//religion_groups//anb_default.txt') as religious_groups_file:
+            for key, value in religious_groups_data.items():
+                color = format_colour(religious_group_colours[key])
+                string = f'{key} = {{\n'
+                string += f'\tcolor = rgb {{ {color} }}\n'
+                string += f'\tconvert_slaves_at_start = {value.get("convert_slaves_at_start", "no")}\n'
+                string += '}\n\n'
+
+                religious_groups_file.write(string)
+
+        # Load template as base for religion files.
+        religion_placeholder_template = read_template('templates/anb_religion_template.txt')
+
+        for religious_group in ontology.all('religious_group'):
+            with self.output.open('output//game//in_game//common//religions//' + religious_group +'.txt') as group_file:
+                for religion in ontology.members('religious_group', religious_group, 'religion'):
+                    # Get the data for THIS specific religion
+                    religion_data = religions_data[religion]
+                    color = format_colour(religion_colours[religion])
+
+                    group_file.write(self.memo.render(render_religion, religion, religion_placeholder_template,
+                                                      religion, religious_group, religion_data, color))
+
+    def cultures(self):
+        ontology = self.ontology
+        cultures_data = self.cultures_data
+        culture_colours = self.resolve_colours('cultures', cultures_data)
+
+        # Load template as base for culture files.
+        culture_placeholder_template = read_template('templates/anb_culture_template.txt')
+
+        # Generate culture files
+        with self.output.open('output//game//in_game//common//culture_groups//00_culture_groups.txt') as culture_groups_file:
+            for culture_group in ontology.all('culture_group'):
+                culture_group_name = culture_group
+                if culture_group_name.endswith('_group'):
+                    culture_group_name = culture_group_name[:-6] + '_culture_group'
+                elif not culture_group_name.endswith('_culture_group'):
+                    culture_group_name += '_culture_group'
+
+                culture_groups_file.write(f'{culture_group_name} = {{\n')
+                culture_groups_file.write('\t# country_modifier = { }\n')
+                culture_groups_file.write('\t# character_modifier = { }\n')
+                culture_groups_file.write('\t# location_modifier = { }\n')
+                culture_groups_file.write('}\n')
+                culture_groups_file.write('\n')
+
+                with self.output.open('output//game//in_game//common//cultures//' + culture_group +'.txt') as group_file:
+                    for culture in ontology.members('culture_group', culture_group, 'culture'):
+                        culture_data = cultures_data[culture]
+                        color = format_colour(culture_colours[culture])
+
+                        group_file.write(self.memo.render(render_culture, culture, culture_placeholder_template,
+                                                          culture, culture_group_name, culture_data, color))
+
+    def aggregate_names(self):
+        # Aggregate rulers and imported character history into name lists and dynasties in one pass.
+        self.name_lists = aggregate_characters(itertools.chain(self.rulers.values(),
+                                                               load_character_history('input//characters')))
+
+    def languages(self):
+        ontology = self.ontology
+        name_lists = self.name_lists
+        language_colours = self.resolve_colours('languages', self.languages_data)
+        language_family_colours = self.resolve_colours('language_families', self.language_families_data)
+
+        # Generate language families
+        with self.output.open('output//game//in_game//common//language_families//anb_language_families.txt') as families_file:
+            for language_family in ontology.all('language_family'):
+                color = format_colour(language_family_colours.get(language_family, WHITE))
+                families_file.write(f'{language_family} = {{\n')
+                families_file.write(f'\tcolor = rgb {{ {color} }}\n')
+                families_file.write('}\n')
+                families_file.write('\n')
+
+        # Load templates
+        language_placeholder_template = read_template('templates/anb_language_template.txt')
+        dialect_placeholder_template = read_template('templates/anb_dialect_template.txt')
+
+        # Generate language and dialect files
+        for language in ontology.all('language'):
+            with self.output.open('output//game//in_game//common//languages//' + language +'.txt') as lang_file:
+                # Dialects, with the name lists of the cultures using them.
+                dialect_strings = []
+                for dialect in ontology.members('language', language, 'dialect'):
+                    names = name_lists.names_for(ontology.members('dialect', dialect, 'culture'))
+                    dialect_strings.append(self.memo.render(render_dialect, dialect, dialect_placeholder_template,
+                                                            dialect, names))
+                dialects_string = '\n'.join(dialect_strings)
+
+                # Language template
+                family = ontology.parent('language', language, 'language_family')
+                color = format_colour(language_colours.get(language, WHITE))
+                names = name_lists.names_for(ontology.members('language', language, 'culture'))
+                lang_file.write(self.memo.render(render_language, language, language_placeholder_template,
+                                                 language, family, color, names, dialects_string))
+
+    def localisation(self):
+        # Forget the loc of an earlier run, so lines removed from the yml files fall back to the defaults.
+        for cls in (Continent, Superregion, Region, Area, Province, Location):
+            for instance in cls.instances.values():
+                vars(instance).pop('loc', None)
+
+        # Generating loc for continents, superregions, regions, areas, provinces, locations
+        with open ('input\\loc\\continents.yml', 'r', encoding='utf-8-sig') as infile:
+            lines = infile.readlines()
+            for line in lines:
+                line = line.split('#')[0]  # Remove comments
+                if len(line.strip()) == 0:
+                    continue
+
+                if line.startswith('l_english:'):
+                    continue
+                else:
+                    parts = line.split(':')
+                    continent_name = parts[0].strip()
+                    continent_loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
+                    continent_loc = continent_loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
+
+                    Continent.instances[continent_name].loc = f'{continent_name}:{continent_loc}'
+
+        with open('input\\loc\\anb_regions_l_english.yml', 'r', encoding='utf-8-sig') as infile:
+            lines = infile.readlines()
+            for line in lines:
+                line = line.split('#')[0]  # Remove comments
+                if len(line.strip()) == 0:
+                    continue
+
+                if line.startswith('l_english:'):
+                    continue
+                else:
+                    parts = line.split(':')
+                    name = parts[0].strip()
+                    loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
+                    loc = loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
+
+                    if name in Region.instances:
+                        Region.instances[name].loc = f'{name}:{loc}'
+                    elif name in Superregion.instances:
+                        Superregion.instances[name].loc = f'{name}:{loc}'
+
+        with open('input\\loc\\anb_areas_l_english.yml', 'r', encoding='utf-8-sig') as infile:
+            lines = infile.readlines()
+            for line in lines:
+                line = line.split('#')[0]  # Remove comments
+                if len(line.strip()) == 0:
+                    continue
+
+                if line.startswith('l_english:'):
+                    continue
+                else:
+                    parts = line.split(':')
+                    name = parts[0].strip()
+
+                    if name.endswith('_name') or name.endswith('_adj'):
+                        continue
+
+                    loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
+                    loc = loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
+
+                    if name in Area.instances:
+                        Area.instances[name].loc = f'{name}:{loc}'
+
+        with open('input\\loc\\prov_names_l_english.yml', 'r', encoding='utf-8-sig') as infile:
+            lines = infile.readlines()
+            for line in lines:
+                line = line.split('#')[0]  # Remove comments
+                if len(line.strip()) == 0:
+                    continue
+
+                if line.startswith('l_english:'):
+                    continue
+                else:
+                    parts = line.split(':')
+
+                    prov_num = parts[0].strip().replace("PROV", "")
+                    # Check that prov_num is a valid integer, if not continue.
+                    try:
+                        prov_num = int(prov_num)
+                    except ValueError:
+                        continue
+
+                    if prov_num not in Province.prov_num_dict:
+                        continue
+
+                    prov_name = Province.prov_num_dict[prov_num].name
+                    prov_loc = parts[1][1:] # We don't care about the 0 (or in one instance, 2) following the colon
+                    prov_loc = prov_loc.removesuffix('\n') # Remove newline character, as some lines lose it when comments are removed.
+                    prov_loc = prov_loc.replace('_', ' ')  # Replace underscores with spaces for loc
+
+                    Province.prov_num_dict[prov_num].loc = f'{prov_name}_province:{prov_loc}'
+                    Location.prov_num_dict[prov_num].loc = f'{prov_name}:{prov_loc}'
+
+        # Set loc for unknown continents, superregions, regions, and areas
+        for continent in Continent.instances.values():
+            if not hasattr(continent, 'loc'):
+                continent.loc = f'{continent.name}: "UNKNOWN CONTINENT"'
+            for superregion in continent.superregions:
+                if not hasattr(superregion, 'loc'):
+                    superregion.loc = f'{superregion.name}: "UNKNOWN SUPERREGION"'
+                for region in superregion.regions:
+                    if not hasattr(region, 'loc'):
+                        region.loc = f'{region.name}: "UNKNOWN REGION"'
+                    for area in region.areas:
+                        if not hasattr(area, 'loc'):
+                            area.loc = f'{area.name}: "UNKNOWN AREA"'
+
+        with self.output.open('output\\game\\main_menu\\localization\\english\\province_names_l_english.yml') as province_loc_file, \
+             self.output.open('output\\game\\main_menu\\localization\\english\\location_names\\location_names_l_english.yml') as location_loc_file, \
+             self.output.open('output\\game\\main_menu\\localization\\english\\area_l_english.yml') as area_loc_file, \
+             self.output.open('output\\game\\main_menu\\localization\\english\\region_names_l_english.yml') as region_loc_file:
+
+            province_loc_file.write('l_english:\n')
+            location_loc_file.write('l_english:\n')
+            area_loc_file.write('l_english:\n')
+            region_loc_file.write('l_english:\n')
+
+            for continent in Continent.instances.values():
+                location_loc_file.write(f' ##### Continent: {continent.name}\n')
+                province_loc_file.write(f' #### Continent: {continent.name}\n')
+                area_loc_file.write(f' ### Continent: {continent.name}\n')
+                region_loc_file.write(f' ## Continent: {continent.name}\n')
+                region_loc_file.write(' ' + continent.loc + '\n')
+                for superregion in continent.superregions:
+                    location_loc_file.write(f' #### Superregion: {superregion.name}\n')
+                    province_loc_file.write(f' ### Superregion: {superregion.name}\n')
+                    area_loc_file.write(f' ## Superregion: {superregion.name}\n')
+                    region_loc_file.write(f' # Superregion: {superregion.name}\n')
+                    region_loc_file.write(' ' + superregion.loc + '\n')
+                    for region in superregion.regions:
+                        location_loc_file.write(f' ### Region: {region.name}\n')
+                        province_loc_file.write(f' ## Region: {region.name}\n')
+                        area_loc_file.write(f' # Region: {region.name}\n')
+                        region_loc_file.write(' ' + region.loc + '\n')
+                        for area in region.areas:
+                            location_loc_file.write(f' ## Area: {area.name}\n')
+                            province_loc_file.write(f' # Area: {area.name}\n')
+                            area_loc_file.write(' ' + area.loc + '\n')
+                            for province in area.provinces:
+                                location_loc_file.write(f' # Province: {province.name}\n')
+                                if hasattr(province, 'loc'):
+                                    province_loc_file.write(' ' + province.loc + '\n')
+                                for location in province.locations:
+                                    if hasattr(location, 'loc'):
+                                        location_loc_file.write(' ' + location.loc + '\n')
+
+    def country_setup(self):
+        countries_data = self.countries_data
+        country_colours = self.resolve_colours('countries', countries_data)
+
+        # Generate country setup files
+        country_placeholder_template = read_template('templates/anb_country_setup_template.txt')
+
+        Country.instances = {}
+        for superregion in Superregion.instances.values():
+            superregion.countries = []
+
+        for key, value in countries_data.items():
+            superregion_name = value.get('capital_superregion', 'unknown_superregion')
+            country_tag = key
+
+            # Get Superregion
+            if superregion_name in Superregion.instances:
+                superregion = Superregion.instances[superregion_name]
+            else:
+                superregion = self.unknown_superregion
+
+            # Create Country
+            country = Country(superregion, country_tag)
+
+        for superregion in Superregion.instances.values():
+            with self.output.open('output//game//in_game//setup//countries//' + superregion.name +'.txt') as superregion_file:
+                for country in superregion.countries:
+                    country_tag = country.tag
+                    country_data = countries_data.get(country_tag, {})
+                    color = format_colour(country_colours.get(country_tag, WHITE))
+
+                    superregion_file.write(self.memo.render(render_country_setup, country_tag,
+                                                            country_placeholder_template, country_tag, country_data,
+                                                            color))
+
+    def characters(self):
+        character_placeholder_template = read_template('templates/anb_character_template.txt')
+
+        with self.output.open('output\\game\\main_menu\\setup\\start\\05_anb_characters.txt') as rulers_file:
+            for key, value in self.rulers.items():
+                rulers_file.write(self.memo.render(render_character, key, character_placeholder_template, key, value))
+
+    def dynasties(self):
+        name_lists = self.name_lists
+
+        # Creating dynasties
+        with self.output.open('output//game//main_menu//setup//start//04_anb_dynasties.txt') as dynasties_file:
+            dynasties_file.write('dynasties = {\n')
+            for dynasty in ranked(name_lists.dynasties):
+                dynasty_name = name_lists.dynasty_name(dynasty).replace('"', '')
+                dynasty_string = f'\t{dynasty} = {{ name = "{dynasty_name}"'
+                dynasty_culture = name_lists.dynasty_culture(dynasty)
+                if dynasty_culture != '':
+                    if not dynasty_culture.endswith('_culture'):
+                        dynasty_culture += '_culture'
+                    dynasty_string += f' culture = {dynasty_culture}'
+                dynasty_string += ' }\n'
+                dynasties_file.write(dynasty_string)
+            dynasties_file.write('}\n')
+
+    def country_history(self):
+        # Creating 10_countries.txt
+        countries_data = self.countries_data
+        locations_data = self.data
+
+        # Assign rulers to countries
+        ruler_dicts = {}
+        for key, value in self.rulers.items():
+            country_tag = value.get('tag', '')
+            if country_tag not in ruler_dicts:
+                ruler_dicts[country_tag] = {}
+            ruler_dicts[country_tag][key] = value
+
+        # Index ownership and cores.
+        ownership_index = OwnershipIndex.build(Country.instances.keys(), locations_data)
+
+        entire_file_template = read_template('templates/anb_10_countries_template_file.txt')
+        single_country_template = read_template('templates/anb_10_countries_template_country.txt')
+
+        with self.output.open('output\\game\\main_menu\\setup\\start\\10_countries.txt') as country_setup_file:
+            output_string = str(entire_file_template)
+            countries_string = ''
+            for country in Country.instances.values():
+                country_data = countries_data.get(country.tag, {})
+                # Sort rulers by start date of reign
+                sorted_rulers = sorted(ruler_dicts.get(country.tag, {}).items(), key=lambda item: item[1].get('ruler_term_start', ''))
+                country_string = self.memo.render(render_country_history, country.tag, single_country_template,
+                                                  country.tag, country_data,
+                                                  ownership_index.owned_core(country.tag),
+                                                  ownership_index.owned_non_core(country.tag),
+                                                  ownership_index.unowned_core(country.tag),
+                                                  sorted_rulers)
+
+                countries_string += country_string + '\n'
+
+            countries_string = countries_string.replace('\n', '\n\t\t')
+
+            output_string = output_string.replace('PH_COUNTRIES', countries_string)
+            country_setup_file.write(output_string)
+
+    def location_lists(self):
+        # Location lists (sea zones, lakes, wasteland, ...) defined in input/location_lists.csv
+        location_list_rules = load_location_list_rules('input//location_lists.csv')
+        location_lists = classify_locations(self.data, location_list_rules)
+        write_location_lists(location_lists, 'output//helpers//location_lists', self.output)
+
+    def development(self):
+        # Population and buildings from the EU4 province history, see input/pop_formulas.csv and input/building_mapping.csv
+        if os.path.isdir('input//history//provinces'):
+            convert_development(self.data, 'output//game//main_menu//setup//start//06_anb_pops.txt',
+                                'output//game//main_menu//setup//start//07_anb_buildings.txt', output=self.output)
+
+if __name__ == "__main__":
+    TransitionBuild().run()
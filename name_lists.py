@@ -0,0 +1,148 @@
+import csv
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Dynasty the sheets give characters without a known dynasty.
+PLACEHOLDER_DYNASTY = 'unknown_dynasty'
+
+
+class NameLists:
+    """
+    Frequency tables aggregated from character rows (rulers sheet, imported character history).
+
+    Every table is a Counter, so adding a character is O(1) and the whole aggregation stays
+    linear in the number of characters.
+    """
+    def __init__(self):
+        self.male_names = defaultdict(Counter)      # culture -> first_name -> count
+        self.female_names = defaultdict(Counter)    # culture -> first_name -> count
+        self.dynasty_names = defaultdict(Counter)   # culture -> dynasty -> count
+        self.dynasties = Counter()                  # dynasty key -> count
+        self.dynasty_spellings = defaultdict(Counter)  # dynasty key -> dynasty as written -> count
+        self.dynasty_cultures = defaultdict(Counter)  # dynasty key -> culture -> count
+
+    def add(self, row):
+        culture = row.get('culture', '')
+        first_name = clean_name(row.get('first_name', ''))
+        dynasty = clean_name(row.get('dynasty', '')).strip('\'"')
+
+        if culture != '' and first_name != '':
+            if row.get('female', '') == 'yes':
+                self.female_names[culture][first_name] += 1
+            else:
+                self.male_names[culture][first_name] += 1
+
+        key = dynasty_key(dynasty)
+        if key != '':
+            self.dynasties[key] += 1
+            self.dynasty_spellings[key][dynasty] += 1
+            if culture != '':
+                self.dynasty_cultures[key][culture] += 1
+                self.dynasty_names[culture][dynasty] += 1
+
+    def names_for(self, cultures):
+        """Ranked (male, female, dynasty) names of all the given cultures together."""
+        return (ranked(merged(self.male_names, cultures)),
+                ranked(merged(self.female_names, cultures)),
+                ranked(merged(self.dynasty_names, cultures)))
+
+    def dynasty_name(self, key):
+        """Most common spelling of a dynasty."""
+        return ranked(self.dynasty_spellings[key])[0]
+
+    def dynasty_culture(self, key):
+        """Most common culture among the members of a dynasty, or '' if none is known."""
+        cultures = self.dynasty_cultures.get(key)
+        if not cultures:
+            return ''
+        return ranked(cultures)[0]
+
+
+def clean_name(name):
+    # Same normalisation the character writer applies to the whole character block,
+    # so dynasty keys match the dynasty = ... references in 05_anb_characters.txt.
+    return name.strip().replace('-', '_')
+
+
+def dynasty_key(name):
+    """
+    Script key of a dynasty: ascii letters, digits and underscores, e.g. 'síl Lorentis' -> sil_lorentis
+    and ta'lunatein -> talunatein. '' for a blank name and the placeholder dynasty.
+    """
+    name = clean_name(name).strip('\'"')
+    if name == PLACEHOLDER_DYNASTY:
+        return ''
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z_0-9]', '', name.replace(' ', '_').lower())
+
+
+def script_name(name):
+    """A name as a script value, quoted unless it is a plain token (apostrophes and spaces break those)."""
+    if re.fullmatch(r'[A-Za-z0-9_.]+', name):
+        return name
+    return '"' + name.replace('"', '') + '"'
+
+
+def ranked(counter):
+    """Keys of a Counter ordered by descending frequency, ties broken alphabetically."""
+    return [key for key, _ in sorted(counter.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def merged(tables, keys):
+    """Sum the Counters of several keys (e.g. all cultures sharing one dialect)."""
+    total = Counter()
+    for key in keys:
+        if key in tables:
+            total.update(tables[key])
+    return total
+
+
+def aggregate_characters(rows):
+    """
+    Aggregate character rows into name and dynasty frequency tables in a single pass.
+
+    Args:
+        rows: Iterable of dicts with at least first_name, culture, dynasty and female columns.
+    """
+    name_lists = NameLists()
+    for row in rows:
+        name_lists.add(row)
+    return name_lists
+
+
+def load_character_history(directory):
+    """
+    Yield character rows from every csv file in directory (same columns as the rulers sheet).
+    Yields nothing if the directory does not exist.
+    """
+    if not os.path.isdir(directory):
+        return
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith('.csv'):
+            continue
+        with open(os.path.join(directory, file_name), 'r', encoding='utf-8-sig') as file:
+            for row in csv.DictReader(file):
+                yield row
+
+
+def format_name_block(names, indent, per_line=10):
+    """Format a ranked list of names as indented lines of at most per_line names."""
+    lines = []
+    for i in range(0, len(names), per_line):
+        lines.append(indent + ' '.join(script_name(name) for name in names[i:i + per_line]))
+    return '\n'.join(lines)
+
+
+def fill_name_placeholders(string, names, indent):
+    """
+    Replace PH_MALE_NAMES, PH_FEMALE_NAMES and PH_DYNASTY_NAMES in a language or dialect
+    template with names from NameLists.names_for. Placeholders without names are removed.
+    """
+    for placeholder, ranked_names in zip(('PH_MALE_NAMES', 'PH_FEMALE_NAMES', 'PH_DYNASTY_NAMES'), names):
+        if ranked_names:
+            string = string.replace(placeholder, format_name_block(ranked_names, indent))
+        else:
+            string = string.replace(placeholder + '\n', '')
+    return string
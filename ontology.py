@@ -0,0 +1,188 @@
+import sys
+
+# Family of languages with a blank family column.
+DEFAULT_LANGUAGE_FAMILY = 'common_language_family'
+
+KINDS = ['culture_group', 'culture', 'dialect', 'language', 'language_family', 'religious_group', 'religion']
+
+
+class Ontology:
+    """
+    Culture, language and religion hierarchies as one graph with integer node ids:
+
+        culture -> culture_group
+        culture -> dialect -> language -> language_family (or culture -> language directly)
+        religion -> religious_group
+
+    Nodes are (kind, name) pairs numbered in insertion order. finalize() precomputes every node's
+    ancestor closure, its descendants of each kind and its nearest ancestor of each kind, so
+    questions like "is dialect D under language L" or "all cultures of family F" are lookups
+    instead of walks.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.kinds = []
+        self.names = []
+        self.parents = []
+        self.children = []
+        self.ancestors = []
+        self.descendants = {}       # (node id, kind) -> frozenset of descendant ids
+        self.descendant_names = {}  # (node id, kind) -> tuple of descendant names in insertion order
+        self.nearest = {}           # (node id, kind) -> id of the nearest ancestor
+        self.names_of_kind = {}     # kind -> tuple of names in insertion order
+
+    def node(self, kind, name):
+        """Id of (kind, name), creating the node if needed."""
+        node_id = self.ids.get((kind, name))
+        if node_id is None:
+            node_id = len(self.names)
+            self.ids[(kind, name)] = node_id
+            self.kinds.append(kind)
+            self.names.append(name)
+            self.parents.append([])
+            self.children.append([])
+        return node_id
+
+    def add_edge(self, child, parent):
+        if parent not in self.parents[child]:
+            self.parents[child].append(parent)
+            self.children[parent].append(child)
+
+    def finalize(self):
+        self.ancestors = [None] * len(self.names)
+
+        def closure(node_id):
+            if self.ancestors[node_id] is None:
+                result = set()
+                for parent in self.parents[node_id]:
+                    result.add(parent)
+                    result |= closure(parent)
+                self.ancestors[node_id] = frozenset(result)
+            return self.ancestors[node_id]
+
+        for node_id in range(len(self.names)):
+            closure(node_id)
+
+        # Nodes are visited in id order, so every list comes out in insertion order.
+        descendants = {}
+        names_of_kind = {}
+        for node_id, ancestors in enumerate(self.ancestors):
+            kind = self.kinds[node_id]
+            names_of_kind.setdefault(kind, []).append(self.names[node_id])
+            for ancestor in ancestors:
+                descendants.setdefault((ancestor, kind), []).append(node_id)
+        self.names_of_kind = {kind: tuple(names) for kind, names in names_of_kind.items()}
+        self.descendants = {key: frozenset(ids) for key, ids in descendants.items()}
+        self.descendant_names = {key: tuple(self.names[node_id] for node_id in ids) for key, ids in descendants.items()}
+
+        # Nearest ancestor of each kind, breadth first over the parents, earlier parents first.
+        self.nearest = {}
+        for node_id in range(len(self.names)):
+            seen = set()
+            level = self.parents[node_id]
+            while level:
+                next_level = []
+                for ancestor in level:
+                    if ancestor not in seen:
+                        seen.add(ancestor)
+                        self.nearest.setdefault((node_id, self.kinds[ancestor]), ancestor)
+                        next_level.extend(self.parents[ancestor])
+                level = next_level
+        return self
+
+    @classmethod
+    def build(cls, cultures_data, languages_data, dialects_data, language_families_data, religions_data):
+        """
+        Build the graph from the transition sheets. Nodes of each kind keep sheet order, and
+        groups, languages and families referenced but missing from their own sheet are created on
+        first use, like the registries main.py used before.
+        """
+        ontology = cls()
+        for family in language_families_data:
+            ontology.node('language_family', family)
+        for language, value in languages_data.items():
+            family = ontology.node('language_family', value.get('family', '') or DEFAULT_LANGUAGE_FAMILY)
+            ontology.add_edge(ontology.node('language', language), family)
+        for dialect, value in dialects_data.items():
+            language = ontology.node('language', value.get('language', 'unknown_language'))
+            if not ontology.parents[language]:
+                ontology.add_edge(language, ontology.node('language_family', DEFAULT_LANGUAGE_FAMILY))
+            ontology.add_edge(ontology.node('dialect', dialect), language)
+        for culture, value in cultures_data.items():
+            culture_id = ontology.node('culture', culture)
+            ontology.add_edge(culture_id, ontology.node('culture_group', value.get('culture_groups', 'unknown_culture_group')))
+            lect = value.get('language/dialect', '')
+            for kind in ('dialect', 'language'):
+                if (kind, lect) in ontology.ids:
+                    ontology.add_edge(culture_id, ontology.ids[(kind, lect)])
+                    break
+        for religion, value in religions_data.items():
+            religious_group = ontology.node('religious_group', value.get('religious_group', 'unknown_religious_group'))
+            ontology.add_edge(ontology.node('religion', religion), religious_group)
+        return ontology.finalize()
+
+    def has(self, kind, name):
+        return (kind, name) in self.ids
+
+    def all(self, kind):
+        """Names of every node of a kind, in insertion order."""
+        return self.names_of_kind.get(kind, ())
+
+    def parent(self, kind, name, parent_kind):
+        """Name of the direct parent of parent_kind, or None."""
+        node_id = self.ids.get((kind, name))
+        if node_id is None:
+            return None
+        for parent in self.parents[node_id]:
+            if self.kinds[parent] == parent_kind:
+                return self.names[parent]
+        return None
+
+    def members(self, kind, name, member_kind):
+        """Direct children of member_kind, in insertion order (religions of a group, dialects of a language)."""
+        node_id = self.ids.get((kind, name))
+        if node_id is None:
+            return []
+        return [self.names[child] for child in self.children[node_id] if self.kinds[child] == member_kind]
+
+    def is_under(self, kind, name, ancestor_kind, ancestor_name):
+        """Whether (ancestor_kind, ancestor_name) is an ancestor of (kind, name)."""
+        node_id = self.ids.get((kind, name))
+        ancestor = self.ids.get((ancestor_kind, ancestor_name))
+        return node_id in self.descendants.get((ancestor, kind), ())
+
+    def ancestor(self, kind, name, ancestor_kind):
+        """Name of the nearest ancestor of ancestor_kind (the language of a culture through its dialect), or None."""
+        ancestor = self.nearest.get((self.ids.get((kind, name)), ancestor_kind))
+        return None if ancestor is None else self.names[ancestor]
+
+    def descendants_of(self, kind, name, descendant_kind):
+        """All descendants of descendant_kind at any depth, in insertion order (every culture of a family)."""
+        return self.descendant_names.get((self.ids.get((kind, name)), descendant_kind), ())
+
+
+if __name__ == "__main__":
+    from transition_data import load_transition_data
+
+    if len(sys.argv) < 4:
+        print("Usage: python ontology.py <kind> <name> <descendant_or_ancestor_kind>")
+        print(f"\nKinds: {', '.join(KINDS)}. Example:")
+        print("  python ontology.py language_family common_language_family culture")
+        print("  python ontology.py culture high_lorentish language")
+        sys.exit(1)
+
+    ontology = Ontology.build(
+        load_transition_data('anbennar_eu5_transition_data_culture.csv', 'culture'),
+        load_transition_data('anbennar_eu5_transition_data_language.csv', 'language'),
+        load_transition_data('anbennar_eu5_transition_data_dialects.csv', 'dialect'),
+        load_transition_data('anbennar_eu5_transition_data_language_families.csv', 'language_family'),
+        load_transition_data('anbennar_eu5_transition_data_religions.csv', 'religion'))
+    kind, name, other_kind = sys.argv[1:4]
+    if not ontology.has(kind, name):
+        print(f'No {kind} named {name!r}')
+        sys.exit(1)
+    descendants = ontology.descendants_of(kind, name, other_kind)
+    if descendants:
+        print('\n'.join(descendants))
+    else:
+        print(ontology.ancestor(kind, name, other_kind) or f'No {other_kind} above or below {kind} {name!r}')
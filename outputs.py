@@ -0,0 +1,65 @@
+import io
+import os
+
+
+class DirectOutput:
+    """Output files written straight to disk, like open(path, 'w')."""
+    def open(self, path, encoding='utf-8-sig', newline=None):
+        return open(path, 'w', encoding=encoding, newline=newline)
+
+
+class BufferedFile(io.StringIO):
+    """Text file of a BufferedOutput. Its content is handed to the output when it is closed."""
+    def __init__(self, output, path, encoding, newline):
+        super().__init__()
+        self.output = output
+        self.path = path
+        self.target_encoding = encoding
+        self.target_newline = newline
+
+    def close(self):
+        if not self.closed:
+            text = self.getvalue()
+            if self.target_newline is None:
+                text = text.replace('\n', os.linesep)
+            elif self.target_newline not in ('', '\n'):
+                text = text.replace('\n', self.target_newline)
+            # Like a real file, nothing written means no bytes at all, not even the utf-8-sig BOM.
+            self.output.pending[self.path] = text.encode(self.target_encoding) if text else b''
+        super().close()
+
+
+class BufferedOutput:
+    """
+    Output files kept in memory until commit(), which writes the ones that differ from what is on
+    disk. A build that fails is discarded without writing anything, and unchanged outputs keep
+    their mtime.
+    """
+    def __init__(self):
+        self.pending = {}  # path -> bytes
+
+    def open(self, path, encoding='utf-8-sig', newline=None):
+        return BufferedFile(self, path, encoding, newline)
+
+    def commit(self):
+        """Write the pending files that changed. Returns their paths."""
+        written = []
+        for path, data in self.pending.items():
+            try:
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        continue
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            written.append(path)
+        self.pending = {}
+        return written
+
+    def discard(self):
+        self.pending = {}
+
+
+# Default output of the helpers that write files.
+DIRECT_OUTPUT = DirectOutput()
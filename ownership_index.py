@@ -0,0 +1,113 @@
+from array import array
+
+
+class OwnershipIndex:
+    """
+    Columnar index of location ownership and cores.
+
+    Countries and locations get integer ids in insertion order. Per country the index keeps
+    arrays of location ids (owned core, owned non-core, unowned core), and per location the
+    owner id and a bitset of the countries holding a core on it (bit i = country id i).
+    """
+    def __init__(self, tags):
+        self.tags = list(tags)
+        self.tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+        self.location_names = []
+        self.location_ids = {}
+        self.owners = array('i')
+        self.core_bits = []
+        self.owned_core_ids = [array('I') for _ in self.tags]
+        self.owned_non_core_ids = [array('I') for _ in self.tags]
+        self.unowned_core_ids = [array('I') for _ in self.tags]
+        self.landless = []
+
+    @classmethod
+    def build(cls, tags, locations_data):
+        """
+        Build the index in one pass over the locations.
+
+        Args:
+            tags: Tags of all known countries. Owner and core tags not in here are ignored.
+            locations_data: Dict of location_name -> row with 'owner' and comma separated 'cores'.
+        """
+        index = cls(tags)
+        for location_name, row in locations_data.items():
+            index.add_location(location_name, row.get('owner', ''), row.get('cores', '').split(','))
+        index.finalize()
+        return index
+
+    def add_location(self, location_name, owner_tag, core_tags):
+        location_id = len(self.location_names)
+        self.location_names.append(location_name)
+        self.location_ids[location_name] = location_id
+
+        bits = 0
+        for core_tag in core_tags:
+            core_id = self.tag_ids.get(core_tag.strip())
+            if core_id is not None:
+                bits |= 1 << core_id
+        self.core_bits.append(bits)
+
+        owner_id = self.tag_ids.get(owner_tag, -1)
+        self.owners.append(owner_id)
+        if owner_id != -1:
+            if bits >> owner_id & 1:
+                self.owned_core_ids[owner_id].append(location_id)
+            else:
+                self.owned_non_core_ids[owner_id].append(location_id)
+
+        # Cores of anyone but the listed owner, even if the owner is not a known country.
+        unowned_bits = bits
+        if owner_tag in self.tag_ids:
+            unowned_bits &= ~(1 << self.tag_ids[owner_tag])
+        for core_id in iter_bits(unowned_bits):
+            self.unowned_core_ids[core_id].append(location_id)
+
+    def finalize(self):
+        """Precompute derived lists once all locations are added."""
+        self.landless = [tag for i, tag in enumerate(self.tags)
+                         if not self.owned_core_ids[i] and not self.owned_non_core_ids[i]]
+
+    def _names(self, location_ids):
+        return [self.location_names[i] for i in location_ids]
+
+    def owned_core(self, tag):
+        return self._names(self.owned_core_ids[self.tag_ids[tag]])
+
+    def owned_non_core(self, tag):
+        return self._names(self.owned_non_core_ids[self.tag_ids[tag]])
+
+    def unowned_core(self, tag):
+        return self._names(self.unowned_core_ids[self.tag_ids[tag]])
+
+    def owned(self, tag):
+        """All locations owned by tag, cored ones first."""
+        return self.owned_core(tag) + self.owned_non_core(tag)
+
+    def counts(self, tag):
+        """(owned core, owned non-core, unowned core) location counts for tag."""
+        tag_id = self.tag_ids[tag]
+        return (len(self.owned_core_ids[tag_id]),
+                len(self.owned_non_core_ids[tag_id]),
+                len(self.unowned_core_ids[tag_id]))
+
+    def owner_of(self, location_name):
+        owner_id = self.owners[self.location_ids[location_name]]
+        return self.tags[owner_id] if owner_id != -1 else None
+
+    def cores_of(self, location_name):
+        return [self.tags[i] for i in iter_bits(self.core_bits[self.location_ids[location_name]])]
+
+    def has_core(self, tag, location_name):
+        return bool(self.core_bits[self.location_ids[location_name]] >> self.tag_ids[tag] & 1)
+
+    def countries_without_land(self):
+        return self.landless
+
+
+def iter_bits(bits):
+    """Yield the indices of the set bits of an int, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import zipfile
+
+from hashing import file_digest
+
+DEFAULT_SOURCE_DIR = os.path.join('output', 'game')
+DEFAULT_RELEASES_DIR = 'releases'
+LATEST_MANIFEST = 'manifest.json'
+
+# Fixed zip entry metadata, so the same files always give byte-identical archives.
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644
+ZIP_COMPRESS_LEVEL = 9
+
+
+def fingerprint_tree(source_dir):
+    """
+    {archive path: {'size', 'blake2b'}} for every file under source_dir, hashed in streaming
+    chunks. Archive paths use '/' and start with the name of source_dir ('game/in_game/...').
+    """
+    base_dir = os.path.dirname(os.path.normpath(source_dir))
+    files = {}
+    for directory, subdirectories, file_names in os.walk(source_dir):
+        subdirectories.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(directory, file_name)
+            archive_path = os.path.relpath(path, base_dir).replace(os.sep, '/')
+            files[archive_path] = {'size': os.path.getsize(path), 'blake2b': file_digest(path)}
+    return dict(sorted(files.items()))
+
+
+def tree_digest(files):
+    """Digest of a whole fingerprinted tree: same paths and contents, same digest."""
+    digest = hashlib.blake2b(digest_size=16)
+    for archive_path, entry in sorted(files.items()):
+        digest.update(f"{archive_path}\0{entry['blake2b']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def changed_files(files, previous_files):
+    """(added or changed paths, removed paths) between two fingerprints."""
+    changed = [path for path, entry in files.items()
+               if previous_files.get(path, {}).get('blake2b') != entry['blake2b']]
+    removed = [path for path in previous_files if path not in files]
+    return changed, sorted(removed)
+
+
+def write_archive(archive_file, source_dir, archive_paths):
+    """
+    Write a reproducible zip of the given archive paths: sorted entries, fixed timestamps,
+    permissions and compression level, and file contents streamed from disk.
+    """
+    base_dir = os.path.dirname(os.path.normpath(source_dir))
+    with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL) as archive:
+        for archive_path in sorted(archive_paths):
+            info = zipfile.ZipInfo(archive_path, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # ZipFile's compresslevel only applies to entries it creates itself, so set it on the entry.
+            setattr(info, 'compress_level' if hasattr(zipfile.ZipInfo, 'compress_level') else '_compresslevel',
+                    ZIP_COMPRESS_LEVEL)
+            info.create_system = 3
+            info.external_attr = (0o100000 | ZIP_FILE_MODE) << 16
+            path = os.path.join(base_dir, *archive_path.split('/'))
+            info.file_size = os.path.getsize(path)
+            with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+    return file_digest(archive_file)
+
+
+def load_manifest(manifest_file):
+    if manifest_file is None or not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def package_release(version=None, source_dir=DEFAULT_SOURCE_DIR, releases_dir=DEFAULT_RELEASES_DIR,
+                    previous_manifest_file=None):
+    """
+    Package source_dir into releases_dir/<version>/ as a full archive, a delta archive of the
+    files added or changed since the previous release, and manifest.json. The previous release is
+    read from previous_manifest_file, or releases_dir/manifest.json, which is then replaced by
+    the new manifest. version defaults to the tree digest. Returns the manifest.
+    """
+    files = fingerprint_tree(source_dir)
+    digest = tree_digest(files)
+    version = version or digest[:12]
+    if previous_manifest_file is None:
+        previous_manifest_file = os.path.join(releases_dir, LATEST_MANIFEST)
+    previous = load_manifest(previous_manifest_file)
+
+    release_dir = os.path.join(releases_dir, version)
+    os.makedirs(release_dir, exist_ok=True)
+    manifest = {'version': version, 'tree_blake2b': digest, 'files': files}
+
+    full_archive = f'{version}_full.zip'
+    manifest['full_archive'] = {'file': full_archive,
+                                'blake2b': write_archive(os.path.join(release_dir, full_archive), source_dir, files)}
+
+    if previous is not None:
+        changed, removed = changed_files(files, previous['files'])
+        delta_archive = f"{version}_delta_from_{previous['version']}.zip"
+        manifest['delta_archive'] = {
+            'file': delta_archive,
+            'previous_version': previous['version'],
+            'changed': changed,
+            'removed': removed,
+            'blake2b': write_archive(os.path.join(release_dir, delta_archive), source_dir, changed),
+        }
+
+    manifest_text = json.dumps(manifest, indent=2, sort_keys=True) + '\n'
+    for manifest_file in (os.path.join(release_dir, LATEST_MANIFEST), os.path.join(releases_dir, LATEST_MANIFEST)):
+        with open(manifest_file, 'w', encoding='utf-8', newline='\n') as file:
+            file.write(manifest_text)
+    return manifest
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    for option in ('--previous', '--source', '--releases'):
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+
+    if args and args[0] in ('-h', '--help'):
+        print("Usage: python package_release.py [version] [--previous manifest.json] [--source output/game] [--releases releases]")
+        print("\nPackages the generated mod into releases/<version>/ as a full and a delta archive. Example:")
+        print("  python package_release.py 0.4.0")
+        sys.exit(1)
+
+    manifest = package_release(args[0] if args else None,
+                               options.get('--source', DEFAULT_SOURCE_DIR),
+                               options.get('--releases', DEFAULT_RELEASES_DIR),
+                               options.get('--previous'))
+    print(f"Release {manifest['version']}: {len(manifest['files'])} file(s), "
+          f"tree {manifest['tree_blake2b']}, full archive {manifest['full_archive']['blake2b']}")
+    if 'delta_archive' in manifest:
+        delta = manifest['delta_archive']
+        print(f"Delta from {delta['previous_version']}: {len(delta['changed'])} changed, "
+              f"{len(delta['removed'])} removed, archive {delta['blake2b']}")
+    else:
+        print("No previous release manifest, only the full archive was written.")
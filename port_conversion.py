@@ -17,24 +17,25 @@ def convert_coords(x, y):
     return new_x, new_y
 
 
-with open('input\\eu4_ports.csv', 'r', encoding='utf-8') as infile, \
-    open('output\\game\\in_game\\map_data\\ports.csv', 'w', encoding='utf-8', newline='') as outfile:
-    reader = csv.DictReader(infile, delimiter=';')
-    fieldnames = reader.fieldnames
-    writer = csv.DictWriter(outfile, fieldnames=fieldnames, delimiter=';')
-    writer.writeheader()
-    
-    for row in reader:
-        x = int(row.get('x'))
-        y = int(row.get('y'))
-        new_x, new_y = convert_coords(x, y)
-        row['x'] = new_x
-        row['y'] = new_y
-        writer.writerow(row)
-
-# Open output file and strip the newline from the final line.
-with open('output\\game\\in_game\\map_data\\ports.csv', 'r', encoding='utf-8') as outfile:
-    lines = outfile.readlines()
-with open('output\\game\\in_game\\map_data\\ports.csv', 'w', encoding='utf-8', newline='') as outfile:
-    outfile.writelines(lines[:-1])
-    outfile.write(lines[-1].rstrip('\n'))
+if __name__ == "__main__":
+    with open('input\\eu4_ports.csv', 'r', encoding='utf-8') as infile, \
+        open('output\\game\\in_game\\map_data\\ports.csv', 'w', encoding='utf-8', newline='') as outfile:
+        reader = csv.DictReader(infile, delimiter=';')
+        fieldnames = reader.fieldnames
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames, delimiter=';')
+        writer.writeheader()
+
+        for row in reader:
+            x = int(row.get('x'))
+            y = int(row.get('y'))
+            new_x, new_y = convert_coords(x, y)
+            row['x'] = new_x
+            row['y'] = new_y
+            writer.writerow(row)
+
+    # Open output file and strip the newline from the final line.
+    with open('output\\game\\in_game\\map_data\\ports.csv', 'r', encoding='utf-8') as outfile:
+        lines = outfile.readlines()
+    with open('output\\game\\in_game\\map_data\\ports.csv', 'w', encoding='utf-8', newline='') as outfile:
+        outfile.writelines(lines[:-1])
+        outfile.write(lines[-1].rstrip('\n'))
@@ -0,0 +1,191 @@
+import glob
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+from ownership_index import OwnershipIndex
+from transition_data import fill_hierarchy_placeholders, load_transition_data, transition_data_file
+
+HIERARCHY_LEVELS = ['continent', 'superregion', 'region', 'area', 'province']
+
+
+def load_loc(paths):
+    """Parse paradox style yml files into a dict of key -> text."""
+    loc = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8-sig') as infile:
+            for line in infile:
+                line = line.split('#')[0]  # Remove comments
+                if ':' not in line or line.startswith('l_english:'):
+                    continue
+                key, text = line.split(':', 1)
+                text = text[1:] if text[:1].isdigit() else text  # Drop the loc version number
+                loc[key.strip()] = text.strip().strip('"')
+    return loc
+
+
+class TransitionIndex:
+    """
+    The converted transition tables, loaded once, with dict indexes for the common questions.
+    Lookups are dict accesses; answers only copy out the matching rows.
+    """
+    def __init__(self, data_dir='.'):
+        self.locations = load_transition_data(transition_data_file('locations_converted', data_dir), 'location_name')
+        self.countries = load_transition_data(transition_data_file('countries_converted', data_dir), 'tag')
+        self.rulers = load_transition_data(transition_data_file('rulers_converted', data_dir), 'character_tag')
+        self.cultures = load_transition_data(transition_data_file('culture', data_dir), 'culture')
+        self.religions = load_transition_data(transition_data_file('religions', data_dir), 'religion')
+
+        self.ownership = OwnershipIndex.build(self.countries.keys(), self.locations)
+
+        self.by_province_number = {}
+        self.by_hierarchy = {level: {} for level in HIERARCHY_LEVELS}
+        self.by_culture = {}
+        self.by_religion = {}
+        self.rulers_by_tag = {}
+
+        for name, row in self.locations.items():
+            # Blank levels are indexed under the placeholders the mod files use.
+            fill_hierarchy_placeholders(row)
+            self.by_province_number.setdefault(row.get('old_province_number', ''), []).append(name)
+            for level in HIERARCHY_LEVELS:
+                self.by_hierarchy[level].setdefault(row.get(level, ''), []).append(name)
+            self._add_use(self.by_culture, row.get('culture', ''), 'locations', name)
+            self._add_use(self.by_religion, row.get('religion', ''), 'locations', name)
+
+        for tag, row in self.countries.items():
+            self._add_use(self.by_culture, row.get('culture_definition', ''), 'countries', tag)
+            self._add_use(self.by_religion, row.get('religion_definition', ''), 'countries', tag)
+
+        for character_tag, row in self.rulers.items():
+            self.rulers_by_tag.setdefault(row.get('tag', ''), []).append(character_tag)
+            self._add_use(self.by_culture, row.get('culture', ''), 'rulers', character_tag)
+            self._add_use(self.by_religion, row.get('religion', ''), 'rulers', character_tag)
+
+        loc_files = glob.glob(os.path.join(data_dir, 'input', 'loc', '*.yml'))
+        loc_files += glob.glob(os.path.join(data_dir, 'output', 'game', 'main_menu', 'localization', 'english', '**', '*.yml'), recursive=True)
+        self.loc = load_loc(sorted(loc_files))
+
+    @staticmethod
+    def _add_use(index, key, kind, value):
+        if key == '':
+            return
+        uses = index.setdefault(key, {'locations': [], 'countries': [], 'rulers': []})
+        uses[kind].append(value)
+
+    def location(self, name):
+        row = self.locations.get(name)
+        if row is None:
+            return None
+        return dict(row, cores=self.ownership.cores_of(name), owner=self.ownership.owner_of(name))
+
+    def province_number(self, number):
+        names = self.by_province_number.get(number)
+        if names is None:
+            return None
+        return [self.locations[name] for name in names]
+
+    def country(self, tag):
+        row = self.countries.get(tag)
+        if row is None:
+            return None
+        owned_core, owned_non_core, unowned_core = self.ownership.counts(tag)
+        return {
+            'country': row,
+            'owned_core': self.ownership.owned_core(tag),
+            'owned_non_core': self.ownership.owned_non_core(tag),
+            'unowned_core': self.ownership.unowned_core(tag),
+            'counts': {'owned_core': owned_core, 'owned_non_core': owned_non_core, 'unowned_core': unowned_core},
+            'rulers': self.rulers_by_tag.get(tag, []),
+        }
+
+    def landless(self):
+        return self.ownership.countries_without_land()
+
+    def culture(self, name):
+        if name not in self.cultures and name not in self.by_culture:
+            return None
+        return {'culture': self.cultures.get(name), **self.by_culture.get(name, {})}
+
+    def religion(self, name):
+        if name not in self.religions and name not in self.by_religion:
+            return None
+        return {'religion': self.religions.get(name), **self.by_religion.get(name, {})}
+
+    def hierarchy(self, level, name):
+        if level not in self.by_hierarchy:
+            return None
+        return self.by_hierarchy[level].get(name)
+
+    def localisation(self, key):
+        return self.loc.get(key)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET /location/<name>, /province_number/<n>, /country/<tag>, /landless,
+    /culture/<name>, /religion/<name>, /hierarchy/<level>/<name>, /loc/<key>
+    """
+    index = None
+
+    def do_GET(self):
+        parts = [unquote(part) for part in urlparse(self.path).path.split('/') if part]
+        if not parts:
+            return self.respond(400, {'error': 'no query'})
+        query, args = parts[0], parts[1:]
+        routes = {
+            'location': (1, self.index.location),
+            'province_number': (1, self.index.province_number),
+            'country': (1, self.index.country),
+            'landless': (0, self.index.landless),
+            'culture': (1, self.index.culture),
+            'religion': (1, self.index.religion),
+            'hierarchy': (2, self.index.hierarchy),
+            'loc': (1, self.index.localisation),
+        }
+        if query not in routes:
+            return self.respond(404, {'error': f'unknown query {query!r}'})
+        arg_count, handler = routes[query]
+        if len(args) != arg_count:
+            return self.respond(400, {'error': f'{query} takes {arg_count} argument(s)'})
+        result = handler(*args)
+        if result is None:
+            return self.respond(404, {'error': 'not found'})
+        self.respond(200, result)
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet, editor tooling queries a lot.
+
+
+def serve(data_dir='.', host='127.0.0.1', port=8765):
+    QueryHandler.index = TransitionIndex(data_dir)
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f'Serving transition data from {os.path.abspath(data_dir)} on http://{host}:{port}')
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        print("Usage: python query_service.py [data_directory] [port]")
+        print("\nExample:")
+        print("  python query_service.py . 8765")
+        print("  curl http://127.0.0.1:8765/country/A02")
+        sys.exit(1)
+
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else '.'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+
+    try:
+        serve(data_dir, port=port)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,143 @@
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from port_conversion import actual_height, bottom_margin, new_height, new_width, old_height, old_width
+
+TILE_SIZE = 1024
+
+
+class Bitmap:
+    """
+    Uncompressed 8-bit (palette) or 24-bit BMP opened as a memory map.
+
+    pixels is indexed [y, x] with y counted from the bottom of the image, the same convention
+    as the port coordinates in port_conversion.py, whatever the row order of the file.
+    """
+    def __init__(self, path, mode='r'):
+        with open(path, 'rb') as f:
+            header = f.read(54)
+            if header[:2] != b'BM':
+                raise ValueError(f"'{path}' is not a BMP file")
+            offset, dib_size = struct.unpack_from('<II', header, 10)
+            width, height, _, bits, compression = struct.unpack_from('<iiHHI', header, 18)
+            colors_used = struct.unpack_from('<I', header, 46)[0]
+            if compression != 0 or bits not in (8, 24):
+                raise ValueError(f"'{path}': only uncompressed 8-bit and 24-bit BMPs are supported")
+            self.palette = b''
+            if bits == 8:
+                f.seek(14 + dib_size)
+                self.palette = f.read(4 * (colors_used or 256))
+
+        self.path = path
+        self.width = width
+        self.height = abs(height)
+        self.channels = bits // 8
+        stride = (width * bits + 31) // 32 * 4
+        self.map = np.memmap(path, dtype=np.uint8, mode=mode, offset=offset, shape=(self.height, stride))
+        rows = self.map
+        if height < 0:  # Top-down file
+            rows = rows[::-1]
+        self.pixels = rows[:, :width * self.channels].reshape(self.height, width, self.channels)
+
+    @classmethod
+    def create(cls, path, width, height, channels, palette=b''):
+        """Create a bottom-up BMP of the given size on disk, without holding it in memory."""
+        stride = (width * channels * 8 + 31) // 32 * 4
+        offset = 14 + 40 + len(palette)
+        size = offset + stride * height
+        with open(path, 'wb') as f:
+            f.write(struct.pack('<2sIHHI', b'BM', size, 0, 0, offset))
+            f.write(struct.pack('<IiiHHIIiiII', 40, width, height, 1, channels * 8, 0, stride * height,
+                                2835, 2835, len(palette) // 4, 0))
+            f.write(palette)
+            f.truncate(size)
+        return cls(path, mode='r+')
+
+    def flush(self):
+        self.map.flush()
+
+
+def source_coordinates(start, stop, scale, offset, limit):
+    """
+    Source pixel positions for destination pixels start..stop-1: the continuous position of each
+    destination pixel centre in the source, and whether it falls inside the source image.
+    """
+    position = (np.arange(start, stop, dtype=np.float64) - offset + 0.5) * scale - 0.5
+    inside = (position >= -0.5) & (position < limit - 0.5)
+    return position, inside
+
+
+def resample_tile(source, target, y0, y1, x0, x1, mode, fill):
+    """Resample one tile of the EU5 frame from the EU4 source image."""
+    src_y, inside_y = source_coordinates(y0, y1, old_height / actual_height, bottom_margin, source.height)
+    src_x, inside_x = source_coordinates(x0, x1, old_width / new_width, 0, source.width)
+    tile = np.full((y1 - y0, x1 - x0, source.channels), fill, dtype=np.uint8)
+    rows = np.flatnonzero(inside_y)
+    cols = np.flatnonzero(inside_x)
+    if rows.size and cols.size:
+        if mode == 'nearest':
+            ys = np.clip(np.rint(src_y[rows]).astype(np.intp), 0, source.height - 1)
+            xs = np.clip(np.rint(src_x[cols]).astype(np.intp), 0, source.width - 1)
+            values = source.pixels[ys[:, None], xs]
+        else:
+            ys = np.clip(src_y[rows], 0, source.height - 1)
+            xs = np.clip(src_x[cols], 0, source.width - 1)
+            y_low = np.floor(ys).astype(np.intp)
+            x_low = np.floor(xs).astype(np.intp)
+            y_high = np.minimum(y_low + 1, source.height - 1)
+            x_high = np.minimum(x_low + 1, source.width - 1)
+            wy = (ys - y_low)[:, None, None].astype(np.float32)
+            wx = (xs - x_low)[None, :, None].astype(np.float32)
+            # Only convert the columns the tile reads, not the whole source rows.
+            first, last = x_low[0], x_high[-1] + 1
+            x_low -= first
+            x_high -= first
+            low_rows = source.pixels[y_low, first:last].astype(np.float32)
+            high_rows = source.pixels[y_high, first:last].astype(np.float32)
+            top = low_rows[:, x_low] * (1 - wx) + low_rows[:, x_high] * wx
+            bottom = high_rows[:, x_low] * (1 - wx) + high_rows[:, x_high] * wx
+            values = np.rint(top * (1 - wy) + bottom * wy).astype(np.uint8)
+        tile[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1] = values
+    target.pixels[y0:y1, x0:x1] = tile
+
+
+def convert_raster(input_path, output_path, mode='nearest', fill=0, workers=None, tile_size=TILE_SIZE):
+    """
+    Convert a whole EU4 map raster to the EU5 frame with the transform from port_conversion.py.
+
+    The input and output are memory mapped and processed in tiles on a thread pool, so neither
+    image has to fit in memory. Use 'nearest' for index maps (provinces, terrain, rivers) and
+    'bilinear' for continuous ones (heightmap, normal map). Pixels in the margins get fill.
+    """
+    if mode not in ('nearest', 'bilinear'):
+        raise ValueError(f"Unknown resampling mode '{mode}'")
+    source = Bitmap(input_path)
+    if (source.width, source.height) != (old_width, old_height):
+        print(f"Warning: '{input_path}' is {source.width}x{source.height}, expected {old_width}x{old_height}.")
+    target = Bitmap.create(output_path, new_width, new_height, source.channels, source.palette)
+
+    tiles = [(y, min(y + tile_size, new_height), x, min(x + tile_size, new_width))
+             for y in range(0, new_height, tile_size) for x in range(0, new_width, tile_size)]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for future in [executor.submit(resample_tile, source, target, *tile, mode, fill) for tile in tiles]:
+            future.result()
+    target.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python raster_conversion.py <eu4_input.bmp> <eu5_output.bmp> [nearest|bilinear] [fill_value]")
+        print("\nExample:")
+        print("  python raster_conversion.py input/map/terrain.bmp output/terrain.bmp nearest")
+        print("  python raster_conversion.py input/map/heightmap.bmp output/heightmap.bmp bilinear")
+        sys.exit(1)
+
+    mode = sys.argv[3] if len(sys.argv) > 3 else 'nearest'
+    fill = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    print(f"Converting '{sys.argv[1]}' ({mode})...")
+    convert_raster(sys.argv[1], sys.argv[2], mode, fill)
+    print(f"Saved '{sys.argv[2]}'")
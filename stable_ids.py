@@ -0,0 +1,80 @@
+import csv
+import os
+
+from outputs import DIRECT_OUTPUT
+
+
+class StableIdAllocator:
+    """
+    Assigns unique names to provinces and locations that stay the same across runs.
+
+    Each (kind, old_province_number, base_name, occurrence) gets a name the first time it is
+    seen: the base name if it is free, otherwise the base name with the lowest free numeric
+    suffix. occurrence counts the rows with the same kind, province number and base name within
+    a run, so repeated rows keep their suffixes too. The mapping is persisted to a csv table and
+    reused on later runs, so adding or reordering rows upstream never renames existing provinces
+    or locations. Names of rows that disappear stay reserved.
+    """
+    fieldnames = ['kind', 'old_province_number', 'base_name', 'occurrence', 'name']
+
+    def __init__(self, table_file):
+        self.table_file = table_file
+        self.assigned = {}      # (kind, old_province_number, base_name, occurrence) -> name
+        self.taken = {}         # kind -> set of names in use or reserved
+        self.next_suffix = {}   # (kind, base_name) -> next suffix to try
+        self.occurrences = {}   # (kind, old_province_number, base_name) -> rows seen during this run
+        self.changed = False
+
+        if os.path.exists(table_file):
+            with open(table_file, 'r', encoding='utf-8-sig') as file:
+                for row in csv.DictReader(file):
+                    key = (row['kind'], row['old_province_number'], row['base_name'], int(row.get('occurrence') or 1))
+                    self.assigned[key] = row['name']
+                    self.taken.setdefault(row['kind'], set()).add(row['name'])
+
+    def allocate(self, kind, old_province_number, base_name):
+        """Return the stable unique name for a row, allocating and recording a new one if needed."""
+        row_key = (kind, str(old_province_number), base_name)
+        occurrence = self.occurrences.get(row_key, 0) + 1
+        self.occurrences[row_key] = occurrence
+        key = (*row_key, occurrence)
+        if key in self.assigned:
+            return self.assigned[key]
+
+        taken = self.taken.setdefault(kind, set())
+        name = base_name
+        if name in taken:
+            suffix = self.next_suffix.get((kind, base_name), 2)
+            while f'{base_name}_{suffix}' in taken:
+                suffix += 1
+            self.next_suffix[(kind, base_name)] = suffix + 1
+            name = f'{base_name}_{suffix}'
+
+        taken.add(name)
+        self.assigned[key] = name
+        self.changed = True
+        return name
+
+    def start_run(self):
+        """Start counting occurrences again, to allocate the sheet another time in the same process."""
+        self.occurrences = {}
+
+    def save(self, output=DIRECT_OUTPUT):
+        """Write the table back to disk if new names were allocated during this run."""
+        if not self.changed:
+            return
+        rows = sorted(self.assigned.items(),
+                      key=lambda item: (item[0][0], sort_number(item[0][1]), item[0][2], item[0][3]))
+        with output.open(self.table_file, encoding='utf-8-sig', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(self.fieldnames)
+            for (kind, old_province_number, base_name, occurrence), name in rows:
+                writer.writerow([kind, old_province_number, base_name, occurrence, name])
+        self.changed = False
+
+
+def sort_number(value):
+    try:
+        return (0, int(value))
+    except ValueError:
+        return (1, value)
@@ -0,0 +1,72 @@
+import csv
+import random
+from array import array
+
+from colours import (BLANK, CANDIDATE_LEVELS, KDTree, assign_colours, distance, find_collisions, lab_array,
+                     parse_colour, resolve_colours, to_lab)
+
+
+def test_parse_colour_formats():
+    assert parse_colour('(90, 0, 0)') == 0x5A0000
+    assert parse_colour('1 2 3') == 0x010203
+    assert parse_colour('') == BLANK
+    assert parse_colour('(300, 0, 0)') == BLANK
+
+
+def test_lab_conversion_reference_values():
+    expected = [(0.0, 0.0, 0.0), (100.0, 0.0, 0.0), (53.24, 80.09, 67.20)]
+    for row, reference in zip(lab_array([0x000000, 0xFFFFFF, 0xFF0000]), expected):
+        assert all(abs(a - b) < 0.05 for a, b in zip(row, reference))
+    assert to_lab(0xFF0000) == tuple(lab_array([0xFF0000])[0])
+
+
+def test_kdtree_nearest_and_within_match_brute_force():
+    rng = random.Random(1)
+    points = [(to_lab(rng.randrange(1 << 24)), i) for i in range(300)]
+    tree = KDTree(points)
+    for _ in range(100):
+        query = to_lab(rng.randrange(1 << 24))
+        expected = min(distance(query, point) for point, _ in points)
+        assert abs(tree.nearest(query)[0] - expected) < 1e-9
+        within = sorted(tree.within(query, 20.0))
+        assert within == sorted(i for point, i in points if distance(query, point) <= 20.0)
+
+
+def test_assign_colours_picks_farthest_candidates_and_keeps_existing():
+    keys = ['a', 'b', 'c', 'd']
+    colours = array('i', [0xFF0000, BLANK, 0xFF0000, 0x00FF00])
+    assigned = assign_colours(keys, colours)
+    assert assigned == ['b', 'c']
+    assert colours[0] == 0xFF0000 and colours[3] == 0x00FF00
+    assert len(set(colours)) == 4
+    duplicates, _ = find_collisions(keys, colours, min_distance=0)
+    assert duplicates == []
+
+
+def test_assign_colours_refines_the_grid_when_it_runs_out():
+    count = len(CANDIDATE_LEVELS) ** 3 + 100
+    colours = array('i', [BLANK] * count)
+    assigned = assign_colours([str(i) for i in range(count)], colours)
+    assert len(assigned) == count
+    assert len(set(colours)) == count
+
+
+def test_resolve_colours_treats_black_as_placeholder(tmp_path):
+    data = {'a': {'color': '(0, 0, 0)'}, 'b': {'color': '(0, 0, 0)'}, 'c': {'color': '(10, 20, 30)'}}
+    colours = resolve_colours('test', data, report_dir=str(tmp_path))
+    assert colours['c'] == 0x0A141E
+    assert colours['a'] != 0 and colours['b'] != 0 and colours['a'] != colours['b']
+
+
+def test_resolve_colours_keeps_first_use_and_reports_pairs(tmp_path):
+    data = {'a': {'color': '(200, 0, 0)'}, 'b': {'color': '(200, 0, 0)'}, 'c': {'color': '(0, 0, 200)'},
+            'd': {'color': '(0, 0, 201)'}}
+    colours = resolve_colours('test', data, report_dir=str(tmp_path))
+    assert colours['a'] == 0xC80000
+    assert colours['b'] != 0xC80000
+    # Near-collisions are only reported.
+    assert colours['c'] == 0x0000C8 and colours['d'] == 0x0000C9
+    with open(tmp_path / 'colours_test.csv', encoding='utf-8-sig') as file:
+        rows = [row[:4] for row in csv.reader(file)][1:]
+    assert ['b', 'duplicate', 'a', '200 0 0'] in rows
+    assert ['c', 'near', 'd', '0 0 200'] in rows
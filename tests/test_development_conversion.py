@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from development_conversion import DevelopmentConversion, evaluate_formula, parse_formula, parse_province_history
+
+
+def test_formulas_are_arithmetic_on_named_columns():
+    variables = {'base_tax': np.array([1.0, 2.0]), 'base_production': np.array([3.0, 4.0]),
+                 'base_manpower': np.array([0.0, 1.0]), 'development': np.array([4.0, 7.0])}
+    formula = parse_formula('1.5 * base_tax + (base_production - 1) / 2 ** 2 - -development')
+    assert evaluate_formula(formula, variables).tolist() == [6.0, 10.75]
+    assert evaluate_formula(parse_formula('2'), variables) == 2.0
+
+
+@pytest.mark.parametrize('formula', ['__import__("os")', 'np.sqrt(development)', 'development.real', 'unknown',
+                                     'development % 2', 'development < 2', '[development]', 'True', '1 +'])
+def test_formulas_reject_anything_else(formula):
+    with pytest.raises(ValueError):
+        parse_formula(formula)
+
+
+def test_history_applies_dated_blocks_up_to_the_start_date():
+    history = parse_province_history('''
+        base_tax = 3  # comment
+        base_production = 2
+        discovered_by = { western eastern }
+        1500.1.1 = { base_tax = 9 }
+        1444.1.1 = { base_production = 4 temple = yes }
+        1300.1.1 = { base_production = 3 owner = "A01" }
+    ''')
+    assert history == {'base_tax': '3', 'base_production': '4', 'temple': 'yes', 'owner': 'A01'}
+
+
+def test_pops_are_split_by_topography_and_buildings_go_to_the_main_location():
+    data = {
+        'plain': {'old_province_number': '1', 'topography': 'flatland', 'culture': 'a', 'religion': 'r'},
+        'peak': {'old_province_number': '1', 'topography': 'mountains', 'culture': 'a', 'religion': 'r'},
+        'sea': {'old_province_number': '1', 'location_type': 'sea'},
+        'other': {'old_province_number': '2', 'topography': 'hills'},
+        'unnumbered': {'old_province_number': ''},
+    }
+    history = {1: {'base_tax': '3', 'base_production': '0', 'base_manpower': '0', 'temple': 'yes'},
+               2: {'base_tax': '1', 'base_production': '1', 'base_manpower': '1'}}
+    formulas = {'peasants': parse_formula('base_tax'), 'nobles': parse_formula('0.1 * development')}
+    conversion = DevelopmentConversion(data, history, formulas, {'temple': ('temple', 2)})
+    assert conversion.locations == ['plain', 'peak', 'sea', 'other']
+    assert conversion.pops['peasants'].tolist() == [2.0, 1.0, 0.0, 1.0]
+    assert conversion.pops['nobles'].tolist() == [0.2, 0.1, 0.0, 0.3]
+    assert conversion.buildings == {'plain': [('temple', 2)]}
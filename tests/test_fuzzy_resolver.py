@@ -0,0 +1,63 @@
+import csv
+
+from fuzzy_resolver import FALLBACK_CULTURE, FALLBACK_RELIGION, ReferenceResolver, TrigramIndex, trigrams
+
+CULTURES = {
+    'high_lorentish': {'language/dialect': 'lorentish_dialect'},
+    'low_lorentish': {'language/dialect': 'lorentish_dialect'},
+    'dakinshi': {'language/dialect': ''},
+}
+RELIGIONS = {'regent_court': {}, 'khetist': {}}
+LOCATIONS = {
+    'vertesk': {'area': 'wesdam_area', 'culture': 'high_lorentish', 'religion': 'regent_court'},
+    'nowhere': {'area': 'wesdam_area', 'culture': 'high_lorentish', 'religion': ''},
+    'somewhere': {'area': 'wesdam_area', 'culture': 'low_lorentish', 'religion': ''},
+}
+
+
+def test_trigrams_ignore_case_separators_and_suffixes():
+    assert trigrams('High_Lorentish_culture') == trigrams('high lorentish')
+    assert trigrams('bwa-dakinshi') == trigrams('bwa dakinshi')
+
+
+def test_search_ranks_by_dice_and_returns_each_target_once():
+    index = TrigramIndex()
+    index.add('dakinshi', 'dakinshi')
+    index.add('bwa_dakinshi', 'dakinshi')
+    index.add('khetist', 'khetist')
+    results = index.search('Dakinshi')
+    assert [target for target, _, _ in results] == ['dakinshi']
+    assert results[0][1] == 1.0 and results[0][2] == 'dakinshi'
+    assert index.search('zzzz') == []
+
+
+def test_country_and_ruler_resolution(tmp_path):
+    resolver = ReferenceResolver(LOCATIONS, CULTURES, RELIGIONS)
+    country = {'tag': 'A01', 'capital': 'vertesk', 'name': '', 'court_language': '',
+               'culture_definition': 'not found', 'religion_definition': 'regent_court'}
+    resolver.resolve_country(country)
+    assert country['culture_definition'] == 'high_lorentish'
+    assert country['religion_definition'] == 'regent_court'
+
+    ruler = {'tag': 'A01', 'character_tag': 'A01_ruler', 'birth_place': '', 'culture': 'Dakinshi',
+             'religion': 'unknown_religion'}
+    resolver.resolve_ruler(ruler)
+    assert ruler['culture'] == 'dakinshi'
+    assert ruler['religion'] == 'regent_court'  # From the ruler's country.
+
+    stranger = {'tag': 'B02', 'character_tag': 'B02_ruler', 'birth_place': '', 'culture': 'not found',
+                'religion': ''}
+    resolver.resolve_ruler(stranger)
+    assert (stranger['culture'], stranger['religion']) == (FALLBACK_CULTURE, FALLBACK_RELIGION)
+
+    report_file = tmp_path / 'reports' / 'resolutions.csv'
+    resolver.write_report(str(report_file))
+    with open(report_file, 'r', encoding='utf-8-sig') as file:
+        rows = list(csv.DictReader(file))
+    assert [(row['subject'], row['column'], row['resolved']) for row in rows] == [
+        ('A01', 'culture_definition', 'high_lorentish'),
+        ('A01_ruler', 'culture', 'dakinshi'),
+        ('A01_ruler', 'religion', 'regent_court'),
+        ('B02_ruler', 'culture', FALLBACK_CULTURE),
+        ('B02_ruler', 'religion', FALLBACK_RELIGION),
+    ]
@@ -0,0 +1,40 @@
+import pytest
+
+from location_lists import LocationList, classify_locations, load_location_list_rules, write_location_lists
+
+LOCATIONS = {
+    'vertesk': {'location_name': 'vertesk', 'location_type': 'land', 'topography': 'flatland', 'climate': 'oceanic'},
+    'dead_waste': {'location_name': 'dead_waste', 'location_type': 'land', 'topography': 'dry_wasteland',
+                   'climate': 'arid'},
+    'dameshead': {'location_name': 'dameshead', 'location_type': 'sea', 'topography': '', 'climate': ''},
+    'wesdam': {'location_name': 'wesdam', 'location_type': 'land', 'topography': 'hills', 'climate': 'oceanic'},
+}
+
+
+def test_rules_file_classifies_in_one_pass(tmp_path):
+    rules_file = tmp_path / 'rules.csv'
+    rules_file.write_text('list_name,column,operator,value\n'
+                          'sea_zones,location_type,equals,sea\n'
+                          'lakes,location_type,equals,lake\n'
+                          'wasteland,topography,endswith,_wasteland\n'
+                          'oceanic_land,location_type,equals,land\n'
+                          'oceanic_land,climate,in,oceanic|temperate\n'
+                          'climate_{value},climate,group,\n', encoding='utf-8-sig')
+    results = classify_locations(LOCATIONS, load_location_list_rules(str(rules_file)))
+    assert results == {
+        'sea_zones': ['dameshead'],
+        'lakes': [],
+        'wasteland': ['dead_waste'],
+        'oceanic_land': ['vertesk', 'wesdam'],
+        'climate_oceanic': ['vertesk', 'wesdam'],
+        'climate_arid': ['dead_waste'],
+    }
+
+    write_location_lists(results, str(tmp_path / 'lists'))
+    assert (tmp_path / 'lists' / 'climate_oceanic.txt').read_text(encoding='utf-8') == '\tvertesk\n\twesdam\n'
+    assert (tmp_path / 'lists' / 'lakes.txt').read_text(encoding='utf-8') == ''
+
+
+def test_unknown_operator_is_an_error():
+    with pytest.raises(ValueError):
+        LocationList('broken').add_rule('climate', 'matches', 'x')
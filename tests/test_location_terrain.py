@@ -0,0 +1,94 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from location_terrain import DEFAULT_MAPPING_FILE, apply_terrain_defaults, load_terrain_mapping
+from raster_conversion import Bitmap
+
+PROVINCE_COLOURS = {1: (10, 0, 0), 2: (0, 20, 0), 3: (0, 0, 30), 4: (40, 40, 40)}
+TOPOGRAPHY = {1: 'flatland', 2: 'hills', 3: 'mountains', 4: 'wetlands'}
+
+
+def make_map(map_dir, width=200, height=100):
+    """EU4 provinces raster split into quadrants, and a terrain raster whose majority is the province's class."""
+    y, x = np.mgrid[0:height, 0:width]
+    province = 1 + (x >= width // 2) + 2 * (y >= height // 2)
+    provinces = Bitmap.create(os.path.join(map_dir, 'provinces.bmp'), width, height, 3)
+    for number, (red, green, blue) in PROVINCE_COLOURS.items():
+        provinces.pixels[province == number] = (blue, green, red)
+    provinces.flush()
+    with open(os.path.join(map_dir, 'definition.csv'), 'w', encoding='latin-1') as file:
+        file.write('province;red;green;blue;x;x\n')
+        for number, (red, green, blue) in PROVINCE_COLOURS.items():
+            file.write(f'{number};{red};{green};{blue};name;x\n')
+    terrain = Bitmap.create(os.path.join(map_dir, 'terrain.bmp'), width, height, 1, bytes(1024))
+    terrain.pixels[..., 0] = np.where(x % 3 == 0, 2, province)  # A third of every province is hills.
+    terrain.flush()
+    mapping_file = os.path.join(map_dir, 'terrain_mapping.csv')
+    with open(mapping_file, 'w', encoding='utf-8') as file:
+        file.write('raster,index,column,value\n')
+        for index, value in TOPOGRAPHY.items():
+            file.write(f'terrain.bmp,{index},topography,{value}\n')
+    return mapping_file
+
+
+def test_blank_cells_get_the_majority_class_and_disagreements_are_reported(tmp_path):
+    mapping_file = make_map(str(tmp_path))
+    data = {
+        'a': {'old_province_number': '1', 'topography': ''},
+        'a2': {'old_province_number': '1', 'topography': 'hills'},
+        'b': {'old_province_number': '2', 'topography': ''},
+        'c': {'old_province_number': '3', 'topography': 'mountains'},
+        'd': {'old_province_number': '4', 'topography': ''},
+        'e': {'old_province_number': '9', 'topography': ''},
+    }
+    report_file = str(tmp_path / 'reports' / 'disagreements.csv')
+    apply_terrain_defaults(data, str(tmp_path), mapping_file, report_file)
+
+    assert {key: value['topography'] for key, value in data.items()} == {
+        'a': 'flatland', 'a2': 'hills', 'b': 'hills', 'c': 'mountains', 'd': 'wetlands', 'e': ''}
+    with open(report_file, 'r', encoding='utf-8-sig') as file:
+        rows = list(csv.DictReader(file))
+    assert [(row['location'], row['sheet_value'], row['map_value']) for row in rows] == [('a2', 'hills', 'flatland')]
+    assert abs(float(rows[0]['map_share']) - 2 / 3) < 0.01
+
+
+def test_mapping_indices_are_palette_numbers_or_prefixed_hex(tmp_path):
+    mapping_file = tmp_path / 'mapping.csv'
+    mapping_file.write_text('raster,index,column,value\nterrain.bmp,12,vegetation,forest\n'
+                            'climate.bmp,#000012,climate,arid\n', encoding='utf-8')
+    assert load_terrain_mapping(str(mapping_file)) == {'terrain.bmp': {'vegetation': {12: 'forest'}},
+                                                       'climate.bmp': {'climate': {0x12: 'arid'}}}
+    for index in ('ff0012', '256', '#12'):
+        mapping_file.write_text(f'raster,index,column,value\nterrain.bmp,{index},topography,hills\n', encoding='utf-8')
+        with pytest.raises(ValueError):
+            load_terrain_mapping(str(mapping_file))
+    mapping_file.write_text('raster,index,column,value\nterrain.png,1,topography,hills\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='bmp'):
+        load_terrain_mapping(str(mapping_file))
+
+
+def test_shipped_mapping_loads():
+    assert 'terrain.bmp' in load_terrain_mapping(DEFAULT_MAPPING_FILE)
+
+
+def test_missing_map_files_are_reported_before_reading(tmp_path):
+    mapping_file = make_map(str(tmp_path))
+    os.remove(tmp_path / 'definition.csv')
+    (tmp_path / 'terrain.bmp').rename(tmp_path / 'terrain.png')
+    data = {'a': {'old_province_number': '1', 'topography': ''}}
+    with pytest.raises(FileNotFoundError) as error:
+        apply_terrain_defaults(data, str(tmp_path), mapping_file, str(tmp_path / 'report.csv'))
+    assert "'definition.csv'" in str(error.value)
+    assert "found 'terrain.png'" in str(error.value)
+    assert not (tmp_path / 'report.csv').exists()
+
+
+def test_empty_mapping_fills_nothing(tmp_path):
+    mapping_file = tmp_path / 'mapping.csv'
+    mapping_file.write_text('raster,index,column,value\n', encoding='utf-8')
+    data = {'a': {'old_province_number': '1', 'topography': ''}}
+    assert apply_terrain_defaults(data, str(tmp_path / 'no_map'), str(mapping_file)) == 0
+    assert data['a']['topography'] == ''
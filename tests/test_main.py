@@ -0,0 +1,25 @@
+from main import RenderMemo, TransitionBuild
+
+
+def test_render_memo_renders_again_only_when_arguments_change():
+    calls = []
+
+    def render_name(template, name):
+        calls.append(name)
+        return template.replace('PH_NAME', name)
+
+    memo = RenderMemo()
+    assert memo.render(render_name, 'a', 'PH_NAME = yes', 'a') == 'a = yes'
+    assert memo.render(render_name, 'a', 'PH_NAME = yes', 'a') == 'a = yes'
+    assert memo.render(render_name, 'b', 'PH_NAME = yes', 'b') == 'b = yes'
+    assert memo.render(render_name, 'a', 'PH_NAME = no', 'a') == 'a = no'
+    assert calls == ['a', 'b', 'a']
+    assert memo.rendered == 3
+
+
+def test_inputs_changed_matches_sheets_and_patterns():
+    build = TransitionBuild.__new__(TransitionBuild)
+    inputs = ['sheet:culture', 'templates/anb_culture_template.txt']
+    assert build.inputs_changed(inputs, {'culture'}, [])
+    assert build.inputs_changed(inputs, set(), ['templates/anb_culture_template.txt'])
+    assert not build.inputs_changed(inputs, {'rulers'}, ['templates/anb_religion_template.txt'])
@@ -0,0 +1,60 @@
+from name_lists import (aggregate_characters, dynasty_key, fill_name_placeholders, format_name_block,
+                        load_character_history, ranked)
+
+CHARACTERS = [
+    {'first_name': 'Lothane', 'culture': 'high_lorentish', 'dynasty': 'síl Lorentis', 'female': ''},
+    {'first_name': 'Lothane', 'culture': 'high_lorentish', 'dynasty': 'síl Lorentis', 'female': ''},
+    {'first_name': 'Adrien', 'culture': 'high_lorentish', 'dynasty': 'Roilsard', 'female': ''},
+    {'first_name': 'Lisolette', 'culture': 'high_lorentish', 'dynasty': 'Roilsard', 'female': 'yes'},
+    {'first_name': 'Rean', 'culture': 'low_lorentish', 'dynasty': 'Roilsard', 'female': ''},
+    {'first_name': 'Anna-Marie', 'culture': 'low_lorentish', 'dynasty': 'unknown_dynasty', 'female': 'yes'},
+    {'first_name': 'Varilor', 'culture': 'moon_elf', 'dynasty': "ta'lunatein", 'female': ''},
+    {'first_name': 'Nobody', 'culture': '', 'dynasty': '', 'female': ''},
+]
+
+
+def test_names_are_ranked_by_frequency_then_alphabetically():
+    assert ranked({'b': 1, 'a': 1, 'c': 2}) == ['c', 'a', 'b']
+    name_lists = aggregate_characters(CHARACTERS)
+    male, female, dynasties = name_lists.names_for(['high_lorentish'])
+    assert male == ['Lothane', 'Adrien']
+    assert female == ['Lisolette']
+    assert dynasties == ['Roilsard', 'síl Lorentis']
+
+
+def test_cultures_are_merged_and_placeholder_dynasties_skipped():
+    name_lists = aggregate_characters(CHARACTERS)
+    male, female, dynasties = name_lists.names_for(['high_lorentish', 'low_lorentish', 'missing'])
+    assert male == ['Lothane', 'Adrien', 'Rean']
+    assert female == ['Anna_Marie', 'Lisolette']
+    assert dynasties == ['Roilsard', 'síl Lorentis']
+    assert 'unknown_dynasty' not in name_lists.dynasties
+    assert name_lists.dynasty_culture('roilsard') == 'high_lorentish'
+    assert name_lists.dynasty_culture('missing') == ''
+
+
+def test_dynasty_keys_are_sanitised_and_names_quoted():
+    name_lists = aggregate_characters(CHARACTERS)
+    assert ranked(name_lists.dynasties) == ['roilsard', 'sil_lorentis', 'talunatein']
+    assert name_lists.dynasty_name('sil_lorentis') == 'síl Lorentis'
+    assert name_lists.dynasty_name('talunatein') == "ta'lunatein"
+    assert dynasty_key("'castan'") == 'castan'
+    assert dynasty_key('unknown_dynasty') == ''
+    assert format_name_block(['Roilsard', 'síl Lorentis', "ta'lunatein"], '') == \
+        'Roilsard "síl Lorentis" "ta\'lunatein"'
+
+
+def test_placeholders_are_filled_or_removed():
+    template = '\tmale_names = {\nPH_MALE_NAMES\n\t}\n\tfemale_names = {\nPH_FEMALE_NAMES\n\t}\n'
+    names = ([f'm{i}' for i in range(12)], [], [])
+    assert fill_name_placeholders(template, names, '\t\t') == (
+        '\tmale_names = {\n\t\tm0 m1 m2 m3 m4 m5 m6 m7 m8 m9\n\t\tm10 m11\n\t}\n\tfemale_names = {\n\t}\n')
+    assert format_name_block(['a', 'b', 'c'], '  ', per_line=2) == '  a b\n  c'
+
+
+def test_character_history_reads_every_csv(tmp_path):
+    (tmp_path / 'b.csv').write_text('first_name,culture\nB,x\n', encoding='utf-8-sig')
+    (tmp_path / 'a.csv').write_text('first_name,culture\nA,x\n', encoding='utf-8-sig')
+    (tmp_path / 'notes.txt').write_text('ignored')
+    assert [row['first_name'] for row in load_character_history(str(tmp_path))] == ['A', 'B']
+    assert list(load_character_history(str(tmp_path / 'missing'))) == []
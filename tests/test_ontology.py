@@ -0,0 +1,61 @@
+from ontology import DEFAULT_LANGUAGE_FAMILY, Ontology
+
+CULTURES = {
+    'high_lorentish': {'culture_groups': 'lencori', 'language/dialect': 'lorentish_dialect'},
+    'low_lorentish': {'culture_groups': 'lencori', 'language/dialect': 'lorentish_dialect'},
+    'derannic': {'culture_groups': 'lencori', 'language/dialect': 'lencori_language'},
+    'dakinshi': {'culture_groups': 'kheteratan', 'language/dialect': 'kheteratan_language'},
+}
+LANGUAGES = {'lencori_language': {'family': 'cannorian_family'}, 'kheteratan_language': {'family': ''}}
+DIALECTS = {'lorentish_dialect': {'language': 'lencori_language'}}
+FAMILIES = {'cannorian_family': {}}
+RELIGIONS = {'regent_court': {'religious_group': 'cannorian'}, 'corinite': {'religious_group': 'cannorian'}}
+
+
+def build():
+    return Ontology.build(CULTURES, LANGUAGES, DIALECTS, FAMILIES, RELIGIONS)
+
+
+def test_closure_membership():
+    ontology = build()
+    assert ontology.descendants_of('language_family', 'cannorian_family', 'culture') == (
+        'high_lorentish', 'low_lorentish', 'derannic')
+    assert ontology.descendants_of('language', 'lencori_language', 'dialect') == ('lorentish_dialect',)
+    assert ontology.descendants_of('language_family', DEFAULT_LANGUAGE_FAMILY, 'culture') == ('dakinshi',)
+    assert ontology.descendants_of('religious_group', 'cannorian', 'culture') == ()
+    assert ontology.descendants_of('language', 'missing', 'culture') == ()
+    assert ontology.is_under('culture', 'high_lorentish', 'language_family', 'cannorian_family')
+    assert ontology.is_under('dialect', 'lorentish_dialect', 'language', 'lencori_language')
+    assert not ontology.is_under('culture', 'dakinshi', 'language_family', 'cannorian_family')
+    assert not ontology.is_under('culture', 'missing', 'culture_group', 'lencori')
+
+
+def test_all_and_members_keep_insertion_order():
+    ontology = build()
+    assert ontology.all('culture_group') == ('lencori', 'kheteratan')
+    assert ontology.all('language_family') == ('cannorian_family', DEFAULT_LANGUAGE_FAMILY)
+    assert ontology.all('missing') == ()
+    assert ontology.members('religious_group', 'cannorian', 'religion') == ['regent_court', 'corinite']
+    assert ontology.members('culture_group', 'missing', 'culture') == []
+
+
+def test_ancestor_is_the_nearest_one():
+    ontology = Ontology()
+    culture = ontology.node('culture', 'c')
+    far_language = ontology.node('language', 'far')  # Lower id than the nearer language.
+    dialect = ontology.node('dialect', 'd')
+    near_language = ontology.node('language', 'near')
+    ontology.add_edge(culture, dialect)
+    ontology.add_edge(dialect, near_language)
+    ontology.add_edge(near_language, far_language)
+    ontology.finalize()
+    assert ontology.ancestor('culture', 'c', 'language') == 'near'
+    assert ontology.ancestor('culture', 'c', 'language_family') is None
+    assert build().ancestor('culture', 'high_lorentish', 'language') == 'lencori_language'
+
+
+def test_unknown_names_give_none():
+    ontology = build()
+    assert ontology.parent('culture', 'missing', 'culture_group') is None
+    assert ontology.ancestor('culture', 'missing', 'language') is None
+    assert ontology.parent('culture', 'derannic', 'culture_group') == 'lencori'
@@ -0,0 +1,39 @@
+import os
+
+from outputs import BufferedOutput
+
+
+def test_commit_writes_changed_files_only(tmp_path):
+    path = str(tmp_path / 'out.txt')
+    output = BufferedOutput()
+    with output.open(path, newline='\n') as f:
+        f.write('a = yes\n')
+    assert not os.path.exists(path)
+    assert output.commit() == [path]
+    assert (tmp_path / 'out.txt').read_bytes() == 'a = yes\n'.encode('utf-8-sig')
+
+    os.utime(path, ns=(0, 0))
+    with output.open(path, newline='\n') as f:
+        f.write('a = yes\n')
+    assert output.commit() == []
+    assert os.stat(path).st_mtime_ns == 0
+
+
+def test_empty_output_has_no_bom(tmp_path):
+    path = str(tmp_path / 'empty.txt')
+    (tmp_path / 'empty.txt').write_bytes(b'')
+    output = BufferedOutput()
+    with output.open(path):
+        pass
+    assert output.commit() == []
+    assert (tmp_path / 'empty.txt').read_bytes() == b''
+
+
+def test_discard_writes_nothing(tmp_path):
+    path = str(tmp_path / 'partial.txt')
+    output = BufferedOutput()
+    with output.open(path) as f:
+        f.write('partial')
+    output.discard()
+    assert output.commit() == []
+    assert not os.path.exists(path)
@@ -0,0 +1,35 @@
+from ownership_index import OwnershipIndex, iter_bits
+
+LOCATIONS = {
+    'vertesk': {'owner': 'A01', 'cores': 'A01, A02'},
+    'wesdam': {'owner': 'A01', 'cores': 'A02'},
+    'moonhaven': {'owner': 'A02', 'cores': ''},
+    'eargate': {'owner': 'Z99', 'cores': 'A03,Z99'},
+    'nowhere': {'owner': '', 'cores': ''},
+}
+
+
+def test_ownership_and_cores():
+    index = OwnershipIndex.build(['A01', 'A02', 'A03', 'A04'], LOCATIONS)
+    assert index.owned_core('A01') == ['vertesk']
+    assert index.owned_non_core('A01') == ['wesdam']
+    assert index.owned('A01') == ['vertesk', 'wesdam']
+    assert index.unowned_core('A02') == ['vertesk', 'wesdam']
+    assert index.unowned_core('A03') == ['eargate']
+    assert index.counts('A02') == (0, 1, 2)
+    assert index.countries_without_land() == ['A03', 'A04']
+
+
+def test_location_lookups():
+    index = OwnershipIndex.build(['A01', 'A02', 'A03'], LOCATIONS)
+    assert index.owner_of('vertesk') == 'A01'
+    assert index.owner_of('eargate') is None  # Unknown owner tag.
+    assert index.cores_of('vertesk') == ['A01', 'A02']
+    assert index.has_core('A02', 'wesdam')
+    assert not index.has_core('A01', 'wesdam')
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(1 << 200)) == [200]
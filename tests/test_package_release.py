@@ -0,0 +1,53 @@
+import os
+import zipfile
+
+import package_release
+from package_release import package_release as package
+
+
+def make_tree(root, files):
+    for path, text in files.items():
+        full_path = os.path.join(root, 'game', *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return os.path.join(root, 'game')
+
+
+def test_identical_trees_give_byte_identical_archives(tmp_path):
+    files = {'in_game/a.txt': 'a = yes\n' * 100, 'main_menu/b.yml': 'l_english:\n'}
+    first = package('1', make_tree(tmp_path / 'one', files), str(tmp_path / 'releases_one'))
+    second = package('1', make_tree(tmp_path / 'two', files), str(tmp_path / 'releases_two'))
+    assert first['tree_blake2b'] == second['tree_blake2b']
+    assert first['full_archive']['blake2b'] == second['full_archive']['blake2b']
+    with open(tmp_path / 'releases_one' / '1' / '1_full.zip', 'rb') as a, \
+            open(tmp_path / 'releases_two' / '1' / '1_full.zip', 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_delta_contains_only_changed_files(tmp_path):
+    source = make_tree(tmp_path, {'a.txt': 'a', 'b.txt': 'b', 'c.txt': 'c'})
+    releases = str(tmp_path / 'releases')
+    package('1', source, releases)
+    make_tree(tmp_path, {'b.txt': 'changed', 'd.txt': 'new'})
+    os.remove(os.path.join(source, 'c.txt'))
+    manifest = package('2', source, releases)
+
+    delta = manifest['delta_archive']
+    assert delta['previous_version'] == '1'
+    assert delta['changed'] == ['game/b.txt', 'game/d.txt']
+    assert delta['removed'] == ['game/c.txt']
+    with zipfile.ZipFile(os.path.join(releases, '2', delta['file'])) as archive:
+        assert archive.namelist() == ['game/b.txt', 'game/d.txt']
+        assert all(info.date_time == package_release.ZIP_DATE_TIME for info in archive.infolist())
+
+
+def test_compression_level_is_applied(tmp_path, monkeypatch):
+    source = make_tree(tmp_path, {'a.txt': ''.join(f'key_{i} = value_{i * 7919 % 1000}\n' for i in range(20000))})
+    sizes = []
+    for level in (1, 9):
+        monkeypatch.setattr(package_release, 'ZIP_COMPRESS_LEVEL', level)
+        archive_file = str(tmp_path / f'{level}.zip')
+        package_release.write_archive(archive_file, source, package_release.fingerprint_tree(source))
+        sizes.append(os.path.getsize(archive_file))
+    assert sizes[1] < sizes[0]
@@ -0,0 +1,88 @@
+import csv
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from query_service import QueryHandler, TransitionIndex, load_loc
+
+SHEETS = {
+    'locations_converted': [
+        {'location_name': 'vertesk', 'old_province_number': '1', 'continent': 'cannor', 'superregion': '',
+         'region': 'lencenor_region', 'area': 'wesdam_area', 'province': 'vertesk',
+         'culture': 'high_lorentish', 'religion': 'regent_court', 'owner': 'A01', 'cores': 'A01,A02'},
+        {'location_name': 'wesdam', 'old_province_number': '2', 'continent': 'cannor', 'superregion': '',
+         'region': '', 'area': '', 'province': 'wesdam',
+         'culture': 'low_lorentish', 'religion': 'regent_court', 'owner': 'A02', 'cores': ''},
+    ],
+    'countries_converted': [
+        {'tag': 'A01', 'culture_definition': 'high_lorentish', 'religion_definition': 'regent_court'},
+        {'tag': 'A02', 'culture_definition': 'low_lorentish', 'religion_definition': 'regent_court'},
+        {'tag': 'A03', 'culture_definition': 'high_lorentish', 'religion_definition': 'corinite'},
+    ],
+    'rulers_converted': [{'character_tag': 'A01_ruler', 'tag': 'A01', 'culture': 'high_lorentish',
+                          'religion': 'regent_court'}],
+    'culture': [{'culture': 'high_lorentish'}, {'culture': 'low_lorentish'}],
+    'religions': [{'religion': 'regent_court'}, {'religion': 'corinite'}],
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for table, rows in SHEETS.items():
+        with open(tmp_path / f'anbennar_eu5_transition_data_{table}.csv', 'w', encoding='utf-8-sig',
+                  newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    (tmp_path / 'input' / 'loc').mkdir(parents=True)
+    (tmp_path / 'input' / 'loc' / 'test.yml').write_text(
+        'l_english:\n vertesk:0 "Vertesk" # city\n wesdam: "Wesdam"\n', encoding='utf-8-sig')
+    return str(tmp_path)
+
+
+def test_index_answers(data_dir):
+    index = TransitionIndex(data_dir)
+    assert index.location('vertesk')['cores'] == ['A01', 'A02']
+    assert index.location('missing') is None
+    assert [row['location_name'] for row in index.province_number('2')] == ['wesdam']
+    country = index.country('A02')
+    assert country['owned_non_core'] == ['wesdam']
+    assert country['unowned_core'] == ['vertesk']
+    assert index.country('A01')['rulers'] == ['A01_ruler']
+    assert index.landless() == ['A03']
+    assert index.culture('high_lorentish')['countries'] == ['A01', 'A03']
+    assert index.religion('corinite') == {'religion': {'religion': 'corinite'}, 'locations': [],
+                                          'countries': ['A03'], 'rulers': []}
+    assert index.hierarchy('area', 'wesdam_area') == ['vertesk']
+    # Blank levels get main.py's placeholders.
+    assert index.hierarchy('superregion', 'unknown_cannor_superregion') == ['vertesk', 'wesdam']
+    assert index.hierarchy('area', 'unknown_unknown_unknown_cannor_superregion_region_area') == ['wesdam']
+    assert index.hierarchy('kingdom', 'x') is None
+    assert index.localisation('vertesk') == 'Vertesk'
+
+
+def test_load_loc(tmp_path):
+    path = tmp_path / 'a.yml'
+    path.write_text('l_english:\n key:1 "Text" # comment\n other: "More"\n', encoding='utf-8-sig')
+    assert load_loc([str(path)]) == {'key': 'Text', 'other': 'More'}
+
+
+def test_http_routes(data_dir):
+    QueryHandler.index = TransitionIndex(data_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), QueryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urlopen(f'{base}/hierarchy/superregion/unknown_cannor_superregion') as response:
+            assert json.load(response) == ['vertesk', 'wesdam']
+        for path, status in [('/country/Z99', 404), ('/nonsense', 404), ('/country', 400)]:
+            with pytest.raises(HTTPError) as error:
+                urlopen(base + path)
+            assert error.value.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,78 @@
+import struct
+
+import numpy as np
+import pytest
+
+from port_conversion import actual_height, bottom_margin, convert_coords, new_width, old_height, old_width
+from raster_conversion import Bitmap, resample_tile, source_coordinates
+
+
+@pytest.fixture(scope='module')
+def coordinate_source(tmp_path_factory):
+    """Full size EU4 raster whose pixels encode their own coordinates: x in red/green, y in green/blue."""
+    source = Bitmap.create(str(tmp_path_factory.mktemp('raster') / 'source.bmp'), old_width, old_height, 3)
+    y, x = np.mgrid[0:old_height, 0:old_width]
+    source.pixels[:, :, 0] = x & 0xFF
+    source.pixels[:, :, 1] = (x >> 8) | ((y >> 8) << 5)
+    source.pixels[:, :, 2] = y & 0xFF
+    source.flush()
+    return source
+
+
+def decode(pixel):
+    red, green, blue = (int(value) for value in pixel)
+    return red | (green & 0x1F) << 8, blue | (green >> 5) << 8
+
+
+def resample(source, y0, y1, x0, x1, mode, tmp_path):
+    target = Bitmap.create(str(tmp_path / 'target.bmp'), x1, y1, source.channels)
+    resample_tile(source, target, y0, y1, x0, x1, mode, 0)
+    return target.pixels
+
+
+def test_nearest_matches_port_coordinates(coordinate_source, tmp_path):
+    for x, y in [(0, 0), (1, 1), (100, 200), (2816, 1024), (4000, 1500), (old_width - 1, old_height - 1)]:
+        new_x, new_y = convert_coords(x, y)
+        pixels = resample(coordinate_source, new_y, new_y + 1, new_x, new_x + 1, 'nearest', tmp_path)
+        source_x, source_y = decode(pixels[new_y, new_x])
+        # convert_coords truncates, the resampler takes the nearest pixel centre.
+        assert x - 1 <= source_x <= x
+        assert y - 1 <= source_y <= y
+
+
+def test_bilinear_matches_reference(tmp_path):
+    source = Bitmap.create(str(tmp_path / 'source.bmp'), old_width, old_height, 1)
+    rng = np.random.default_rng(1)
+    source.pixels[:] = rng.integers(0, 256, source.pixels.shape, dtype=np.uint8)
+    new_x, new_y = convert_coords(3000, 900)
+    y0, y1, x0, x1 = new_y, new_y + 12, new_x, new_x + 20
+    pixels = resample(source, y0, y1, x0, x1, 'bilinear', tmp_path)
+
+    image = source.pixels[:, :, 0].astype(np.float64)
+    ys, _ = source_coordinates(y0, y1, old_height / actual_height, bottom_margin, old_height)
+    xs, _ = source_coordinates(x0, x1, old_width / new_width, 0, old_width)
+    for i, sy in enumerate(ys):
+        for j, sx in enumerate(xs):
+            y_low, x_low = int(np.floor(sy)), int(np.floor(sx))
+            wy, wx = sy - y_low, sx - x_low
+            expected = (image[y_low, x_low] * (1 - wx) * (1 - wy) + image[y_low, x_low + 1] * wx * (1 - wy)
+                        + image[y_low + 1, x_low] * (1 - wx) * wy + image[y_low + 1, x_low + 1] * wx * wy)
+            assert abs(int(pixels[y0 + i, x0 + j, 0]) - expected) <= 1
+
+
+def test_margins_get_fill(coordinate_source, tmp_path):
+    target = Bitmap.create(str(tmp_path / 'target.bmp'), 4, 4, 3)
+    resample_tile(coordinate_source, target, 0, 4, 0, 4, 'nearest', 7)
+    assert (target.pixels == 7).all()
+
+
+def test_top_down_bitmap_is_indexed_from_the_bottom(tmp_path):
+    path = tmp_path / 'top_down.bmp'
+    rows = [bytes([1, 2, 3, 0]), bytes([4, 5, 6, 0])]  # File order: top row first, padded to 4 bytes.
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<2sIHHI', b'BM', 54 + 8, 0, 0, 54))
+        f.write(struct.pack('<IiiHHIIiiII', 40, 1, -2, 1, 24, 0, 8, 2835, 2835, 0, 0))
+        f.write(b''.join(rows))
+    bitmap = Bitmap(str(path))
+    assert bitmap.pixels[0, 0].tolist() == [4, 5, 6]
+    assert bitmap.pixels[1, 0].tolist() == [1, 2, 3]
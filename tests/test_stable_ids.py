@@ -0,0 +1,25 @@
+from stable_ids import StableIdAllocator
+
+
+def allocate_all(table_file, rows):
+    allocator = StableIdAllocator(table_file)
+    names = [allocator.allocate('location', number, name) for number, name in rows]
+    allocator.save()
+    return names
+
+
+def test_names_survive_reordering_and_new_rows(tmp_path):
+    table_file = str(tmp_path / 'stable_ids.csv')
+    assert allocate_all(table_file, [(1, 'a'), (2, 'a'), (3, 'b')]) == ['a', 'a_2', 'b']
+    assert allocate_all(table_file, [(4, 'a'), (3, 'b'), (2, 'a'), (1, 'a')]) == ['a_3', 'b', 'a_2', 'a']
+
+
+def test_keys_repeated_within_a_run_are_persisted(tmp_path):
+    table_file = str(tmp_path / 'stable_ids.csv')
+    assert allocate_all(table_file, [(1, 'a'), (1, 'a'), (1, 'a')]) == ['a', 'a_2', 'a_3']
+    assert allocate_all(table_file, [(0, 'a'), (1, 'a'), (1, 'a'), (1, 'a')]) == ['a_4', 'a', 'a_2', 'a_3']
+
+    allocator = StableIdAllocator(table_file)
+    assert len(allocator.assigned) == 4
+    allocator.allocate('location', 1, 'a')
+    assert not allocator.changed
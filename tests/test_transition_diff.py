@@ -0,0 +1,66 @@
+import csv
+
+import transition_diff
+from transition_diff import IN_GAME, START, changed_outputs, diff_table, diff_versions
+
+
+def write_sheet(data_dir, table, rows):
+    data_dir.mkdir(exist_ok=True)
+    with open(data_dir / f'anbennar_eu5_transition_data_{table}.csv', 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_reordered_rows_are_not_a_change(tmp_path):
+    rows = [{'religion': name, 'religious_group': 'cannorian'} for name in ('a', 'b', 'c')]
+    write_sheet(tmp_path / 'old', 'religions', rows)
+    write_sheet(tmp_path / 'new', 'religions', rows[::-1])
+    assert diff_versions(str(tmp_path / 'old'), str(tmp_path / 'new'), render=False)['tables'] == {}
+
+
+def test_each_entity_lists_the_files_it_touches(tmp_path):
+    write_sheet(tmp_path / 'old', 'religions', [{'religion': 'a', 'religious_group': 'cannorian'},
+                                                {'religion': 'b', 'religious_group': 'cannorian'},
+                                                {'religion': 'c', 'religious_group': 'sarhaly'}])
+    write_sheet(tmp_path / 'new', 'religions', [{'religion': 'c', 'religious_group': 'bulwari'},
+                                                {'religion': 'a', 'religious_group': 'cannorian'},
+                                                {'religion': 'd', 'religious_group': 'raheni'}])
+    report = diff_versions(str(tmp_path / 'old'), str(tmp_path / 'new'), render=False)['tables']['religions']
+    religions = IN_GAME + 'common/religions/'
+    assert report['added'] == {'d': [religions + 'raheni.txt']}
+    assert report['removed'] == {'b': [religions + 'cannorian.txt']}
+    assert report['changed'] == {'c': {'fields': {'religious_group': ('sarhaly', 'bulwari')},
+                                       'files': [religions + 'bulwari.txt', religions + 'sarhaly.txt']}}
+    assert report['files'] == [religions + name for name in
+                               ('bulwari.txt', 'cannorian.txt', 'raheni.txt', 'sarhaly.txt')]
+
+
+def test_rendered_outputs_keep_the_real_changes_and_dependencies(tmp_path, monkeypatch):
+    write_sheet(tmp_path / 'old', 'countries', [{'tag': 'A01', 'capital': 'anbenncost', 'capital_superregion': 'west'}])
+    write_sheet(tmp_path / 'new', 'countries', [{'tag': 'A01', 'capital': 'anbenncost', 'capital_superregion': 'west'}])
+    write_sheet(tmp_path / 'old', 'locations', [{'old_province_number': '8', 'location_name': 'anbenncost',
+                                                 'culture': 'old_alenic', 'owner': 'A01'}])
+    write_sheet(tmp_path / 'new', 'locations', [{'old_province_number': '8', 'location_name': 'anbenncost',
+                                                 'culture': 'alenic', 'owner': 'A01'}])
+    country_file = IN_GAME + 'setup/countries/west.txt'
+    # The capital's culture feeds the country through the resolver, the culture file through a colour.
+    rendered = {str(tmp_path / 'old'): {country_file: b'old', IN_GAME + 'common/cultures/a.txt': b'red',
+                                        START + '10_countries.txt': b'same'},
+                str(tmp_path / 'new'): {country_file: b'new', IN_GAME + 'common/cultures/a.txt': b'blue',
+                                        START + '10_countries.txt': b'same'}}
+    monkeypatch.setattr(transition_diff, 'render_outputs', rendered.get)
+    report = diff_versions(str(tmp_path / 'old'), str(tmp_path / 'new'))
+    assert report['tables']['locations']['changed']['8']['files'] == [country_file]
+    assert report['output'] == {'changed': [IN_GAME + 'common/cultures/a.txt', country_file],
+                                'dependencies': [IN_GAME + 'common/cultures/a.txt']}
+
+
+def test_changed_outputs_include_added_and_removed_files():
+    assert changed_outputs({'a': b'1', 'b': b'2'}, {'a': b'1', 'b': b'3', 'c': b''}) == ['b', 'c']
+
+
+def test_diff_table_compares_field_by_field():
+    old = {'a': {'x': '1', 'y': '2'}}
+    new = {'a': {'x': '1', 'y': '3', 'z': ''}}
+    assert diff_table(old, new) == ([], [], {'a': {'y': ('2', '3')}})
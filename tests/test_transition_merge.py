@@ -0,0 +1,48 @@
+from transition_merge import merge_table, merge_union
+
+
+def write_text(data_dir, table, text):
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / f'anbennar_eu5_transition_data_{table}.csv').write_text(text, encoding='utf-8-sig')
+
+
+def test_merge_union():
+    assert merge_union('A01, A02', 'A02,A03,') == 'A01,A02,A03'
+    assert merge_union('', '') == ''
+    assert merge_union('A01,A02', '-A01, A03,-A09') == 'A02,A03'
+    assert merge_union('', '-A01') == ''
+
+
+def test_later_sources_override_and_only_submods_disagreeing_are_conflicts(tmp_path):
+    write_text(tmp_path / 'base', 'religions', 'religion,religious_group,color\na,x,red\nb,x,blue\n')
+    write_text(tmp_path / 'submod', 'religions', 'religion,religious_group,color\nb,y,\nc,z,green\n')
+    fieldnames, rows, conflicts = merge_table('religions', [str(tmp_path / 'base'), str(tmp_path / 'submod')], {})
+    assert fieldnames == ['religion', 'religious_group', 'color']
+    assert rows == [{'religion': 'a', 'religious_group': 'x', 'color': 'red'},
+                    {'religion': 'b', 'religious_group': 'y', 'color': 'blue'},
+                    {'religion': 'c', 'religious_group': 'z', 'color': 'green'}]
+    assert conflicts == []
+
+    write_text(tmp_path / 'other', 'religions', 'religion,religious_group,color\na,w,\nb,y,\nc,v,\n')
+    sources = [str(tmp_path / name) for name in ('base', 'submod', 'other')]
+    _, rows, conflicts = merge_table('religions', sources, {})
+    assert [row['religious_group'] for row in rows] == ['w', 'y', 'v']
+    assert conflicts == [('c', 'religious_group', sources[1], 'z', sources[2], 'v')]
+
+
+def test_short_and_long_rows_are_normalised(tmp_path):
+    write_text(tmp_path / 'base', 'locations', 'old_province_number,owner,cores\n1,A01\n2,A02,A02,extra\n')
+    write_text(tmp_path / 'submod', 'locations', 'old_province_number,owner,cores\n1,A03,A03\n2\n')
+    rules = {('locations', 'cores'): 'union'}
+    fieldnames, rows, conflicts = merge_table('locations', [str(tmp_path / 'base'), str(tmp_path / 'submod')], rules)
+    assert rows == [{'old_province_number': '1', 'owner': 'A03', 'cores': 'A03'},
+                    {'old_province_number': '2', 'owner': 'A02', 'cores': 'A02'}]
+    assert conflicts == []
+
+
+def test_submods_remove_union_values(tmp_path):
+    write_text(tmp_path / 'base', 'locations', 'old_province_number,cores\n1,"A01,A02"\n')
+    write_text(tmp_path / 'submod', 'locations', 'old_province_number,cores\n1,"-A01,A03"\n2,"A04,-A05"\n')
+    rules = {('locations', 'cores'): 'union'}
+    _, rows, _ = merge_table('locations', [str(tmp_path / 'base'), str(tmp_path / 'submod')], rules)
+    assert rows == [{'old_province_number': '1', 'cores': 'A02,A03'}, {'old_province_number': '2', 'cores': 'A04'}]
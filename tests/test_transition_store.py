@@ -0,0 +1,65 @@
+import csv
+
+from transition_store import TransitionStore
+
+
+def write_sheet(path, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_build_deletes_rows_removed_from_the_sheet(tmp_path):
+    store = TransitionStore(str(tmp_path / 'store.db'))
+    sheet = tmp_path / 'anbennar_eu5_transition_data_religions.csv'
+    write_sheet(sheet, [{'religion': 'a', 'religious_group': 'x'}, {'religion': 'b', 'religious_group': 'x'},
+                        {'religion': 'c', 'religious_group': 'y'}])
+    store.import_directory(str(tmp_path))
+    write_sheet(sheet, [{'religion': 'a', 'religious_group': 'x'}, {'religion': 'c', 'religious_group': 'z'}])
+    store.import_directory(str(tmp_path))
+    assert store.load_table('religions', 'religion') == {
+        'a': {'religion': 'a', 'religious_group': 'x'},
+        'c': {'religion': 'c', 'religious_group': 'z'},
+    }
+
+
+def test_upsert_keeps_rows_and_their_order(tmp_path):
+    store = TransitionStore(str(tmp_path / 'store.db'))
+    fieldnames = ['religion', 'religious_group']
+    assert store.upsert_rows('religions', fieldnames, [{'religion': 'a', 'religious_group': 'x'},
+                                                       {'religion': 'b', 'religious_group': 'x'}]) == 2
+    assert store.upsert_rows('religions', fieldnames, [{'religion': 'a', 'religious_group': 'y'}]) == 1
+    assert store.upsert_rows('religions', fieldnames, [{'religion': 'a', 'religious_group': 'y'}]) == 0
+    assert [row['religion'] for row in store.select('religions')] == ['a', 'b']
+    assert store.select('religions', religious_group='y') == [{'religion': 'a', 'religious_group': 'y'}]
+
+
+def test_transition_data_reads_stored_sheets(tmp_path, monkeypatch):
+    import transition_data
+
+    write_sheet(tmp_path / 'anbennar_eu5_transition_data_religions.csv', [{'religion': 'a', 'religious_group': 'x'}])
+    store = TransitionStore(str(tmp_path / 'store.db'))
+    store.upsert_rows('religions', ['religion', 'religious_group'], [{'religion': 'b', 'religious_group': 'y'}])
+    monkeypatch.setattr(transition_data, 'transition_store', store)
+    sheet = str(tmp_path / 'anbennar_eu5_transition_data_religions.csv')
+    assert transition_data.load_transition_data(sheet, 'religion') == {'b': {'religion': 'b', 'religious_group': 'y'}}
+    with transition_data.open_transition_sheet(sheet) as reader:
+        assert reader.fieldnames == ['religion', 'religious_group']
+        assert [row['religion'] for row in reader] == ['b']
+    # Sheets missing from the store still come from csv.
+    write_sheet(tmp_path / 'anbennar_eu5_transition_data_culture.csv', [{'culture': 'c'}])
+    assert transition_data.load_transition_data(str(tmp_path / 'anbennar_eu5_transition_data_culture.csv'),
+                                                'culture') == {'c': {'culture': 'c'}}
+
+
+def test_duplicate_keys_are_stored_once_and_do_not_count_as_changes(tmp_path, capsys):
+    store = TransitionStore(str(tmp_path / 'store.db'))
+    fieldnames = ['culture', 'language/dialect']
+    rows = [{'culture': 'second_graphical_culture', 'language/dialect': 'a'}, {'culture': 'b', 'language/dialect': 'b'},
+            {'culture': 'second_graphical_culture', 'language/dialect': 'c'}]
+    assert store.upsert_rows('culture', fieldnames, rows, prune=True) == 2
+    assert "'second_graphical_culture' appears in 2 rows" in capsys.readouterr().out
+    assert store.upsert_rows('culture', fieldnames, rows, prune=True) == 0
+    assert store.select('culture') == [{'culture': 'second_graphical_culture', 'language/dialect': 'c'},
+                                       {'culture': 'b', 'language/dialect': 'b'}]
@@ -0,0 +1,73 @@
+import os
+import types
+
+import pytest
+
+pytest.importorskip('pandas')  # watch imports xlsx_to_csv.
+
+import watch
+
+
+class FakeBuild:
+    """Stands in for main.TransitionBuild, writing out.txt from the text attribute of the class."""
+    text = 'a = yes\n'
+    runs = []
+
+    def __init__(self, output):
+        self.output = output
+        self.memo = types.SimpleNamespace(rendered=0)
+        self.row_changes = {}
+
+    def run(self, changed_paths=None):
+        self.runs.append(changed_paths)
+        with self.output.open('out.txt', encoding='utf-8', newline='\n') as f:
+            f.write(self.text)
+        if self.text == 'fail':
+            raise ValueError('broken sheet')
+        return ['step']
+
+
+@pytest.fixture
+def fake_main(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(watch.sys.modules, 'main', types.SimpleNamespace(TransitionBuild=FakeBuild))
+    monkeypatch.setattr(FakeBuild, 'text', 'a = yes\n')
+    monkeypatch.setattr(FakeBuild, 'runs', [])
+
+
+def test_build_keeps_state_and_passes_changed_paths(tmp_path, fake_main):
+    builder = watch.Builder()
+    builder.build()
+    assert (tmp_path / 'out.txt').read_text() == 'a = yes\n'
+    transition_build = builder.transition_build
+
+    # An unchanged output is not rewritten, and the same build gets the changed paths.
+    os.utime(tmp_path / 'out.txt', ns=(0, 0))
+    builder.build(['input/location_lists.csv'])
+    assert os.stat(tmp_path / 'out.txt').st_mtime_ns == 0
+    assert builder.transition_build is transition_build
+    assert FakeBuild.runs == [None, ['input/location_lists.csv']]
+
+
+def test_failed_build_writes_nothing_and_starts_over(tmp_path, fake_main):
+    builder = watch.Builder()
+    builder.build()
+    FakeBuild.text = 'fail'
+    builder.build(['anbennar_eu5_transition_data_culture.csv'])
+    assert (tmp_path / 'out.txt').read_text() == 'a = yes\n'
+    assert builder.transition_build is None
+
+    FakeBuild.text = 'a = no\n'
+    builder.build(['anbennar_eu5_transition_data_culture.csv'])
+    assert (tmp_path / 'out.txt').read_text() == 'a = no\n'
+    assert FakeBuild.runs[-1] is None
+
+
+def test_missing_directories_are_watched_through_their_parent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'input').mkdir()
+    directories = watch.watched_directories()
+    assert 'input' in directories
+    assert os.path.join('input', 'loc') not in directories
+    (tmp_path / 'input' / 'loc').mkdir()
+    assert os.path.join('input', 'loc') in watch.watched_directories()
@@ -0,0 +1,87 @@
+import csv
+import os
+from contextlib import contextmanager
+
+TRANSITION_DATA_PREFIX = 'anbennar_eu5_transition_data_'
+
+# Optional TransitionStore the sheets are read from instead of the csv files.
+transition_store = None
+
+
+def transition_data_file(table, data_dir='.'):
+    """Path of a transition data sheet, e.g. transition_data_file('locations_converted')."""
+    return os.path.join(data_dir, f'{TRANSITION_DATA_PREFIX}{table}.csv')
+
+
+def use_transition_store(db_file):
+    """Read sheets from a SQLite store built with transition_store.py. Sheets missing from it still come from csv."""
+    global transition_store
+    from transition_store import TransitionStore
+    transition_store = TransitionStore(db_file)
+
+
+def stored_table(csv_file):
+    """Store table name for a sheet's csv path, or None if the sheet should be read from csv."""
+    if transition_store is None:
+        return None
+    table = os.path.basename(csv_file)
+    if not table.startswith(TRANSITION_DATA_PREFIX) or not table.endswith('.csv'):
+        return None
+    table = table[len(TRANSITION_DATA_PREFIX):-len('.csv')]
+    return table if table in TABLE_KEYS and transition_store.has_table(table) else None
+
+
+@contextmanager
+def open_transition_sheet(csv_file):
+    """Open a sheet for reading as dict rows, with a fieldnames attribute like csv.DictReader."""
+    table = stored_table(csv_file)
+    if table is not None:
+        yield transition_store.reader(table)
+    else:
+        with open(csv_file, 'r', encoding='utf-8-sig') as file:
+            yield csv.DictReader(file)
+
+
+def fill_hierarchy_placeholders(row):
+    """
+    Replace a blank superregion, region or area of a location row with the placeholder the mod
+    uses, in that order, so a blank region under a blank superregion becomes
+    unknown_unknown_<continent>_superregion_region.
+    """
+    if not row.get('superregion'):
+        row['superregion'] = f'unknown_{row.get("continent", "")}_superregion'
+    if not row.get('region'):
+        row['region'] = f'unknown_{row["superregion"]}_region'
+    if not row.get('area'):
+        row['area'] = f'unknown_{row["region"]}_area'
+    return row
+
+
+# Load transition data from csv files
+def load_transition_data(csv_file, key_field, delimiter=','):
+    table = stored_table(csv_file)
+    if table is not None:
+        return transition_store.load_table(table, key_field)
+
+    transition_data = {}
+    with open(csv_file, 'r', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file, delimiter=delimiter)
+        for row in reader:
+            key = row[key_field]  # Use the specified field as the key
+            transition_data[key] = row
+    return transition_data
+
+
+# Natural key of every transition data sheet.
+TABLE_KEYS = {
+    'locations': 'old_province_number',
+    'countries': 'tag',
+    'rulers': 'character_tag',
+    'culture': 'culture',
+    'religions': 'religion',
+    'religious_groups': 'religious_group',
+    'language': 'language',
+    'dialects': 'dialect',
+    'language_families': 'language_family',
+    'tag_conversion': 'old_tag',
+}
@@ -0,0 +1,290 @@
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+
+import transition_data
+from location_lists import load_location_list_rules
+from outputs import BufferedOutput
+from transition_data import TABLE_KEYS, load_transition_data, transition_data_file
+
+IN_GAME = 'output/game/in_game/'
+MAIN_MENU = 'output/game/main_menu/'
+MAP_DATA = IN_GAME + 'map_data/'
+LOCALIZATION = MAIN_MENU + 'localization/english/'
+START = MAIN_MENU + 'setup/start/'
+HELPERS = 'output/helpers/'
+LOCATION_LIST_RULES = os.path.join('input', 'location_lists.csv')
+
+HIERARCHY_FIELDS = {'continent', 'superregion', 'region', 'area', 'province', 'location_name'}
+LOCATION_TEMPLATE_FIELDS = {'topography', 'vegetation', 'climate', 'religion', 'culture', 'raw_material',
+                            'natural_harbor_suitability'}
+RULER_TERM_FIELDS = {'tag', 'ruler_term_start', 'ruler_term_end', 'regnal_number'}
+NAME_LIST_FIELDS = {'first_name', 'culture', 'female', 'dynasty'}
+# Location fields that decide how a province's pops and buildings are split over its locations.
+DEVELOPMENT_FIELDS = {'old_province_number', 'location_type', 'topography'}
+# Location fields the reference resolver reads to fill in the culture and religion of countries and rulers.
+RESOLVER_FIELDS = {'culture', 'religion', 'area'}
+
+
+def diff_table(old, new):
+    """
+    Join two versions of a keyed table.
+    Returns (added keys, removed keys, {key: {field: (old value, new value)}}).
+    """
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = {}
+    for key, new_row in new.items():
+        old_row = old.get(key)
+        if old_row is None or old_row == new_row:
+            continue
+        fields = {}
+        for field in old_row.keys() | new_row.keys():
+            old_value, new_value = old_row.get(field, ''), new_row.get(field, '')
+            if old_value != new_value:
+                fields[field] = (old_value, new_value)
+        if fields:
+            changed[key] = fields
+    return added, removed, changed
+
+
+class TransitionVersion:
+    """All sheets of one version of the transition data, keyed by their natural keys."""
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tables = {}
+        for table, key_field in TABLE_KEYS.items():
+            path = transition_data_file(table, data_dir)
+            self.tables[table] = load_transition_data(path, key_field) if os.path.exists(path) else {}
+        self.location_lists = load_location_list_rules(LOCATION_LIST_RULES) \
+            if os.path.exists(LOCATION_LIST_RULES) else []
+
+    def language_of(self, lect):
+        """Language file a language or dialect is written to."""
+        dialect = self.tables['dialects'].get(lect)
+        return dialect.get('language', lect) if dialect else lect
+
+    def culture_language(self, culture):
+        row = self.tables['culture'].get(culture)
+        return self.language_of(row.get('language/dialect', '')) if row else ''
+
+    def country_file(self, tag):
+        """Setup file a country is written to, or None for an unknown tag."""
+        row = self.tables['countries'].get(tag)
+        return IN_GAME + f"setup/countries/{row.get('capital_superregion', '')}.txt" if row else None
+
+    def capital_countries(self, location):
+        """Tags of the countries with their capital in location."""
+        return [tag for tag, row in self.tables['countries'].items() if row.get('capital', '') == location]
+
+
+def touched_files(table, row, fields, version):
+    """
+    Output files that a change to fields of one row touches.
+    row is the old or new version of the row, version the matching TransitionVersion.
+    fields is None for added or removed rows, which touch everything the row is written to.
+    """
+    def changed(*names):
+        return fields is None or any(name in fields for name in names)
+
+    files = set()
+    if table == 'locations':
+        if changed(*HIERARCHY_FIELDS):
+            files |= {MAP_DATA + 'named_locations/00_default.txt', MAP_DATA + 'definitions.txt',
+                      MAP_DATA + 'location_templates.txt', START + '10_countries.txt',
+                      LOCALIZATION + 'province_names_l_english.yml',
+                      LOCALIZATION + 'location_names/location_names_l_english.yml',
+                      LOCALIZATION + 'area_l_english.yml', LOCALIZATION + 'region_names_l_english.yml'}
+        if changed('hexcode'):
+            files.add(MAP_DATA + 'named_locations/00_default.txt')
+        if changed(*LOCATION_TEMPLATE_FIELDS):
+            files.add(MAP_DATA + 'location_templates.txt')
+        for location_list in version.location_lists:
+            list_name = location_list.classify(row)
+            columns = {column for column, _, _ in location_list.conditions} | {location_list.group_column,
+                                                                                'location_name'}
+            if list_name is not None and changed(*columns):
+                files.add(HELPERS + f'location_lists/{list_name}.txt')
+        if changed(*RESOLVER_FIELDS):
+            # Countries with their capital here may take their culture and religion from it, and so may
+            # their rulers and the rulers born here. Resolutions through the area are only found by rendering.
+            location = row.get('location_name', '')
+            for tag in version.capital_countries(location):
+                files |= {version.country_file(tag), START + '05_anb_characters.txt'}
+            if any(ruler.get('birth_place', '') == location for ruler in version.tables['rulers'].values()):
+                files.add(START + '05_anb_characters.txt')
+        if changed('owner', 'cores'):
+            files.add(START + '10_countries.txt')
+        if changed('culture', 'religion', *DEVELOPMENT_FIELDS):
+            files.add(START + '06_anb_pops.txt')
+        if changed(*DEVELOPMENT_FIELDS):
+            files.add(START + '07_anb_buildings.txt')
+        if changed('old_province_number'):
+            files |= {LOCALIZATION + 'province_names_l_english.yml',
+                      LOCALIZATION + 'location_names/location_names_l_english.yml'}
+    elif table == 'countries':
+        if changed('tag', 'color', 'culture_definition', 'religion_definition', 'capital_superregion'):
+            files.add(IN_GAME + f"setup/countries/{row.get('capital_superregion', '')}.txt")
+        if changed('tag', 'capital', 'court_language'):
+            files.add(START + '10_countries.txt')
+    elif table == 'rulers':
+        files.add(START + '05_anb_characters.txt')
+        if changed(*RULER_TERM_FIELDS):
+            files.add(START + '10_countries.txt')
+        if changed('dynasty', 'culture'):
+            files.add(START + '04_anb_dynasties.txt')
+        if changed(*NAME_LIST_FIELDS):
+            language = version.culture_language(row.get('culture', ''))
+            if language:
+                files.add(IN_GAME + f'common/languages/{language}.txt')
+    elif table == 'culture':
+        files.add(IN_GAME + f"common/cultures/{row.get('culture_groups', '')}.txt")
+        if changed('culture_groups'):
+            files.add(IN_GAME + 'common/culture_groups/00_culture_groups.txt')
+        if changed('language/dialect'):
+            files.add(IN_GAME + f"common/languages/{version.language_of(row.get('language/dialect', ''))}.txt")
+    elif table == 'religions':
+        files.add(IN_GAME + f"common/religions/{row.get('religious_group', '')}.txt")
+    elif table == 'religious_groups':
+        files.add(IN_GAME + 'common/religion_groups/anb_default.txt')
+    elif table == 'language':
+        files.add(IN_GAME + f"common/languages/{row.get('language', '')}.txt")
+    elif table == 'dialects':
+        files.add(IN_GAME + f"common/languages/{row.get('language', '')}.txt")
+    elif table == 'language_families':
+        files.add(IN_GAME + 'common/language_families/anb_language_families.txt')
+    elif table == 'tag_conversion':
+        files |= {START + '05_anb_characters.txt', START + '10_countries.txt'}
+        for tag in row.get('old_tag', ''), row.get('new_tag', ''):
+            if version.country_file(tag):
+                files.add(version.country_file(tag))
+    return files
+
+
+def render_outputs(data_dir):
+    """
+    Render one version of the transition data with main.TransitionBuild, in memory.
+    Returns {output file: bytes} for the files under output/, with forward slashes in the paths.
+    """
+    from main import TransitionBuild
+
+    output = BufferedOutput()
+    # Each version is read from its own csv sheets, even when main uses a store.
+    store, transition_data.transition_store = transition_data.transition_store, None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            TransitionBuild(output, data_dir).run()
+    finally:
+        transition_data.transition_store = store
+    rendered = {}
+    for path, data in output.pending.items():
+        path = re.sub(r'[\\/]+', '/', path)
+        if path.startswith('output/'):
+            rendered[path] = data
+    return rendered
+
+
+def changed_outputs(old_outputs, new_outputs):
+    """Sorted output files that differ between two render_outputs, including added and removed files."""
+    return sorted(path for path in old_outputs.keys() | new_outputs.keys()
+                  if old_outputs.get(path) != new_outputs.get(path))
+
+
+def diff_versions(old_dir, new_dir, render=True):
+    """
+    Diff every sheet of two transition data versions.
+    Returns {'tables': {table: {'added': {key: files}, 'removed': {key: files},
+    'changed': {key: {'fields': {field: (old value, new value)}, 'files': files}}, 'files': all files}},
+    'output': {'changed': files, 'dependencies': files}}, with sorted output files.
+
+    With render, both versions are rendered by main.TransitionBuild and only the output files whose
+    content differs are listed: each entity lists those it writes to, and 'dependencies' the ones no
+    changed entity writes to itself, changed through a dependency between outputs (reassigned colours,
+    cultures and religions resolved from the locations, ...). Without render, the files are the ones
+    each entity writes to, whether or not their content changes.
+    """
+    old, new = TransitionVersion(old_dir), TransitionVersion(new_dir)
+    changed_files = changed_outputs(render_outputs(old_dir), render_outputs(new_dir)) if render else None
+
+    def real(files):
+        return sorted(files if changed_files is None else files & set(changed_files))
+
+    tables = {}
+    for table in TABLE_KEYS:
+        old_rows, new_rows = old.tables[table], new.tables[table]
+        added, removed, changed = diff_table(old_rows, new_rows)
+        if not (added or removed or changed):
+            continue
+        result = {
+            'added': {key: real(touched_files(table, new_rows[key], None, new)) for key in added},
+            'removed': {key: real(touched_files(table, old_rows[key], None, old)) for key in removed},
+            'changed': {key: {'fields': fields,
+                              'files': real(touched_files(table, old_rows[key], fields, old)
+                                            | touched_files(table, new_rows[key], fields, new))}
+                        for key, fields in changed.items()},
+        }
+        files = set()
+        for entry in result['added'], result['removed']:
+            for key_files in entry.values():
+                files.update(key_files)
+        for entry in result['changed'].values():
+            files.update(entry['files'])
+        result['files'] = sorted(files)
+        tables[table] = result
+
+    attributed = {path for result in tables.values() for path in result['files']}
+    if changed_files is None:
+        changed_files = sorted(attributed)
+    return {'tables': tables,
+            'output': {'changed': changed_files,
+                       'dependencies': [path for path in changed_files if path not in attributed]}}
+
+
+def print_files(files):
+    for path in files:
+        print(f'      => {path}')
+
+
+def print_report(report):
+    if not report['tables'] and not report['output']['changed']:
+        print('No changes.')
+        return
+    for table, result in report['tables'].items():
+        print(f"## {table}: {len(result['added'])} added, {len(result['removed'])} removed, "
+              f"{len(result['changed'])} changed")
+        for key, files in result['added'].items():
+            print(f'  + {key}')
+            print_files(files)
+        for key, files in result['removed'].items():
+            print(f'  - {key}')
+            print_files(files)
+        for key, entry in result['changed'].items():
+            print(f'  ~ {key}')
+            for field, (old_value, new_value) in sorted(entry['fields'].items()):
+                print(f'      {field}: {old_value!r} -> {new_value!r}')
+            print_files(entry['files'])
+    print('Changed output:')
+    for path in report['output']['changed']:
+        print(f'    {path}')
+    if report['output']['dependencies']:
+        print('Changed through dependencies between outputs:')
+        for path in report['output']['dependencies']:
+            print(f'    {path}')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python transition_diff.py <old_data_directory> <new_data_directory> [--json] [--no-render]")
+        print("\n--no-render lists the files each change writes to without rendering both versions.")
+        print("\nExample:")
+        print("  python transition_diff.py ../transition_data_v1 .")
+        sys.exit(1)
+
+    report = diff_versions(sys.argv[1], sys.argv[2], render='--no-render' not in sys.argv[3:])
+    if '--json' in sys.argv[3:]:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,152 @@
+import csv
+import os
+import sys
+
+from transition_data import TABLE_KEYS, transition_data_file
+
+DEFAULT_RULES_FILE = os.path.join('input', 'merge_rules.csv')
+
+
+def merge_override(old, new):
+    """Last non-blank value wins, so a submod can leave cells empty to keep the base value."""
+    return new if new != '' else old
+
+
+def merge_replace(old, new):
+    """Last value wins, blank or not."""
+    return new
+
+
+def merge_first(old, new):
+    """First non-blank value wins."""
+    return old if old != '' else new
+
+
+def merge_union(old, new):
+    """
+    Comma separated lists are combined, keeping the order of first appearance. An entry of new
+    starting with '-' removes that value instead, so a submod can drop a core with '-A01'.
+    """
+    values = dict.fromkeys(value.strip() for value in old.split(',') if value.strip() not in ('', '-'))
+    for value in new.split(','):
+        value = value.strip()
+        if value.startswith('-'):
+            values.pop(value[1:].strip(), None)
+        elif value != '':
+            values[value] = None
+    return ','.join(value for value in values if not value.startswith('-'))
+
+
+POLICIES = {
+    'override': merge_override,
+    'replace': merge_replace,
+    'first': merge_first,
+    'union': merge_union,
+}
+
+# Policies where differing non-blank values of two submods mean they disagree.
+CONFLICTING_POLICIES = {'override', 'replace', 'first'}
+
+
+def load_merge_rules(rules_file):
+    """Per column policies from a csv with table, column and policy columns. Missing file means no rules."""
+    rules = {}
+    if rules_file is None or not os.path.exists(rules_file):
+        return rules
+    with open(rules_file, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            if row['policy'] not in POLICIES:
+                raise ValueError(f"Unknown merge policy {row['policy']!r} for {row['table']}.{row['column']}")
+            rules[(row['table'], row['column'])] = row['policy']
+    return rules
+
+
+def merge_table(table, sources, rules):
+    """
+    Merge one sheet from several data directories, the first being the base and the later ones
+    submods taking precedence in order.
+
+    Each source is streamed row by row and joined on the natural key with a dict, so time and
+    memory are linear in the total number of rows. A submod changing a base value is what
+    submods are for; a conflict is a submod giving a different value than an earlier submod did.
+    Returns (fieldnames, rows, conflicts) where conflicts are (key, column, earlier submod
+    directory, its value, submod directory, value from that submod).
+    """
+    key_field = TABLE_KEYS[table]
+    fieldnames = []
+    merged = {}
+    set_by = {}  # (key, column) -> submod directory the current value came from
+    conflicts = []
+    for source_index, data_dir in enumerate(sources):
+        path = transition_data_file(table, data_dir)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            for name in reader.fieldnames:
+                if name not in fieldnames:
+                    fieldnames.append(name)
+            for row in reader:
+                # Short rows are missing cells (None), cells past the header are dropped.
+                row = {column: value or '' for column, value in row.items() if column is not None}
+                key = row[key_field]
+                current = merged.setdefault(key, {})
+                for column, value in row.items():
+                    old_value = current.get(column, '')
+                    policy = rules.get((table, column), 'override')
+                    earlier = set_by.get((key, column))
+                    if policy in CONFLICTING_POLICIES and earlier is not None and old_value != '' and value != '' \
+                            and old_value != value:
+                        conflicts.append((key, column, earlier, old_value, data_dir, value))
+                    current[column] = POLICIES[policy](old_value, value)
+                    if source_index > 0 and value != '' and current[column] == value:
+                        set_by[(key, column)] = data_dir
+    rows = [{name: row.get(name, '') for name in fieldnames} for row in merged.values()]
+    return fieldnames, rows, conflicts
+
+
+def merge_directories(sources, output_dir, rules_file=DEFAULT_RULES_FILE):
+    """
+    Merge every transition sheet of the source directories into output_dir.
+    Conflicts are written to merge_conflicts.csv in output_dir. Returns the number of conflicts.
+    """
+    rules = load_merge_rules(rules_file)
+    os.makedirs(output_dir, exist_ok=True)
+    conflict_count = 0
+    with open(os.path.join(output_dir, 'merge_conflicts.csv'), 'w', encoding='utf-8-sig', newline='') as conflicts_file:
+        conflict_writer = csv.writer(conflicts_file)
+        conflict_writer.writerow(['table', 'key', 'column', 'previous_source', 'previous_value', 'source', 'value'])
+        for table in TABLE_KEYS:
+            fieldnames, rows, conflicts = merge_table(table, sources, rules)
+            if not fieldnames:
+                continue
+            with open(transition_data_file(table, output_dir), 'w', encoding='utf-8-sig', newline='') as outfile:
+                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            for conflict in conflicts:
+                conflict_writer.writerow([table, *conflict])
+            conflict_count += len(conflicts)
+            print(f'  {table}: {len(rows)} row(s), {len(conflicts)} conflict(s)')
+    return conflict_count
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rules_file = DEFAULT_RULES_FILE
+    if '--rules' in args:
+        i = args.index('--rules')
+        rules_file = args[i + 1]
+        del args[i:i + 2]
+
+    if len(args) < 2:
+        print("Usage: python transition_merge.py <output_directory> <data_directory> [<data_directory> ...] [--rules rules.csv]")
+        print("\nThe first directory is the base, later ones override it in order. In union columns")
+        print("(see input/merge_rules.csv) an entry like -A01 removes A01. Example:")
+        print("  python transition_merge.py merged . ../submod_a ../submod_b")
+        sys.exit(1)
+
+    output_dir, sources = args[0], args[1:]
+    print(f"Merging {', '.join(sources)} into '{output_dir}'...")
+    conflict_count = merge_directories(sources, output_dir, rules_file)
+    print(f"\nMerge complete, {conflict_count} conflict(s) written to merge_conflicts.csv")
@@ -0,0 +1,180 @@
+import csv
+import os
+import sqlite3
+import sys
+
+from transition_data import TABLE_KEYS, TRANSITION_DATA_PREFIX, transition_data_file
+
+# Columns that get an index in every table they appear in.
+INDEXED_COLUMNS = ['tag', 'owner', 'old_province_number', 'continent', 'superregion', 'region', 'area',
+                   'province', 'culture', 'religion', 'religious_group', 'language']
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SheetReader:
+    """Iterates a store table as dict rows in sheet order, like csv.DictReader."""
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.fieldnames = [column[0] for column in cursor.description]
+
+    def __iter__(self):
+        for values in self.cursor:
+            yield dict(zip(self.fieldnames, values))
+
+
+class TransitionStore:
+    """
+    SQLite copy of the transition sheets. Every table keeps the sheet's columns as text, with the
+    natural key from TABLE_KEYS as primary key and indexes on tag, province number and hierarchy
+    columns. Rows keep their sheet order (rowid), and upserting a row keeps its position. A key
+    repeated within a sheet is stored once, with the values of its last row at the position of its
+    first, like load_transition_data, and reported. Importing a whole sheet with prune also deletes
+    the rows removed from it, in the same transaction as the upsert.
+
+    The store is an alternative source for the sheets, and select() serves ad hoc queries. main.py
+    still reads every row of the tables it uses, since it writes every row out; partial rebuilds
+    (watch.py) diff the sheets in memory rather than querying the store.
+    """
+    def __init__(self, db_file):
+        self.connection = sqlite3.connect(db_file)
+
+    def close(self):
+        self.connection.close()
+
+    def has_table(self, table):
+        cursor = self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def columns(self, table):
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info({quote(table)})')]
+
+    def _ensure_table(self, table, fieldnames):
+        key_field = TABLE_KEYS[table]
+        if not self.has_table(table):
+            columns = ', '.join(f'{quote(name)} TEXT' + (' PRIMARY KEY' if name == key_field else '')
+                                for name in fieldnames)
+            self.connection.execute(f'CREATE TABLE {quote(table)} ({columns})')
+        else:
+            existing = set(self.columns(table))
+            for name in fieldnames:
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(name)} TEXT DEFAULT ''")
+        for name in fieldnames:
+            if name in INDEXED_COLUMNS and name != key_field:
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS {quote(f"{table}_{name}")} '
+                                        f'ON {quote(table)} ({quote(name)})')
+
+    def upsert_rows(self, table, fieldnames, rows, prune=False):
+        """
+        Insert new rows and update changed ones. With prune, rows whose key is not among rows are
+        deleted too. Returns the number of rows inserted, changed or deleted.
+        """
+        self._ensure_table(table, fieldnames)
+        key_field = TABLE_KEYS[table]
+        columns = ', '.join(quote(name) for name in fieldnames)
+        placeholders = ', '.join('?' for _ in fieldnames)
+        updates = ', '.join(f'{quote(name)} = excluded.{quote(name)}' for name in fieldnames if name != key_field)
+        differs = ' OR '.join(f'{quote(table)}.{quote(name)} IS NOT excluded.{quote(name)}'
+                              for name in fieldnames if name != key_field)
+        statement = f'INSERT INTO {quote(table)} ({columns}) VALUES ({placeholders}) ON CONFLICT({quote(key_field)}) DO '
+        statement += f'UPDATE SET {updates} WHERE {differs}' if updates else 'NOTHING'
+
+        # One row per key, so a duplicated key does not flip between its rows on every import.
+        unique = {}
+        counts = {}
+        for row in rows:
+            key = row.get(key_field, '')
+            unique[key] = row
+            counts[key] = counts.get(key, 0) + 1
+        for key, count in counts.items():
+            if count > 1:
+                print(f'  {table}: {key_field} {key!r} appears in {count} rows, keeping the last one')
+        keys = list(unique)
+
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(statement, ([row.get(name, '') for name in fieldnames]
+                                                    for row in unique.values()))
+            changed = self.connection.total_changes - before
+            if prune:
+                self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS sheet_keys (key TEXT PRIMARY KEY)')
+                self.connection.execute('DELETE FROM sheet_keys')
+                self.connection.executemany('INSERT OR IGNORE INTO sheet_keys VALUES (?)', ((key,) for key in keys))
+                cursor = self.connection.execute(f'DELETE FROM {quote(table)} WHERE {quote(key_field)} '
+                                                 f'NOT IN (SELECT key FROM sheet_keys)')
+                changed += cursor.rowcount
+        return changed
+
+    def upsert_csv(self, table, csv_file, prune=False):
+        with open(csv_file, 'r', encoding='utf-8-sig') as file:
+            reader = csv.DictReader(file)
+            return self.upsert_rows(table, reader.fieldnames, reader, prune)
+
+    def import_directory(self, data_dir='.'):
+        """Import every transition sheet found in data_dir, deleting the rows removed from it."""
+        for table in TABLE_KEYS:
+            path = transition_data_file(table, data_dir)
+            if os.path.exists(path):
+                changed = self.upsert_csv(table, path, prune=True)
+                print(f'  {table}: {changed} row(s) inserted, changed or deleted')
+
+    def reader(self, table):
+        return SheetReader(self.connection.execute(f'SELECT * FROM {quote(table)} ORDER BY rowid'))
+
+    def load_table(self, table, key_field):
+        """Whole table as a dict of key -> row, like load_transition_data."""
+        return {row[key_field]: row for row in self.reader(table)}
+
+    def select(self, table, **filters):
+        """
+        Rows matching column = value filters, in sheet order, for the query command. Use indexed
+        columns for speed.
+        """
+        where = ' AND '.join(f'{quote(column)} = ?' for column in filters)
+        query = f'SELECT * FROM {quote(table)}' + (f' WHERE {where}' if where else '') + ' ORDER BY rowid'
+        return list(SheetReader(self.connection.execute(query, list(filters.values()))))
+
+    def export_csv(self, table, csv_file):
+        reader = self.reader(table)
+        with open(csv_file, 'w', encoding='utf-8-sig', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=reader.fieldnames)
+            writer.writeheader()
+            writer.writerows(reader)
+
+
+if __name__ == "__main__":
+    usage = [
+        "Usage:",
+        "  python transition_store.py build <store.db> [data_directory]",
+        "  python transition_store.py upsert <store.db> <table> <sheet.csv>",
+        "  python transition_store.py query <store.db> <table> [column=value ...]",
+        "  python transition_store.py export <store.db> [data_directory]",
+        f"\nTables: {', '.join(TABLE_KEYS)}",
+    ]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'upsert', 'query', 'export'):
+        print('\n'.join(usage))
+        sys.exit(1)
+
+    command, db_file, args = sys.argv[1], sys.argv[2], sys.argv[3:]
+    store = TransitionStore(db_file)
+    if command == 'build':
+        store.import_directory(args[0] if args else '.')
+    elif command == 'upsert':
+        print(f'{store.upsert_csv(args[0], args[1])} row(s) inserted or changed')
+    elif command == 'query':
+        filters = dict(arg.split('=', 1) for arg in args[1:])
+        writer = None
+        for row in store.select(args[0], **filters):
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+    elif command == 'export':
+        data_dir = args[0] if args else '.'
+        for table in TABLE_KEYS:
+            if store.has_table(table):
+                store.export_csv(table, os.path.join(data_dir, f'{TRANSITION_DATA_PREFIX}{table}.csv'))
+    store.close()
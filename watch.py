@@ -0,0 +1,185 @@
+import glob
+import importlib
+import os
+import sys
+import time
+import traceback
+
+import xlsx_to_csv
+from outputs import BufferedOutput
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not on Linux or not installed, fall back to polling.
+    INotify = None
+
+XLSX_FILE = 'anbennar_eu5_transition_data.xlsx'
+
+# Inputs that trigger a rebuild. Files written by main.py itself (*_converted.csv, the stable id
+# table) are left out so a rebuild does not trigger the next one.
+WATCHED_PATTERNS = [
+    XLSX_FILE,
+    'anbennar_eu5_transition_data_*.csv',
+    'templates/*.txt',
+    'input/*.csv',
+    'input/loc/*.yml',
+    'input/characters/*.csv',
+    'input/history/provinces/*.txt',
+    'input/map/*',
+    '*.py',
+]
+IGNORED_SUFFIXES = ('_converted.csv', '_stable_ids.csv')
+
+POLL_INTERVAL = 0.2
+DEBOUNCE = 0.1
+
+
+def watched_files():
+    paths = set()
+    for pattern in WATCHED_PATTERNS:
+        for path in glob.glob(pattern):
+            if not path.endswith(IGNORED_SUFFIXES):
+                paths.add(os.path.normpath(path))
+    return paths
+
+
+def watched_directories():
+    """
+    Directories of the watched patterns. A directory that does not exist yet is represented by its
+    nearest existing parent, so its creation wakes the watcher and it can be watched from then on.
+    """
+    directories = set()
+    for pattern in WATCHED_PATTERNS:
+        directory = os.path.dirname(pattern) or '.'
+        while not os.path.isdir(directory):
+            directory = os.path.dirname(directory) or '.'
+        directories.add(os.path.normpath(directory))
+    return directories
+
+
+def snapshot():
+    """Map of watched path -> (mtime, size)."""
+    state = {}
+    for path in watched_files():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def changed_paths(old, new):
+    return sorted(path for path in old.keys() | new.keys() if old.get(path) != new.get(path))
+
+
+class Builder:
+    """
+    Keeps a main.TransitionBuild between rebuilds, with the parsed sheets, map hierarchy, colours
+    and rendered entities of the last build. A changed input only reruns the steps that depend on
+    it, and those only re-render the entities whose rows changed. Outputs are buffered and written
+    once the build succeeded, skipping the ones that did not change.
+
+    A changed .py file reloads the modules and starts over with a full build, as does the build
+    after a failed one.
+    """
+    def __init__(self):
+        self.output = BufferedOutput()
+        self.transition_build = None
+
+    def reload_modules(self, paths):
+        """Reload the changed helper modules, then main.py, which imports names from them."""
+        for path in paths:
+            module_name, extension = os.path.splitext(os.path.basename(path))
+            if extension == '.py' and module_name in sys.modules and module_name not in ('__main__', 'main'):
+                importlib.reload(sys.modules[module_name])
+        if 'main' in sys.modules:
+            importlib.reload(sys.modules['main'])
+
+    def build(self, paths=None):
+        """Rebuild after paths changed, or fully if None. Returns the csv files derived from the xlsx, if it was converted."""
+        start = time.perf_counter()
+        derived = []
+        if paths is not None and XLSX_FILE in paths:
+            derived = [os.path.normpath(path) for path in xlsx_to_csv.xlsx_to_csv(XLSX_FILE)]
+
+        changed = None
+        if paths is not None and any(path.endswith('.py') for path in paths):
+            self.reload_modules(paths)
+            self.transition_build = None
+        elif paths is not None and self.transition_build is not None:
+            changed = list(paths) + derived
+        if self.transition_build is None:
+            self.transition_build = importlib.import_module('main').TransitionBuild(self.output)
+
+        rendered = self.transition_build.memo.rendered
+        try:
+            steps = self.transition_build.run(changed)
+        except Exception:
+            traceback.print_exc()
+            print('Build failed, nothing written, waiting for the next change.')
+            self.output.discard()
+            self.transition_build = None
+            return derived
+        written = self.output.commit()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'Rebuilt in {elapsed:.0f} ms: {len(steps)} step(s), '
+              f'{self.transition_build.memo.rendered - rendered} entities rendered, '
+              f'{len(written)} output file(s) changed')
+        for table, keys in self.transition_build.row_changes.items():
+            print(f'  {table}: {len(keys)} row(s) changed')
+        for path in written:
+            print(f'  {path}')
+        return derived
+
+
+def wait_for_change(inotify):
+    if inotify is not None:
+        inotify.read()  # Blocks until something in a watched directory changes.
+    else:
+        time.sleep(POLL_INTERVAL)
+
+
+def watch():
+    """Build once, then rebuild whenever a watched input changes until interrupted."""
+    builder = Builder()
+    state = snapshot()
+    builder.build()
+
+    inotify = None
+    watched = set()
+    if INotify is not None:
+        inotify = INotify()
+        watch_flags = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+
+    print('Watching for changes, press Ctrl+C to stop.')
+    while True:
+        if inotify is not None:
+            for directory in sorted(watched_directories() - watched):  # Includes directories created since.
+                inotify.add_watch(directory, watch_flags)
+                watched.add(directory)
+        wait_for_change(inotify)
+        time.sleep(DEBOUNCE)  # Let editors finish writing.
+        new_state = snapshot()
+        paths = changed_paths(state, new_state)
+        if not paths:
+            continue
+        print(f"Changed: {', '.join(paths)}")
+        # The snapshot is taken before building, so edits saved during the build trigger the next
+        # one. Only the csv files the build derives from the xlsx are taken from after the build.
+        state = new_state
+        derived = builder.build(paths)
+        if derived:
+            after = snapshot()
+            for path in derived:
+                if path in after:
+                    state[path] = after[path]
+        if inotify is not None:
+            inotify.read(timeout=0)  # Drain events caused by the build.
+
+
+if __name__ == "__main__":
+    try:
+        watch()
+    except KeyboardInterrupt:
+        pass
@@ -10,6 +10,9 @@ def xlsx_to_csv(xlsx_file, output_dir=None):
     Args:
         xlsx_file: Path to the .xlsx file
         output_dir: Optional directory to save CSV files. If None, saves in same directory as xlsx file.
+
+    Returns:
+        List of the CSV file paths written.
     """
     # Get the base filename without extension
     base_name = os.path.splitext(os.path.basename(xlsx_file))[0]
@@ -27,6 +30,7 @@ def xlsx_to_csv(xlsx_file, output_dir=None):
     print(f"Found {len(excel_file.sheet_names)} sheet(s): {', '.join(excel_file.sheet_names)}")
     
     # Convert each sheet to CSV
+    csv_paths = []
     for sheet_name in excel_file.sheet_names:
         # Read the sheet
         df = pd.read_excel(xlsx_file, sheet_name=sheet_name)
@@ -43,9 +47,11 @@ def xlsx_to_csv(xlsx_file, output_dir=None):
         
         # Save to CSV
         df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        csv_paths.append(csv_path)
         print(f"  ? Saved '{sheet_name}' -> '{csv_filename}'")
     
     print(f"\nConversion complete!")
+    return csv_paths
 
 
 if __name__ == "__main__":